@@ -1,10 +1,146 @@
-from flask import Flask, request
+import gzip
+import json
+import zlib
+import threading
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+from flask import Flask, request, stream_with_context
 from flask_cors import CORS
-from main import get_data
+from main import analyze_game
+from results_store import ResultsStore, MODEL_VERSION
+from logistic_regression_analysis.model_registry import load_latest_model
+from season_clustering import SeasonClusterCache, DEFAULT_DATASET
+from live_feed import LiveFeedManager
+from data_collection.timeline import GameTimeline, TimelineCache, COLUMN_NAMES
+from preprocess.data_processor import data_download, process_data
+from preprocess.raw_cache import is_final
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 CORS(app)
 
+# NOTE:学習済みモデル(model_registry)があればそれで推論し、結果もそのモデルのバージョンで保存する
+# import 時にはファイルを読まず、最初に使うときに読み込む(ワーカーの起動を軽くする)
+_model = None
+_results_store = None
+_state_lock = threading.Lock()
+season_clusters = SeasonClusterCache()
+# NOTE:試合ごとの1秒単位のタイムライン(終了済みの試合だけ持つ)。幅を変えた集計は累積和から都度出す
+timelines = TimelineCache()
+
+def get_model():
+    global _model, _results_store
+    with _state_lock:
+        if _results_store is None:
+            _model = load_latest_model()
+            _results_store = ResultsStore(model_version=_model.version if _model is not None else MODEL_VERSION)
+        return _model
+
+def get_results_store():
+    get_model()
+    return _results_store
+
+# NOTE:試合中の試合のポーリングはワーカーごとに gamePk あたり1本(購読者がいる間だけ)
+live_feeds = LiveFeedManager(model_loader=get_model)
+
+# NOTE:本番モード(serve.py)用の設定。SCORING_WORKERS > 0 ならロジスティック回帰までをプロセスプールで実行する
+SCORING_WORKERS = int(os.environ.get("SCORING_WORKERS", 0))
+REQUEST_TIMEOUT = float(os.environ.get("REQUEST_TIMEOUT", 30))
+# これより小さいレスポンスは圧縮しない
+COMPRESS_MIN_BYTES = 1024
+# NOTE:バッチ(NDJSON)で同時に計算・取得する試合数。結果はこの数までしか溜めないので、試合数が増えてもメモリは一定
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 8))
+# 1リクエストで受け付ける gamePk の数と日数の上限
+BATCH_MAX_GAMES = int(os.environ.get("BATCH_MAX_GAMES", 3000))
+BATCH_MAX_DAYS = 366
+
+_scoring_executor = None
+# NOTE:プールに投げた計算(gamepk -> Future)。タイムアウトしてもプール側の計算は止められないので、
+# 終わるまでここに残し、同じ試合のリクエストは新しく投げずにそれを待つ
+_scoring_futures = {}
+_scoring_lock = threading.Lock()
+
+def configure(scoring_workers=None, request_timeout=None):
+    global SCORING_WORKERS, REQUEST_TIMEOUT
+    if scoring_workers is not None:
+        SCORING_WORKERS = scoring_workers
+    if request_timeout is not None:
+        REQUEST_TIMEOUT = request_timeout
+
+# NOTE:gunicorn の fork 後に各ワーカーで作るよう遅延生成する
+def get_scoring_executor():
+    global _scoring_executor
+    if SCORING_WORKERS > 0 and _scoring_executor is None:
+        _scoring_executor = ProcessPoolExecutor(max_workers=SCORING_WORKERS)
+    return _scoring_executor
+
+# NOTE:終了済みの試合だけ結果を保存する(試合中は毎回計算し直す)
+def compute_logistic_regression_data(gamepk):
+    raw_data, data = analyze_game(gamepk, save=False, model=get_model())
+    return data, raw_data is not None and is_final(raw_data)
+
+def compute_with_timeout(gamepk):
+    executor = get_scoring_executor()
+    if executor is None:
+        return compute_logistic_regression_data(gamepk)
+    with _scoring_lock:
+        future = _scoring_futures.get(gamepk)
+        if future is None:
+            future = executor.submit(compute_logistic_regression_data, gamepk)
+            future.timed_out = False
+            _scoring_futures[gamepk] = future
+            future.add_done_callback(lambda f: scoring_done(gamepk, f))
+    try:
+        return future.result(timeout=REQUEST_TIMEOUT)
+    except TimeoutError:
+        # まだ始まっていなければ取り消す。始まっていれば最後まで走らせ、結果は scoring_done で保存する
+        if not future.cancel():
+            future.timed_out = True
+        raise
+
+# NOTE:タイムアウトした(待っているリクエストがいない)計算の結果も、終了済みの試合なら保存して次のリクエストで使う
+def scoring_done(gamepk, future):
+    with _scoring_lock:
+        if _scoring_futures.get(gamepk) is future:
+            del _scoring_futures[gamepk]
+    if not future.timed_out or future.cancelled() or future.exception() is not None:
+        return
+    data, cacheable = future.result()
+    if data is not None and cacheable:
+        get_results_store().put(gamepk, data)
+
+def accepted_encoding():
+    accept = request.headers.get("Accept-Encoding", "")
+    if brotli is not None and "br" in accept:
+        return "br"
+    if "gzip" in accept:
+        return "gzip"
+    return None
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+@app.after_request
+def compress_response(response):
+    response.vary.add("Accept-Encoding")
+    if (response.status_code != 200 or response.direct_passthrough or "Content-Encoding" in response.headers
+            or response.mimetype != "application/json"):
+        return response
+    body = response.get_data()
+    encoding = accepted_encoding()
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
 @app.get("/api/clusterVisualization/logistic-regression-data")
 def get_logistic_regression_data():
     gamepk = request.args.get('gamepk', type=int)
@@ -13,13 +149,257 @@ def get_logistic_regression_data():
         return {"error": "gamepk parameter is missing"}
     
     try:
-        data = get_data(gamepk)
-        if data is None:
+        result = get_results_store().get_or_compute(gamepk, compute_with_timeout)
+        if result is None:
             return {"error": "data is None"}
-        return data
+        # NOTE:保存済みの結果は圧縮後のbytesもメモしておき、毎回圧縮しない
+        encoding = accepted_encoding()
+        if encoding is not None and len(result.body) >= COMPRESS_MIN_BYTES:
+            response = app.response_class(result.encoded(encoding, compress), mimetype="application/json")
+            response.headers["Content-Encoding"] = encoding
+            # 圧縮形式ごとに別のETagにする
+            response.set_etag(f"{result.etag}-{encoding}")
+        else:
+            response = app.response_class(result.body, mimetype="application/json")
+            response.set_etag(result.etag)
+        response.last_modified = datetime.fromtimestamp(result.last_modified, tz=timezone.utc)
+        response.cache_control.public = True
+        response.cache_control.max_age = 60
+        return response.make_conditional(request)
+    except TimeoutError:
+        return {"error": "timeout"}, 504
     except Exception as e:
         print(f"Error: {e}")
         return {"error": str(e)}, 500
 
+# NOTE:シーズンサマリーの PCA 座標と k-means のラベルだけを返す(k を省略するとエルボー法で決めて elbow も返す)
+@app.get("/api/clusterVisualization/season-clusters")
+def get_season_clusters():
+    dataset = request.args.get("dataset", DEFAULT_DATASET)
+    k = request.args.get("k", type=int)
+    seed = request.args.get("seed", 0, type=int)
+
+    if k is not None and k < 1:
+        return {"error": "k must be >= 1"}, 400
+    if seed < 0:
+        return {"error": "seed must be >= 0"}, 400
+
+    try:
+        version, body = season_clusters.get(dataset, k, seed)
+    except FileNotFoundError:
+        return {"error": f"dataset not found: {dataset}"}, 404
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    response = app.response_class(body, mimetype="application/json")
+    # 圧縮は after_request で行うので、圧縮形式ごとに別のETagにしておく
+    encoding = accepted_encoding()
+    etag = f"{version}-{k}-{seed}"
+    if encoding is not None and len(body) >= COMPRESS_MIN_BYTES:
+        etag = f"{etag}-{encoding}"
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = 60
+    return response.make_conditional(request)
+
+# タイムラインの集計幅(秒)の上限
+TIMELINE_MAX_WIDTH = 3600
+
+def build_timeline(gamepk):
+    raw_data = data_download(gamepk)
+    if raw_data is None:
+        return None, False
+    return GameTimeline.from_processed(process_data(raw_data)), is_final(raw_data)
+
+# NOTE:1試合の特徴量のタイムラインを width 秒ごとに集計して返す(フロントのズーム用)。columns=a,b で列を絞れる
+@app.get("/api/clusterVisualization/timeline")
+def get_timeline():
+    gamepk = request.args.get("gamepk", type=int)
+    width = request.args.get("width", 60, type=int)
+    columns = request.args.get("columns")
+
+    if gamepk is None:
+        return {"error": "gamepk parameter is missing"}, 400
+    if width is None or width < 1 or width > TIMELINE_MAX_WIDTH:
+        return {"error": f"width must be 1-{TIMELINE_MAX_WIDTH}"}, 400
+    names = None
+    if columns:
+        names = [name for name in columns.split(",") if name]
+        unknown = [name for name in names if name not in COLUMN_NAMES]
+        if unknown:
+            return {"error": f"unknown columns: {', '.join(unknown)}"}, 400
+
+    try:
+        timeline = timelines.get(gamepk, build_timeline)
+    except Exception as e:
+        print(f"Error: {e}")
+        return {"error": str(e)}, 500
+    if timeline is None:
+        return {"error": "data is None"}, 404
+    return dict(timeline.to_json(width, names), gamepk=gamepk)
+
+# NOTE:gamepks=1,2,3(カンマ区切り・複数指定・JSONの配列)を数値のリストにする。重複は順序を保って除く
+def parse_gamepks(values):
+    if isinstance(values, (str, int)):
+        values = [values]
+    gamepks = []
+    for value in values:
+        for part in str(value).split(","):
+            if part.strip():
+                gamepks.append(int(part))
+    return list(dict.fromkeys(gamepks))
+
+# YYYY-MM-DD(両端含む) -> スケジュールAPIの日付(MM/DD/YYYY)
+# NOTE:期間指定のときは日付ごとにスケジュールを引き、分かった順に gamePk を流す(全部揃うまで待たない)
+# NOTE:日をまたいで同じ gamePk が出てきても(サスペンデッドゲームの再開など)1回だけ返す
+# スケジュールが取れなかった日は、その日のエラー行(完了済みの Future)を返す
+def iter_scheduled_gamepks(dates):
+    # requests を起動時に読み込まないよう、使うときに import する
+    from preprocess.crawler import Crawler
+    crawler = Crawler()
+    seen = set()
+    with ThreadPoolExecutor(max_workers=min(BATCH_CONCURRENCY, len(dates))) as executor:
+        for date, gamepks in zip(dates, executor.map(crawler.fetch_schedule, dates)):
+            if gamepks is None:
+                yield schedule_error(date)
+                continue
+            for gamepk in gamepks:
+                if gamepk not in seen:
+                    seen.add(gamepk)
+                    yield gamepk
+
+def schedule_error(date):
+    future = Future()
+    date = datetime.strptime(date, "%m/%d/%Y").strftime("%Y-%m-%d")
+    line = json.dumps({"date": date, "error": "schedule fetch failed"}, ensure_ascii=False).encode("utf-8") + b"\n"
+    future.set_result((line, False))
+    return future
+
+# 1試合分の NDJSON の行。保存済みの結果はシリアライズ済みの bytes をそのまま埋め込む
+def batch_line(gamepk, result=None, error=None):
+    if error is None and result is None:
+        error = "data is None"
+    if error is not None:
+        return json.dumps({"gamepk": gamepk, "error": error}, ensure_ascii=False).encode("utf-8") + b"\n", False
+    return b'{"gamepk":%d,"data":' % gamepk + result.body + b"}\n", True
+
+def fetch_batch_line(gamepk):
+    try:
+        return batch_line(gamepk, get_results_store().get_or_compute(gamepk, compute_with_timeout))
+    except TimeoutError:
+        return batch_line(gamepk, error="timeout")
+    except Exception as e:
+        print(f"Error: {gamepk}: {e}")
+        return batch_line(gamepk, error=str(e))
+
+# NOTE:同時に BATCH_CONCURRENCY 試合まで計算し、終わった順に1行ずつ返す。最後の行は件数のまとめ
+# クライアントが途中で切断したら(GeneratorExit)、まだ始まっていない試合は取り消す
+# gamepks には完了済みの Future(スケジュールが取れなかった日のエラー行)も混ぜてよい。エラーとして数える
+def stream_batch(gamepks):
+    executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY)
+    source = iter(gamepks)
+    pending = set()
+    exhausted = False
+    count = 0
+    errors = 0
+    try:
+        while True:
+            while not exhausted and len(pending) < BATCH_CONCURRENCY:
+                gamepk = next(source, None)
+                if gamepk is None:
+                    exhausted = True
+                elif isinstance(gamepk, Future):
+                    pending.add(gamepk)
+                else:
+                    pending.add(executor.submit(fetch_batch_line, gamepk))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                line, ok = future.result()
+                count += 1
+                errors += not ok
+                yield line
+        yield json.dumps({"done": True, "count": count, "errors": errors}).encode("utf-8") + b"\n"
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# 行ごとに flush して、圧縮しても1試合ずつクライアントに届くようにする
+def compress_stream(lines, encoding):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=5)
+        for line in lines:
+            yield compressor.process(line) + compressor.flush()
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for line in lines:
+        yield compressor.compress(line) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+# NOTE:複数試合の結果を NDJSON(1行1試合、終わった順)で返す。試合は gamepks か start/end(YYYY-MM-DD)で指定する
+# GET のクエリでも、POST の JSON({"gamepks": [...]} / {"start": ..., "end": ...})でもよい
+@app.route("/api/clusterVisualization/logistic-regression-data/batch", methods=["GET", "POST"])
+def get_logistic_regression_data_batch():
+    params = request.get_json(silent=True) if request.method == "POST" else None
+    if not isinstance(params, dict):
+        params = {}
+    gamepks = params.get("gamepks") or request.args.getlist("gamepks")
+    start = params.get("start") or request.args.get("start")
+    end = params.get("end") or request.args.get("end") or start
+
+    try:
+        if gamepks:
+            gamepks = parse_gamepks(gamepks)
+            if len(gamepks) > BATCH_MAX_GAMES:
+                return {"error": f"too many games (max {BATCH_MAX_GAMES})"}, 400
+        elif start:
+            # requests を起動時に読み込まないよう、使うときに import する
+            from preprocess.crawler import date_range
+            gamepks = iter_scheduled_gamepks(date_range(start, end, BATCH_MAX_DAYS))
+        else:
+            return {"error": "gamepks or start/end parameter is missing"}, 400
+    except (TypeError, ValueError) as e:
+        return {"error": str(e)}, 400
+
+    lines = stream_batch(gamepks)
+    encoding = accepted_encoding()
+    if encoding is not None:
+        lines = compress_stream(lines, encoding)
+    response = app.response_class(stream_with_context(lines), mimetype="application/x-ndjson")
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.cache_control.no_cache = True
+    # NOTE:リバースプロキシ(nginx)にバッファリングさせない
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+# NOTE:試合中の1分ごとの盛り上がり度・確率を SSE で送る。接続直後に snapshot(今までの全分)、
+# 以降は変わった分だけ points、試合が終わったら final を送って閉じる
+# 1接続がリクエストスレッドを1本使うので、同時接続数は serve.py の --threads に合わせて増やす
+@app.get("/api/clusterVisualization/live-excitement")
+def get_live_excitement():
+    gamepk = request.args.get("gamepk", type=int)
+    if gamepk is None:
+        return {"error": "gamepk parameter is missing"}, 400
+
+    subscription = live_feeds.subscribe(gamepk)
+
+    def events():
+        try:
+            yield from subscription.messages()
+        finally:
+            live_feeds.unsubscribe(subscription)
+
+    response = app.response_class(stream_with_context(events()), mimetype="text/event-stream")
+    response.cache_control.no_cache = True
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@app.get("/api/clusterVisualization/live-excitement/stats")
+def get_live_excitement_stats():
+    return live_feeds.stats()
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=3000, debug=True)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=3000, debug=True)
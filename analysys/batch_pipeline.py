@@ -0,0 +1,165 @@
+# 日付範囲(もしくはgamepkのリスト)をまとめてロジスティック回帰まで流すバッチ処理
+# 試合ごとの処理をプロセスプールに分散し、結果は1つのJSONにまとめる
+
+import json
+import io
+import time
+import argparse
+import contextlib
+import sys
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysys.data_collection.time_data_sellecting import time_data_sellecting
+from analysys.logistic_regression_analysis.Logistic_regression_analysis import Logistic_regression_analysis
+from preprocess.data_process_for_ra import get_scores
+from preprocess.data_processor import data_download, process_data, process_data_file
+from preprocess.raw_cache import get_raw_cache
+from preprocess.crawler import date_range, fetch_season_gamepks
+from preprocess.profiling import profiler, profile_dump
+
+STAGES = ["download", "process_data", "get_scores", "time_data_sellecting", "logistic_regression"]
+
+def score_game(gamepk):
+    timings = {}
+
+    def timed(stage, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    # NOTE:各段のprintはシーズン分だと大量になるので捨てる
+    with contextlib.redirect_stdout(io.StringIO()):
+        # NOTE:キャッシュ済みの終了した試合はフィード全体を読み込まず、ファイルから1打席ずつ処理する
+        path = get_raw_cache().path(gamepk)
+        if path is not None:
+            processed_data = timed("process_data", process_data_file, path)
+        else:
+            raw_data = timed("download", data_download, gamepk)
+            if raw_data is None:
+                return gamepk, None, timings, "download failed"
+            processed_data = timed("process_data", process_data, raw_data)
+            del raw_data
+        match_data = timed("get_scores", get_scores, processed_data)
+        molded_data = timed("time_data_sellecting", time_data_sellecting, gamepk, match_data)
+        result = timed("logistic_regression", Logistic_regression_analysis, gamepk, molded_data, False)
+    return gamepk, result, timings, None
+
+# NOTE:プロセス間のやりとりを減らすため、数試合まとめて1単位で投げる
+# NOTE:ワーカー側の計測(profiling)は chunk ごとに差分を返して親でまとめる
+def score_chunk(gamepks):
+    results = []
+    for gamepk in gamepks:
+        try:
+            results.append(score_game(gamepk))
+        except Exception as e:
+            results.append((gamepk, None, {}, str(e)))
+    snapshot = profiler.snapshot()
+    profiler.reset()
+    return results, snapshot
+
+def summarize_timings(all_timings):
+    summary = {}
+    for stage in STAGES:
+        values = np.array([t[stage] for t in all_timings if stage in t])
+        if len(values) == 0:
+            continue
+        summary[stage] = {
+            "total_s": float(values.sum()),
+            "mean_ms": float(values.mean() * 1000),
+            "p50_ms": float(np.percentile(values, 50) * 1000),
+            "p99_ms": float(np.percentile(values, 99) * 1000),
+            "max_ms": float(values.max() * 1000),
+        }
+    return summary
+
+def run_batch(gamepks, workers=None, chunk_size=4, output_path=None):
+    workers = workers or os.cpu_count()
+    chunks = [gamepks[i:i + chunk_size] for i in range(0, len(gamepks), chunk_size)]
+
+    games = {}
+    failed = {}
+    all_timings = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(score_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            results, snapshot = future.result()
+            profiler.merge(snapshot)
+            for gamepk, result, timings, error in results:
+                all_timings.append(timings)
+                if error is not None:
+                    failed[str(gamepk)] = error
+                else:
+                    games[str(gamepk)] = result
+    wall = time.perf_counter() - start
+
+    report = {
+        "games": len(gamepks),
+        "succeeded": len(games),
+        "failed": len(failed),
+        "workers": workers,
+        "chunk_size": chunk_size,
+        "wall_s": wall,
+        "games_per_s": len(games) / wall if wall > 0 else 0.0,
+        "stages": summarize_timings(all_timings),
+    }
+
+    # NOTE:結果は入力順に並べて1ファイルに出す
+    artifact = {
+        "report": report,
+        "games": {str(pk): games[str(pk)] for pk in gamepks if str(pk) in games},
+        "failed": failed,
+    }
+    if output_path is not None:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(artifact, f, ensure_ascii=False)
+    return artifact
+
+def print_report(report):
+    print(f"{report['succeeded']}/{report['games']} games, {report['wall_s']:.1f}s, {report['games_per_s']:.2f} games/s ({report['workers']} workers)")
+    for stage, s in report["stages"].items():
+        print(f"  {stage:<22} mean {s['mean_ms']:8.1f} ms  p50 {s['p50_ms']:8.1f} ms  p99 {s['p99_ms']:8.1f} ms  total {s['total_s']:7.1f} s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--start", help="YYYY-MM-DD")
+    parser.add_argument("--end", help="YYYY-MM-DD")
+    parser.add_argument("--gamepks", type=int, nargs="*")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=4)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--profile", help="cProfile(.prof) / pyinstrument(.html) の出力先(親プロセスのみ)")
+    parser.add_argument("--profile-report", nargs="?", const="", help="段ごとの時間とカウンタを JSON に残す(パス省略時は PROFILE_DIR=data/profiling の下)")
+    args = parser.parse_args()
+
+    if args.gamepks:
+        gamepks = args.gamepks
+        name = f"{gamepks[0]}-{gamepks[-1]}"
+    elif args.start:
+        # NOTE:--end を省いたら --start の1日だけ
+        end = args.end or args.start
+        try:
+            date_range(args.start, end)
+        except ValueError as e:
+            parser.error(f"--start / --end: {e}")
+        gamepks = fetch_season_gamepks(args.start, end)
+        name = f"{args.start}-{end}"
+    else:
+        parser.error("--gamepks か --start(/--end)を指定してください")
+    output_path = args.output or f"data/batch/{name}_logistic_regression_analysis_data.json"
+
+    with profile_dump(args.profile):
+        artifact = run_batch(gamepks, args.workers, args.chunk_size, output_path)
+    print_report(artifact["report"])
+    print(f"保存完了：{output_path}")
+    # NOTE:ファイルに残すのは --profile-report を付けたときだけ
+    if args.profile_report is not None:
+        print(f"計測結果：{profiler.write_report('batch', {'gamepks': len(gamepks)}, args.profile_report or None)}")
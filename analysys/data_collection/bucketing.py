@@ -0,0 +1,93 @@
+import sys
+import os
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# NOTE:イベントは配列に1回だけ持ち、各バケット(1分など)に含まれるイベントは
+# CSR形式(offsets[b]:offsets[b+1] が indices の範囲)で表す。
+# イベント [start, end] はバケット k の区間 [k*step, k*step + width) と重なれば含まれる
+# (width == step == 60秒 のとき time_data_sellecting の start//60 〜 end//60 と同じ)
+
+class IntervalBuckets:
+    def __init__(self, start_ms, end_ms, width_ms=60000, step_ms=None, origin_ms=None):
+        start_ms = np.asarray(start_ms, dtype=np.int64)
+        end_ms = np.asarray(end_ms, dtype=np.int64)
+        step_ms = width_ms if step_ms is None else step_ms
+        if origin_ms is None:
+            origin_ms = int(start_ms.min()) if len(start_ms) else 0
+        self.width_ms = width_ms
+        self.step_ms = step_ms
+        self.origin_ms = origin_ms
+
+        # NOTE:秒に直してから割る(time_data_sellecting の (end - start).total_seconds() // 60 と同じ丸め)
+        rel_start = (start_ms - origin_ms) / 1000
+        rel_end = (end_ms - origin_ms) / 1000
+        width_s = width_ms / 1000
+        step_s = step_ms / 1000
+        if width_ms == step_ms:
+            first = np.floor(rel_start / step_s).astype(np.int64)
+        else:
+            # スライディングウィンドウ: k*step + width > start となる最小の k
+            first = (np.floor((rel_start - width_s) / step_s) + 1).astype(np.int64)
+        last = np.floor(rel_end / step_s).astype(np.int64)
+        self.first = first
+        self.last = last
+
+        lengths = np.clip(last - first + 1, 0, None)
+        total = int(lengths.sum())
+        event_idx = np.repeat(np.arange(len(first), dtype=np.int32), lengths)
+        # 各イベント内での何番目のバケットか
+        within = np.arange(total, dtype=np.int64) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        bucket = np.repeat(first, lengths) + within
+
+        self.min_bucket = int(bucket.min()) if total else 0
+        n_buckets = int(bucket.max()) - self.min_bucket + 1 if total else 0
+        # NOTE:stable ソートなのでバケット内はイベント順のまま
+        order = np.argsort(bucket, kind="stable")
+        self.indices = event_idx[order]
+        counts = np.bincount(bucket - self.min_bucket, minlength=n_buckets)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        # イベント順に走査したときに各バケットが初めて現れる順(defaultdict の挿入順と同じ)
+        if total:
+            seen = np.full(n_buckets, total, dtype=np.int64)
+            np.minimum.at(seen, bucket - self.min_bucket, np.arange(total))
+            nonempty = np.flatnonzero(counts)
+            self.appearance = nonempty[np.argsort(seen[nonempty], kind="stable")] + self.min_bucket
+        else:
+            self.appearance = np.array([], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def events_in(self, bucket):
+        b = bucket - self.min_bucket
+        if b < 0 or b >= len(self):
+            return self.indices[:0]
+        return self.indices[self.offsets[b]:self.offsets[b + 1]]
+
+    def counts(self):
+        return np.diff(self.offsets)
+
+    # 空でないバケットを初出順に (バケット番号, イベントのインデックス配列) で返す
+    def items(self):
+        for bucket in self.appearance:
+            yield int(bucket), self.events_in(int(bucket))
+
+    def bucket_start_ms(self, bucket):
+        return self.origin_ms + bucket * self.step_ms
+
+    # NOTE:JSON保存用(イベント本体とは別に、インデックスだけを持つ)
+    def to_dict(self):
+        return {
+            "width_ms": self.width_ms,
+            "step_ms": self.step_ms,
+            "origin_ms": self.origin_ms,
+            "min_bucket": self.min_bucket,
+            "offsets": self.offsets.tolist(),
+            "indices": self.indices.tolist(),
+            "appearance": self.appearance.tolist(),
+        }
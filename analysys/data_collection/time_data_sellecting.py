@@ -1,68 +1,72 @@
 import json
 from datetime import datetime, timedelta
-from collections import defaultdict
 import sys
 import os
 
 # プロジェクトルートをパスに追加
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-# ^^^ gamepkの指定 ---
-gamepk = "777866"
-# --- JSONファイルの読み込み ---
-with open(f"data/processed_for_ra/{gamepk}_processed_for_ra_data.json", encoding="utf-8") as f:
-    match_data = json.load(f)
+from preprocess.calculate.measure_time import event_time_ms, epoch_ms_to_datetime
+from analysys.data_collection.bucketing import IntervalBuckets
+from preprocess.profiling import timed
 
 # --- 開始・終了時刻の取得 ---
 def parse_time(t):
     return datetime.fromisoformat(t.replace("Z", "+00:00"))
 
-def time_data_sellecting(gamepk,match_data):
-    # 全打席を走査して、最小・最大時間を取得
-    all_start_times = []
-    all_end_times = []
+# NOTE:process_data でパース済みのエポックミリ秒があればそれを使う(無ければ文字列からパース)
+# NOTE:イベントは1回だけ持ち、バケット(既定は1分)への所属は IntervalBuckets のインデックスで表す版
+# width_s / step_s を変えれば任意の幅・スライディングウィンドウにできる
+def time_data_bucketing(gamepk,match_data,width_s=60,step_s=None):
+    starts = []
+    ends = []
     events = []
     for at_bat_id, event_group in match_data.items():
         for event_id, event in event_group.items():
-            start = parse_time(event["time"]["start_time"])
-            end = parse_time(event["time"]["end_time"])
-            all_start_times.append(start)
-            all_end_times.append(end)
+            starts.append(event_time_ms(event["time"], "start"))
+            ends.append(event_time_ms(event["time"], "end"))
             events.append({
-                "start": start,
-                "end": end,
                 "play_features": event["play_features"],
                 "situation_features": event["situation_features"],
                 "detail": event["detail"]
             })
 
-    start_time = min(all_start_times)
-    end_time = max(all_end_times)
-    total_duration = (end_time - start_time).total_seconds()
+    start_time = min(starts)
+    end_time = max(ends)
+    total_duration = (end_time - start_time) / 1000
+    buckets = IntervalBuckets(starts, ends, width_s * 1000, None if step_s is None else step_s * 1000, start_time)
 
-    # --- 1分単位に分割し、該当イベントを記録 ---
-    minute_events = defaultdict(list)
-    for event in events:
-        start_minute = int((event["start"] - start_time).total_seconds() // 60)
-        end_minute = int((event["end"] - start_time).total_seconds() // 60)
-        for minute in range(start_minute, end_minute + 1):
-            minute_events[minute].append({
-                "play_features": event["play_features"],
-                "situation_features": event["situation_features"],
-                "detail": event["detail"]
-            })
+    return {
+        "total_duration_minutes": int(total_duration // 60),
+        "start_time": epoch_ms_to_datetime(start_time).isoformat(),
+        "end_time": epoch_ms_to_datetime(end_time).isoformat(),
+        "events": events,
+        "buckets": buckets,
+    }
+
+# 従来の "minutes" 形式に展開する。各バケットのリストは同じイベントのdictを参照する(コピーしない)
+def expand_minutes(bucketed):
+    events = bucketed["events"]
+    return {str(bucket): [events[i] for i in idx] for bucket, idx in bucketed["buckets"].items()}
+
+# JSON保存用(イベント本体 + インデックス)
+def bucketed_to_json(bucketed):
+    output = dict(bucketed)
+    output["buckets"] = bucketed["buckets"].to_dict()
+    return output
+
+@timed("time_data_sellecting")
+def time_data_sellecting(gamepk,match_data):
+    bucketed = time_data_bucketing(gamepk,match_data)
 
     # --- 出力用に整形 ---
     output = {
-        "total_duration_minutes": int(total_duration // 60),
-        "start_time": start_time.isoformat(),
-        "end_time": end_time.isoformat(),
-        "minutes": {},
+        "total_duration_minutes": bucketed["total_duration_minutes"],
+        "start_time": bucketed["start_time"],
+        "end_time": bucketed["end_time"],
+        "minutes": expand_minutes(bucketed),
     }
 
-    for minute, features in minute_events.items():
-        output["minutes"][str(minute)] = features
-
     # --- 保存 ---
     # with open(f"data/molded_data/{gamepk}_molded_data.json", "w", encoding="utf-8") as f:
     #     json.dump(output, f, indent=2, ensure_ascii=False)
@@ -70,3 +74,14 @@ def time_data_sellecting(gamepk,match_data):
     print(f"保存完了：{gamepk}_molded_data.json")
     
     return output
+
+# NOTE:import しただけでファイルを読まないよう、単体実行のときだけ読み込む
+if __name__ == "__main__":
+    # ^^^ gamepkの指定 ---
+    gamepk = sys.argv[1] if len(sys.argv) > 1 else "777866"
+    # --- 生データから前処理する(保存済みの processed_for_ra は古い形式のことがある) ---
+    from preprocess.data_processor import data_process
+    from preprocess.data_process_for_ra import data_process_for_ra
+    _, processed_data = data_process(gamepk)
+    match_data = data_process_for_ra(processed_data, gamepk)
+    time_data_sellecting(gamepk, match_data)
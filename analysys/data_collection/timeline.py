@@ -0,0 +1,117 @@
+import threading
+import sys
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from preprocess.feature_encoder import FEATURE_NAMES, encode_processed, encode_scores
+from preprocess.calculate.measure_time import event_time_ms, epoch_ms_to_datetime
+
+# NOTE:1試合のタイムラインを1秒単位で1回だけ作り、10秒/30秒/1分/5分などの集計は累積和の差で都度出す。
+# 値は「その区間でその特徴量が立っていたイベント秒数」。最後の列は区間内のイベント秒数(active)
+# 最近使った解像度は LRU で持っておく
+
+COLUMN_NAMES = FEATURE_NAMES + ["active"]
+
+class GameTimeline:
+    def __init__(self, start_ms, end_ms, X, origin_ms=None, cache_size=8):
+        start_ms = np.asarray(start_ms, dtype=np.int64)
+        end_ms = np.asarray(end_ms, dtype=np.int64)
+        if origin_ms is None:
+            # NOTE:イベントが無い試合は長さ0のタイムライン
+            origin_ms = int(start_ms.min()) if len(start_ms) else 0
+        self.origin_ms = origin_ms
+
+        # イベントが占める秒 [first, last](両端含む)
+        first = (start_ms - origin_ms) // 1000
+        last = np.maximum((end_ms - origin_ms) // 1000, first)
+        self.seconds = int(last.max()) + 1 if len(last) else 0
+
+        values = np.concatenate([X.astype(np.int32), np.ones((len(X), 1), dtype=np.int32)], axis=1)
+        # 差分配列 -> 累積和で1秒ごとの値、もう一度累積和で区間和用のprefix
+        diff = np.zeros((self.seconds + 1, values.shape[1]), dtype=np.int64)
+        np.add.at(diff, first, values)
+        np.add.at(diff, last + 1, -values)
+        per_second = np.cumsum(diff[:-1], axis=0)
+        self.prefix = np.concatenate([np.zeros((1, values.shape[1]), dtype=np.int64), np.cumsum(per_second, axis=0)])
+
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_scores(cls, scores_data, **kwargs):
+        X, keys = encode_scores(scores_data)
+        times = [scores_data[p][e]["time"] for p, e in keys]
+        return cls([event_time_ms(t, "start") for t in times], [event_time_ms(t, "end") for t in times], X, **kwargs)
+
+    @classmethod
+    def from_processed(cls, processed_data, **kwargs):
+        X, keys = encode_processed(processed_data)
+        times = [processed_data[p][e]["time"] for p, e in keys]
+        return cls([event_time_ms(t, "start") for t in times], [event_time_ms(t, "end") for t in times], X, **kwargs)
+
+    # NOTE:width_s 秒ごとの区間和 (bins, len(COLUMN_NAMES))
+    def rebin(self, width_s):
+        width_s = int(width_s)
+        if width_s < 1:
+            raise ValueError("width_s must be >= 1")
+        with self._lock:
+            if width_s in self._cache:
+                self._cache.move_to_end(width_s)
+                return self._cache[width_s]
+        edges = self.edges(width_s)
+        sums = self.prefix[edges[1:]] - self.prefix[edges[:-1]]
+        with self._lock:
+            self._cache[width_s] = sums
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return sums
+
+    # 区間の境界(秒)。最後の区間は試合の終わりで切る
+    def edges(self, width_s):
+        return np.minimum(np.arange(0, self.seconds + width_s, width_s), self.seconds)
+
+    # 区間内でその特徴量が立っていた時間の割合(長さ0の区間は0)
+    def coverage(self, width_s):
+        sums = self.rebin(width_s)
+        lengths = np.diff(self.edges(int(width_s)))[:, None]
+        return np.divide(sums, lengths, out=np.zeros(sums.shape, dtype=np.float64), where=lengths > 0)
+
+    def to_json(self, width_s, columns=None):
+        sums = self.rebin(width_s)
+        names = COLUMN_NAMES if columns is None else columns
+        idx = [COLUMN_NAMES.index(n) for n in names]
+        return {
+            "start_time": epoch_ms_to_datetime(self.origin_ms).isoformat(),
+            "width_s": int(width_s),
+            "columns": names,
+            "values": sums[:, idx].tolist(),
+        }
+
+# NOTE:試合ごとのタイムラインも LRU で持つ(フロントのズームで幅を変えるたびに作り直さない)
+# build(gamepk) は (timeline, cacheable) を返す。試合中など cacheable=False のものは持たない
+class TimelineCache:
+    def __init__(self, max_games=32):
+        self.max_games = max_games
+        self._timelines = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, gamepk, build):
+        key = str(gamepk)
+        with self._lock:
+            if key in self._timelines:
+                self._timelines.move_to_end(key)
+                return self._timelines[key]
+        timeline, cacheable = build(gamepk)
+        if timeline is None or not cacheable:
+            return timeline
+        with self._lock:
+            self._timelines[key] = timeline
+            while len(self._timelines) > self.max_games:
+                self._timelines.popitem(last=False)
+        return timeline
@@ -0,0 +1,244 @@
+# master/bb_evaluation_master.json の倍率で各イベント・各分の盛り上がり度を出す
+# マスタは読み込み時に1回だけ特徴量の列に対応する配列へ変換し、スコアは行列演算でまとめて出す
+
+import json
+import hashlib
+import threading
+import argparse
+import sys
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocess.feature_encoder import FEATURE_GROUPS, FEATURE_SLICES, FEATURE_NAMES, encode_processed, encode_store
+from preprocess.calculate.measure_time import event_time_ms, epoch_ms_to_datetime
+from analysys.data_collection.bucketing import IntervalBuckets
+
+MASTER_PATH = os.environ.get("BB_EVALUATION_MASTER", "master/bb_evaluation_master.json")
+
+# NOTE:マスタの runner_status は5区分なので、特徴量の8区分をどれに寄せるか
+# (得点圏に1人 -> second_or_third_only、2・3塁 -> second_and_third)
+RUNNER_STATUS_CATEGORY = {
+    "none": "none",
+    "first": "first_only",
+    "second": "second_or_third_only",
+    "third": "second_or_third_only",
+    "first-second": "second_or_third_only",
+    "first-third": "second_or_third_only",
+    "second-third": "second_and_third",
+    "first-second-third": "bases_loaded",
+}
+
+# 該当する列が1つも立っていないときの倍率(マスタにキーがあればそちらを使う)
+FALLBACK_KEY = {
+    "hit_event": "others",
+}
+
+INNING_PHASES = ["early", "middle", "late"]
+
+def inning_phase_index(inning):
+    # 1-3回: early, 4-6回: middle, 7回以降: late
+    return np.clip((np.asarray(inning, dtype=np.int64) - 1) // 3, 0, 2)
+
+class CompiledMaster:
+    def __init__(self, master, master_hash=None):
+        play = master.get("play_features", {})
+        situ = master.get("situation_features", {})
+        groups = {**play, **situ}
+
+        # 列ごとの倍率と、グループ内でどの列も立っていないときの倍率
+        self.weights = np.ones(len(FEATURE_NAMES), dtype=np.float64)
+        self.fallback = {}
+        for group, keys in FEATURE_GROUPS.items():
+            table = groups.get(group, {})
+            s = FEATURE_SLICES[group]
+            if group == "is_goahead_runner_on_base":
+                self.weights[s.start] = table.get("true", 1.0)
+                self.fallback[group] = table.get("false", 1.0)
+                continue
+            for i, key in enumerate(keys):
+                if group == "runner_status":
+                    key = RUNNER_STATUS_CATEGORY[key]
+                self.weights[s.start + i] = table.get(key, 1.0)
+            self.fallback[group] = table.get(FALLBACK_KEY.get(group), 1.0)
+
+        # NOTE:特徴量の inning_phase は inning >= 7 の1列だけなので、回が分かるときは3区分で引き直す
+        phase = groups.get("inning_phase", {})
+        self.inning_weights = np.array([phase.get(p, 1.0) for p in INNING_PHASES], dtype=np.float64)
+        self.hash = master_hash
+
+    # X: encode_* の出力 (n, 25)、inning: 各イベントの回(無ければ inning_phase 列で early/late)
+    def score(self, X, inning=None):
+        X = np.asarray(X)
+        scores = np.ones(len(X), dtype=np.float64)
+        for group, s in FEATURE_SLICES.items():
+            if group == "inning_phase":
+                continue
+            block = X[:, s]
+            hit = block.any(axis=1)
+            scores *= np.where(hit, block @ self.weights[s] / np.maximum(block.sum(axis=1), 1), self.fallback[group])
+        if inning is not None:
+            scores *= self.inning_weights[inning_phase_index(inning)]
+        else:
+            late = X[:, FEATURE_SLICES["inning_phase"].start].astype(bool)
+            scores *= np.where(late, self.inning_weights[2], self.inning_weights[0])
+        return scores
+
+# NOTE:ファイルの更新(mtime・サイズ)を見て、変わっていれば読み直す
+class ExcitementMaster:
+    def __init__(self, path=MASTER_PATH):
+        self.path = path
+        self._stat = None
+        self._compiled = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        st = os.stat(self.path)
+        stat = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if stat != self._stat:
+                with open(self.path, "rb") as f:
+                    body = f.read()
+                master_hash = hashlib.sha256(body).hexdigest()[:12]
+                if self._compiled is None or self._compiled.hash != master_hash:
+                    self._compiled = CompiledMaster(json.loads(body), master_hash)
+                self._stat = stat
+            return self._compiled
+
+# バケット(既定は1分)ごとに、含まれるイベントのスコアをまとめる
+def score_buckets(event_scores, start_ms, end_ms, width_s=60, reduce="max"):
+    if len(event_scores) == 0:
+        return np.zeros(0), 0
+    buckets = IntervalBuckets(start_ms, end_ms, width_s * 1000)
+    values = event_scores[buckets.indices]
+    counts = buckets.counts()
+    nonempty = counts > 0
+    ufunc = np.maximum if reduce == "max" else np.add
+    result = np.zeros(len(buckets), dtype=np.float64)
+    result[nonempty] = ufunc.reduceat(values, buckets.offsets[:-1][nonempty])
+    if reduce == "mean":
+        result[nonempty] /= counts[nonempty]
+    return result, buckets.origin_ms
+
+def to_result(gamepk, master_hash, keys, event_scores, minute_scores, origin_ms):
+    return {
+        "gamepk": str(gamepk),
+        "master_hash": master_hash,
+        "start_time": epoch_ms_to_datetime(origin_ms).isoformat() if len(keys) else None,
+        "keys": keys,
+        "event_scores": event_scores,
+        "minute_scores": minute_scores,
+    }
+
+def result_to_json(result):
+    return {
+        "gamepk": result["gamepk"],
+        "master_hash": result["master_hash"],
+        "start_time": result["start_time"],
+        "events": {f"{p}-{e}": round(float(s), 4) for (p, e), s in zip(result["keys"], result["event_scores"])},
+        "minutes": {str(m): round(float(s), 4) for m, s in enumerate(result["minute_scores"])},
+    }
+
+# NOTE:結果は (gamepk, マスタのハッシュ) で LRU に持つ。マスタが変われば別キーになる
+class ExcitementScorer:
+    def __init__(self, master=None, cache_size=64, width_s=60, reduce="max"):
+        self.master = master or ExcitementMaster()
+        self.cache_size = cache_size
+        self.width_s = width_s
+        self.reduce = reduce
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, key):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        return None
+
+    def _store(self, key, result):
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # process_data の出力(1試合)から
+    # NOTE:試合中(ライブ)のように同じ gamepk でも中身が増えていく場合は cache=False で呼ぶ
+    def score_processed(self, gamepk, processed_data, cache=True):
+        compiled = self.master.get()
+        key = (str(gamepk), compiled.hash)
+        result = self._cached(key) if cache else None
+        if result is not None:
+            return result
+
+        X, keys = encode_processed(processed_data)
+        events = [processed_data[p][e] for p, e in keys]
+        inning = np.array([event["inning"] for event in events], dtype=np.int64)
+        event_scores = compiled.score(X, inning)
+        minute_scores, origin_ms = score_buckets(
+            event_scores,
+            [event_time_ms(event["time"], "start") for event in events],
+            [event_time_ms(event["time"], "end") for event in events],
+            self.width_s, self.reduce,
+        )
+        result = to_result(gamepk, compiled.hash, keys, event_scores, minute_scores, origin_ms)
+        if cache:
+            self._store(key, result)
+        return result
+
+    # EventStore(シーズン分など複数試合)から。全イベントを1回の行列演算で出して試合ごとに分ける
+    def score_store(self, store):
+        compiled = self.master.get()
+        X, rows = encode_store(store)
+        event_scores = compiled.score(X, store["inning"][rows])
+        gamepks = store["gamepk"][rows]
+
+        results = {}
+        bounds = np.flatnonzero(np.diff(gamepks)) + 1
+        for s, e in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(rows)]])):
+            if s == e:
+                continue
+            gamepk = str(int(gamepks[s]))
+            key = (gamepk, compiled.hash)
+            result = self._cached(key)
+            if result is None:
+                r = rows[s:e]
+                minute_scores, origin_ms = score_buckets(
+                    event_scores[s:e], store["start_ms"][r], store["end_ms"][r], self.width_s, self.reduce
+                )
+                keys = [(str(p), str(e)) for p, e in zip(store["play_idx"][r].tolist(), store["event_idx"][r].tolist())]
+                result = to_result(gamepk, compiled.hash, keys, event_scores[s:e], minute_scores, origin_ms)
+                self._store(key, result)
+            results[gamepk] = result
+        return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("gamepk", nargs="?")
+    parser.add_argument("--store", help="preprocess/main.py --event-store で保存したシーズン分の EventStore(全試合をまとめて計算する)")
+    parser.add_argument("--master", default=MASTER_PATH)
+    parser.add_argument("--width", type=int, default=60, help="集計の幅(秒)")
+    parser.add_argument("--reduce", choices=["max", "sum", "mean"], default="max")
+    args = parser.parse_args()
+    if args.gamepk is None and args.store is None:
+        parser.error("gamepk か --store のどちらかを指定してください")
+
+    scorer = ExcitementScorer(ExcitementMaster(args.master), width_s=args.width, reduce=args.reduce)
+    if args.store:
+        from preprocess.event_store import EventStore
+        results = scorer.score_store(EventStore.load(args.store))
+        if args.gamepk is not None:
+            print(json.dumps(result_to_json(results[str(args.gamepk)]), ensure_ascii=False, indent=2))
+        else:
+            # NOTE:試合ごとの最大・平均だけ出す
+            for gamepk, result in results.items():
+                minute_scores = np.asarray(result["minute_scores"])
+                print(f"{gamepk}  minutes {len(minute_scores):4d}  max {minute_scores.max():8.3f}  mean {minute_scores.mean():8.3f}")
+    else:
+        with open(f"data/processed/{args.gamepk}_processed_data.json", encoding="utf-8") as f:
+            processed_data = json.load(f)
+        print(json.dumps(result_to_json(scorer.score_processed(args.gamepk, processed_data)), ensure_ascii=False, indent=2))
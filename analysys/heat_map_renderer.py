@@ -0,0 +1,200 @@
+# 試合ごとの盛り上がり度のヒートマップ(タイムライン)を画面なしでまとめて描き、PNG / SVG に書き出す
+# 1試合は (start, width, score) の配列から PolyCollection 1つで描く(preprocess/heat_map.draw_timeline)。
+# pyplot は使わず Figure + Agg のキャンバスで描くので、ワーカープロセスで並列に回せる
+# 出力は data/heat_maps/<スコアのバージョン>/<gamepk>.<形式>。同じバージョンで描いた試合は描き直さない
+#
+# 例: python analysys/heat_map_renderer.py 777708 777709 --format png svg
+#     python analysys/heat_map_renderer.py --start 2025-03-27 --end 2025-09-28 --workers 4
+#     python analysys/heat_map_renderer.py --all-cached
+
+import argparse
+import io
+import time
+import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocess.heat_map import proportional_layout, normalize_scores, draw_timeline
+from preprocess.raw_cache import atomic_write, cached_gamepks
+from preprocess.profiling import profiler, stage, count
+
+HEAT_MAP_DIR = os.environ.get("HEAT_MAP_DIR", "data/heat_maps")
+# NOTE:描き方(レイアウト・色・サイズ)を変えたら上げる。スコアのバージョン(マスタのハッシュ)と合わせて出力先のディレクトリ名になる
+RENDER_VERSION = "hm-1"
+FORMATS = ["png", "svg"]
+LAYOUTS = ["proportional", "clock"]
+HALVES = ["all", "top", "bottom"]
+
+def score_version(master_hash, layout="proportional", half="all"):
+    return f"{RENDER_VERSION}-{master_hash}-{layout}-{half}"
+
+def output_path(gamepk, version, fmt, output_dir=HEAT_MAP_DIR):
+    return os.path.join(output_dir, version, f"{gamepk}.{fmt}")
+
+def is_rendered(gamepk, version, formats, output_dir=HEAT_MAP_DIR):
+    return all(os.path.exists(output_path(gamepk, version, fmt, output_dir)) for fmt in formats)
+
+# NOTE:ExcitementScorer の結果から (start, width, score) の配列を作る
+# proportional: イベントの長さだけを 0〜1 に詰めて並べる(preprocess/heat_map.py と同じ)
+# clock: 試合開始からの実際の時刻の位置に置く(イベント間の空きもそのまま)
+def game_timeline(processed_data, result, layout="proportional", half="all"):
+    events = [processed_data[p][e] for p, e in result["keys"]]
+    scores = np.asarray(result["event_scores"], dtype=np.float64)
+    start_ms = np.array([event["time"]["start_ms"] for event in events], dtype=np.float64)
+    end_ms = np.array([event["time"]["end_ms"] for event in events], dtype=np.float64)
+    if half != "all":
+        # NOTE:is_away(表の攻撃) = 表
+        is_top = np.array([event["is_away"] for event in events], dtype=bool)
+        keep = is_top if half == "top" else ~is_top
+        scores, start_ms, end_ms = scores[keep], start_ms[keep], end_ms[keep]
+
+    durations = np.clip(end_ms - start_ms, 0, None)
+    if layout == "clock" and len(start_ms):
+        span = max(end_ms.max() - start_ms.min(), 1.0)
+        starts = (start_ms - start_ms.min()) / span
+        widths = durations / span
+    else:
+        starts, widths = proportional_layout(durations)
+    return starts, widths, scores
+
+# 1試合分を描いて、形式ごとの bytes を返す
+def render_timeline(starts, widths, scores, title, formats=FORMATS, figsize=(10, 2), dpi=100, norm_scores=True):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    draw_timeline(ax, starts, widths, normalize_scores(scores) if norm_scores else scores)
+    ax.set_xlim(0, 1)
+    ax.set_yticks([])
+    ax.set_title(title)
+    ax.margins(x=0)
+    fig.tight_layout()
+
+    outputs = {}
+    for fmt in formats:
+        buf = io.BytesIO()
+        fig.savefig(buf, format=fmt, dpi=dpi)
+        outputs[fmt] = buf.getvalue()
+    return outputs
+
+# NOTE:ワーカーごとに1つ(マスタの読み込みと変換はプロセスごとに1回)
+_scorer = None
+
+def get_scorer():
+    global _scorer
+    if _scorer is None:
+        from analysys.excitement_scorer import ExcitementScorer
+        _scorer = ExcitementScorer(cache_size=1)
+    return _scorer
+
+def render_game(gamepk, formats=FORMATS, layout="proportional", half="all", output_dir=HEAT_MAP_DIR, force=False):
+    from preprocess.data_processor import data_download, process_data
+
+    scorer = get_scorer()
+    version = score_version(scorer.master.get().hash, layout, half)
+    if not force and is_rendered(gamepk, version, formats, output_dir):
+        count("heat_map_cached")
+        return gamepk, "cached"
+
+    raw_data = data_download(gamepk)
+    if raw_data is None:
+        return gamepk, "download failed"
+    processed_data = process_data(raw_data)
+    result = scorer.score_processed(gamepk, processed_data, cache=False)
+    starts, widths, scores = game_timeline(processed_data, result, layout, half)
+    if len(scores) == 0:
+        return gamepk, "no events"
+
+    teams = raw_data.get("gameData", {}).get("teams", {})
+    date = raw_data.get("gameData", {}).get("datetime", {}).get("officialDate", "")
+    title = f"{gamepk} {teams.get('away', {}).get('abbreviation', '')} @ {teams.get('home', {}).get('abbreviation', '')} {date}".strip()
+    with stage("render"):
+        outputs = render_timeline(starts, widths, scores, title, formats)
+    os.makedirs(os.path.join(output_dir, version), exist_ok=True)
+    for fmt, body in outputs.items():
+        atomic_write(output_path(gamepk, version, fmt, output_dir), body)
+    count("heat_map_rendered")
+    return gamepk, "rendered"
+
+# NOTE:1試合の失敗(壊れたフィードなど)で同じ塊の他の試合の結果まで失わないよう、試合ごとに例外を受け止める
+def render_game_safe(gamepk, *args):
+    try:
+        return render_game(gamepk, *args)
+    except Exception as e:
+        return gamepk, f"error: {e}"
+
+def render_chunk(gamepks, formats, layout, half, output_dir, force):
+    profiler.reset()
+    results = [render_game_safe(gamepk, formats, layout, half, output_dir, force) for gamepk in gamepks]
+    return results, profiler.snapshot()
+
+# NOTE:描き済みの試合は親プロセスで先に除き、残りを chunk_size 試合ずつワーカーに渡す
+def render_games(gamepks, formats=FORMATS, layout="proportional", half="all", output_dir=HEAT_MAP_DIR, workers=None, chunk_size=8, force=False):
+    version = score_version(get_scorer().master.get().hash, layout, half)
+    todo = [pk for pk in gamepks if force or not is_rendered(pk, version, formats, output_dir)]
+    pending = set(todo)
+    statuses = {pk: "cached" for pk in gamepks if pk not in pending}
+
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+    workers = workers or os.cpu_count()
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            statuses.update(render_game_safe(pk, formats, layout, half, output_dir, force) for pk in chunk)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(render_chunk, chunk, formats, layout, half, output_dir, force) for chunk in chunks]
+            for future in futures:
+                results, snapshot = future.result()
+                statuses.update(results)
+                profiler.merge(snapshot)
+    return version, statuses
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("gamepks", nargs="*", type=int)
+    parser.add_argument("--start", help="YYYY-MM-DD(スケジュールから終了済みの試合を取る)")
+    parser.add_argument("--end", help="YYYY-MM-DD")
+    parser.add_argument("--all-cached", action="store_true", help="data/raw/game と生フィードのキャッシュにある試合を全部描く")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=["png"])
+    parser.add_argument("--layout", choices=LAYOUTS, default="proportional")
+    parser.add_argument("--half", choices=HALVES, default="all")
+    parser.add_argument("--output-dir", default=HEAT_MAP_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=8)
+    parser.add_argument("--force", action="store_true", help="描き済みでも描き直す")
+    args = parser.parse_args()
+
+    gamepks = list(args.gamepks)
+    if args.start:
+        from preprocess.crawler import fetch_season_gamepks
+        gamepks += fetch_season_gamepks(args.start, args.end or args.start)
+    if args.all_cached:
+        gamepks += cached_gamepks()
+    gamepks = list(dict.fromkeys(gamepks))
+    if not gamepks:
+        parser.error("gamepks, --start/--end, --all-cached のどれかを指定してください")
+
+    start = time.perf_counter()
+    version, statuses = render_games(gamepks, args.format, args.layout, args.half, args.output_dir, args.workers, args.chunk_size, args.force)
+    elapsed = time.perf_counter() - start
+
+    summary = {}
+    for status in statuses.values():
+        # NOTE:"error: <内容>" は error としてまとめて数える(内容は下の一覧に出す)
+        status = status.split(":")[0]
+        summary[status] = summary.get(status, 0) + 1
+    rendered = summary.get("rendered", 0)
+    print(f"{len(gamepks)} games in {elapsed:.2f}s -> {os.path.join(args.output_dir, version)}")
+    print("  " + ", ".join(f"{status}: {n}" for status, n in sorted(summary.items())))
+    if rendered:
+        print(f"  {elapsed / rendered * 1000:.1f} ms/game rendered")
+    for gamepk, status in statuses.items():
+        if status not in ("rendered", "cached"):
+            print(f"  {gamepk}: {status}")
@@ -0,0 +1,264 @@
+# 試合中の gamePk をバックグラウンドでポーリングし、1分ごとの盛り上がり度・ハイライト確率の更新を購読者に配る(SSE)
+# 1試合につきポーリングするスレッドは1本だけで、購読者が何人いても取得・計算は1回。結果を各購読者のキューに配る
+#
+#   manager = LiveFeedManager(model_loader=get_model)
+#   subscription = manager.subscribe(gamepk)
+#   for message in subscription.messages(): ...   # SSE の bytes
+#   manager.unsubscribe(subscription)
+#
+# NOTE:LiveFeedManager はプロセスごとに持つ。gunicorn を複数ワーカー(serve.py の既定は --workers 2)で動かすと、
+# 同じ試合をワーカーの数だけ別々にポーリングし、SSE の id(連番)もワーカーごとにずれる。
+# 試合中の配信を1本にまとめたいときは --workers 1 で起動する(同時接続は --threads で増やす)
+
+import json
+import queue
+import threading
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocess.data_processor import IncrementalProcessor, API_BASE_URL
+from preprocess.data_process_for_ra import get_scores
+from preprocess.raw_cache import is_final
+from preprocess.calculate.measure_time import epoch_ms_to_datetime
+from preprocess.profiling import stage, count
+from analysys.data_collection.time_data_sellecting import time_data_bucketing, expand_minutes
+
+# NOTE:ポーリング間隔(秒)。フィードの metaData.wait(MLB の推奨間隔)の方が長ければそちらに合わせる
+LIVE_POLL_INTERVAL = float(os.environ.get("LIVE_POLL_INTERVAL", 10))
+# 購読者ごとに溜める未送信メッセージの上限。溢れた(読むのが遅い)購読者は切断する(再接続すればスナップショットから取り直せる)
+SUBSCRIBER_QUEUE_SIZE = 256
+# 何も送るものがないときにコメント行を送る間隔(秒)。プロキシにアイドル切断されないように
+HEARTBEAT_INTERVAL = 15
+
+def format_sse(event, data, event_id=None):
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append("data: " + json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+HEARTBEAT = b": keep-alive\n\n"
+
+# NOTE:process_data → get_scores → バケット(1分) → 盛り上がり度(ExcitementScorer)と確率(学習済みモデル)
+# 戻り値は {分: {"minute", "time", "events", "excitement", "prob"}}。モデルが無ければ prob は None
+def score_live(gamepk, event_lookup, scorer, model=None):
+    if not any(event_lookup.values()):
+        return {}
+    scores_data = get_scores(event_lookup)
+    bucketed = time_data_bucketing(gamepk, scores_data)
+    minutes = expand_minutes(bucketed)
+    excitement = scorer.score_processed(gamepk, event_lookup, cache=False)["minute_scores"]
+
+    probs = None
+    if model is not None:
+        from analysys.logistic_regression_analysis.model_registry import score_molded
+        probs = [v["prob"] for v in score_molded(model, {"minutes": minutes}).values()]
+
+    buckets = bucketed["buckets"]
+    points = {}
+    for v_idx, (minute, events) in enumerate(minutes.items()):
+        m = int(minute)
+        points[m] = {
+            "minute": m,
+            "time": epoch_ms_to_datetime(buckets.bucket_start_ms(m)).isoformat(),
+            "events": len(events),
+            "excitement": round(float(excitement[m - buckets.min_bucket]), 4),
+            "prob": None if probs is None else round(float(probs[v_idx]), 4),
+        }
+    return points
+
+class Subscription:
+    __slots__ = ("gamepk", "queue", "closed")
+
+    def __init__(self, gamepk):
+        self.gamepk = gamepk
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.closed = False
+
+    # SSE のメッセージ(bytes)を順に返す。試合が終わる(None が届く)か、切断されたら終わる
+    def messages(self, heartbeat=HEARTBEAT_INTERVAL):
+        while not self.closed:
+            try:
+                message = self.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield HEARTBEAT
+                continue
+            if message is None:
+                return
+            yield message
+
+class LiveGame:
+    def __init__(self, gamepk, fetch, scorer, model_loader=None, poll_interval=LIVE_POLL_INTERVAL):
+        self.gamepk = gamepk
+        self.fetch = fetch
+        self.scorer = scorer
+        self.model_loader = model_loader
+        self.poll_interval = poll_interval
+
+        self.processor = IncrementalProcessor()
+        self.points = {}
+        self.status = "pending"
+        self.last_timestamp = None
+        self.stats = {"polls": 0, "updates": 0, "published": 0, "dropped": 0}
+
+        self._seq = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _message(self, event, data):
+        self._seq += 1
+        return format_sse(event, dict(data, gamepk=self.gamepk), self._seq)
+
+    def _snapshot(self):
+        return self._message("snapshot", {"status": self.status, "points": list(self.points.values())})
+
+    # NOTE:新しい購読者には、まず今の状態(スナップショット)を送る。終わった試合ならそのまま final まで送って閉じる
+    def subscribe(self):
+        subscription = Subscription(self.gamepk)
+        with self._lock:
+            subscription.queue.put_nowait(self._snapshot())
+            if self.status == "final":
+                subscription.queue.put_nowait(self._message("final", {"status": self.status}))
+                subscription.queue.put_nowait(None)
+                return subscription
+            self._subscribers.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"live-{self.gamepk}", daemon=True)
+                self._thread.start()
+        return subscription
+
+    # 残りの購読者数を返す
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+            subscription.closed = True
+            return len(self._subscribers)
+
+    def stop(self):
+        self._stop.set()
+
+    def _publish(self, message, close=False):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            for subscription in subscribers:
+                try:
+                    subscription.queue.put_nowait(message)
+                except queue.Full:
+                    self._subscribers.discard(subscription)
+                    subscription.closed = True
+                    self.stats["dropped"] += 1
+                    continue
+                if close:
+                    try:
+                        subscription.queue.put_nowait(None)
+                    except queue.Full:
+                        subscription.closed = True
+            if close:
+                self._subscribers.clear()
+            self.stats["published"] += 1
+
+    # 1回分の取得・計算。戻り値は次のポーリングまでの秒数
+    def poll_once(self):
+        self.stats["polls"] += 1
+        raw_data = self.fetch(self.gamepk)
+        if raw_data is None:
+            return self.poll_interval
+        meta = raw_data.get("metaData", {})
+        wait = max(self.poll_interval, float(meta.get("wait") or 0))
+        timestamp = meta.get("timeStamp")
+        final = is_final(raw_data)
+        # NOTE:フィードが前回から変わっていなければ何もしない
+        if timestamp is not None and timestamp == self.last_timestamp and not final:
+            return wait
+        self.last_timestamp = timestamp
+
+        with stage("live_update"):
+            changed = self.processor.update(raw_data)
+            if changed or self.status == "pending":
+                model = self.model_loader() if self.model_loader is not None else None
+                points = score_live(self.gamepk, self.processor.event_lookup, self.scorer, model)
+                # 変わった分(新しい分と、イベントが増えて値が変わった分)だけ送る
+                updated = [p for m, p in points.items() if self.points.get(m) != p]
+                self.points = points
+                self.stats["updates"] += 1
+                count("live_updates")
+                status = "final" if final else "live"
+                if updated or status != self.status:
+                    self.status = status
+                    with self._lock:
+                        message = self._message("points", {"status": status, "points": updated})
+                    self._publish(message)
+        if final:
+            self.status = "final"
+            with self._lock:
+                message = self._message("final", {"status": "final"})
+            self._publish(message, close=True)
+        return wait
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                wait = self.poll_once()
+            except Exception as e:
+                print(f"live poll error {self.gamepk}: {e}")
+                wait = self.poll_interval
+            if self.status == "final":
+                break
+            self._stop.wait(wait)
+
+# NOTE:gamePk ごとに LiveGame を1つだけ持つ。最後の購読者が離れたらポーリングを止めて捨てる
+# プロセスごとの管理なので、gunicorn のワーカーが複数あればワーカーごとに1本ずつになる
+class LiveFeedManager:
+    def __init__(self, fetch=None, scorer=None, model_loader=None, poll_interval=LIVE_POLL_INTERVAL, base_url=API_BASE_URL):
+        self.fetch = fetch
+        self.scorer = scorer
+        self.model_loader = model_loader
+        self.poll_interval = poll_interval
+        self.base_url = base_url
+        self._games = {}
+        self._lock = threading.Lock()
+        self._crawler = None
+
+    # NOTE:試合中のフィードは毎回取りに行くので、生データのキャッシュは使わない
+    def fetch_feed(self, gamepk):
+        if self._crawler is None:
+            from preprocess.crawler import Crawler
+            self._crawler = Crawler(base_url=self.base_url, use_cache=False)
+        return self._crawler.get_json(f"{self.base_url}/api/v1.1/game/{gamepk}/feed/live")
+
+    def _scorer(self):
+        if self.scorer is None:
+            from analysys.excitement_scorer import ExcitementScorer
+            self.scorer = ExcitementScorer()
+        return self.scorer
+
+    # NOTE:購読の登録まで manager のロックの中でする。外で登録すると、その間に最後の購読者の unsubscribe が
+    # 試合を止めて _games から外し、止まった(ポーリングしない)試合に購読者が付いてしまう
+    def subscribe(self, gamepk):
+        with self._lock:
+            game = self._games.get(gamepk)
+            if game is None:
+                game = LiveGame(gamepk, self.fetch or self.fetch_feed, self._scorer(), self.model_loader, self.poll_interval)
+                self._games[gamepk] = game
+            return game.subscribe()
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            game = self._games.get(subscription.gamepk)
+            if game is None:
+                return
+            if game.unsubscribe(subscription) == 0:
+                game.stop()
+                del self._games[subscription.gamepk]
+
+    def stats(self):
+        with self._lock:
+            return {
+                str(gamepk): dict(game.stats, status=game.status, subscribers=len(game._subscribers), minutes=len(game.points))
+                for gamepk, game in self._games.items()
+            }
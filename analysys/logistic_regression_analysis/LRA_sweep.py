@@ -0,0 +1,174 @@
+# LRA_combine.py / LRA_minnute_with_description.py の特徴量グループ組み合わせをまとめて回す版
+# 試合ごとに特徴量行列を1回だけ作り、組み合わせごとに列を切り出して学習する。
+# 学習はプロセスプールに分散し、結果は1つのJSON(組み合わせ名 x gamepk で引ける)にまとめる
+#
+# 例: python analysys/logistic_regression_analysis/LRA_sweep.py --k 2 3 --singles
+
+import json
+import time
+import argparse
+import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from preprocess.feature_encoder import FEATURE_SLICES, flatten_score
+
+pk_list = ["777398", "777490", "777824", "777838", "777854", "777866"]
+
+# 組み合わせ対象(LRA_combine.py と同じ)
+feature_groups = [
+    "hit_event",
+    "rbi_impact",
+    "runner_status",
+    "score_difference",
+    "inning_phase"
+]
+
+# NOTE:LRA_minnute_with_description.py の play_features / situation_features はグループの束として扱う
+# (situation_features に is_goahead_runner_on_base は含まれない)
+GROUP_MEMBERS = {group: [group] for group in feature_groups}
+GROUP_MEMBERS["play_features"] = ["hit_event", "rbi_impact"]
+GROUP_MEMBERS["situation_features"] = ["runner_status", "score_difference", "inning_phase"]
+
+SINGLE_GROUPS = ["play_features", "situation_features"] + feature_groups
+
+def combination_name(combo):
+    return "__".join(combo)
+
+def expand(combo):
+    return [base for group in combo for base in GROUP_MEMBERS[group]]
+
+def combo_columns(combo):
+    cols = []
+    for base in expand(combo):
+        s = FEATURE_SLICES[base]
+        cols.extend(range(s.start, s.stop))
+    return np.array(cols, dtype=np.int64)
+
+# --- 試合ごとの読み込みと特徴量化(1回だけ) ---
+def encode_game(gamepk, molded_dir="data/molded_data", processed_dir="data/processed"):
+    with open(f"{molded_dir}/{gamepk}_molded_data.json", encoding="utf-8") as f:
+        molded_data = json.load(f)
+    with open(f"{processed_dir}/{gamepk}_processed_data.json", encoding="utf-8") as f:
+        processed_data = json.load(f)
+
+    rows, minute_keys = [], []
+    for minute_str, minute_list in molded_data["minutes"].items():
+        if not minute_list:
+            continue
+        rows.append(flatten_score(minute_list[0]))
+        minute_keys.append(minute_str)
+    X = np.array(rows, dtype=np.uint8).reshape(len(rows), -1)
+
+    # NOTE:イベント情報の引き方は LRA_combine.py と同じ(分 // 60, 分 % 60)
+    batters, event_types = [], []
+    for minute_str in minute_keys:
+        inning_idx = str(int(minute_str) // 60)
+        play_idx = str(int(minute_str) % 60)
+        try:
+            event = processed_data[inning_idx][play_idx]
+            batters.append(event["batter"]["full_name"])
+            event_types.append(event["event_type"])
+        except KeyError:
+            batters.append(None)
+            event_types.append(None)
+
+    return {"X": X, "minute_keys": minute_keys, "batter": batters, "event_type": event_types}
+
+# --- 学習(ワーカープロセス側) ---
+def fit_game(gamepk, X, combos):
+    from sklearn.linear_model import LogisticRegression
+
+    results = {}
+    for combo in combos:
+        cols = combo_columns(combo)
+        X_combo = X[:, cols].astype(np.float64)
+        # ラベル: 組み合わせ内のどれかのグループで True があれば1
+        y = np.zeros(len(X), dtype=np.int64)
+        for base in expand(combo):
+            y |= X[:, FEATURE_SLICES[base]].any(axis=1)
+        if len(np.unique(y)) > 1:
+            model = LogisticRegression(max_iter=1000)
+            model.fit(X_combo, y)
+            probs = model.predict_proba(X_combo)[:, 1]
+        else:
+            probs = np.zeros(len(X))
+        results[combination_name(combo)] = [round(p * 100, 1) for p in probs.tolist()]
+    return gamepk, results
+
+def run_sweep(gamepks, combos, workers=None, output_path="data/LRA_sweep/LRA_sweep_results.json"):
+    timings = {}
+
+    start = time.perf_counter()
+    games = {gamepk: encode_game(gamepk) for gamepk in gamepks}
+    timings["load_encode_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = {combination_name(c): {} for c in combos}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = [executor.submit(fit_game, gamepk, games[gamepk]["X"], combos) for gamepk in gamepks]
+        for future in futures:
+            gamepk, game_results = future.result()
+            for name, probs in game_results.items():
+                results[name][gamepk] = probs
+    timings["fit_s"] = time.perf_counter() - start
+
+    # NOTE:分ごとの打者・イベントは試合ごとに1回だけ持ち、組み合わせごとには確率の配列だけを持つ
+    output = {
+        "combinations": {combination_name(c): list(c) for c in combos},
+        "games": {
+            gamepk: {
+                "minutes": g["minute_keys"],
+                "batter": g["batter"],
+                "event_type": g["event_type"],
+            }
+            for gamepk, g in games.items()
+        },
+        "highlight_probability": results,
+    }
+
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(output, f, ensure_ascii=False)
+    timings["write_s"] = time.perf_counter() - start
+    return output, timings
+
+# 結果ファイルから LRA_combine.py と同じ形({分: {highlight_probability, batter, event_type}})を取り出す
+def lookup(output, combo_name, gamepk):
+    game = output["games"][gamepk]
+    probs = output["highlight_probability"][combo_name][gamepk]
+    return {
+        minute: {"highlight_probability": p, "batter": b, "event_type": e}
+        for minute, p, b, e in zip(game["minutes"], probs, game["batter"], game["event_type"])
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--gamepks", nargs="*", default=pk_list)
+    parser.add_argument("--k", type=int, nargs="*", default=[2], help="組み合わせるグループ数")
+    parser.add_argument("--singles", action="store_true", help="LRA_minnute_with_description.py の単体グループも回す")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="data/LRA_sweep/LRA_sweep_results.json")
+    args = parser.parse_args()
+
+    combos = []
+    if args.singles:
+        combos += [(g,) for g in SINGLE_GROUPS]
+    for k in args.k:
+        combos += list(combinations(feature_groups, k))
+
+    start = time.perf_counter()
+    output, timings = run_sweep(args.gamepks, combos, args.workers, args.output)
+    total = time.perf_counter() - start
+    print(f"{len(args.gamepks)}試合 x {len(combos)}組み合わせ = {len(args.gamepks) * len(combos)}モデル")
+    for stage, t in timings.items():
+        print(f"  {stage:<14} {t:7.2f} s")
+    print(f"  {'total_s':<14} {total:7.2f} s")
+    print(f"✅ JSONファイルを出力しました: {args.output}")
@@ -1,14 +1,22 @@
 import json
 import numpy as np
-import pandas as pd
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import classification_report
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from preprocess.profiling import stage
 
 # pk_list = ["777398","777490","777824","777838","777854","777866",]
 
 # gamepk = pk_list[3]  # 対象のゲームPK
 
-def Logistic_regression_analysis(gamepk, molded_data):
+def Logistic_regression_analysis(gamepk, molded_data, save=True):
+    # NOTE:学習済みモデル(model_registry)で推論する経路では sklearn を読み込まないよう、ここで import する
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import classification_report
+
     minutes_data = molded_data["minutes"]
 
     # --- 特徴量抽出関数 ---
@@ -70,7 +78,8 @@ def Logistic_regression_analysis(gamepk, molded_data):
     # --- モデル学習と評価 ---
     if len(np.unique(y)) > 1:
         model = LogisticRegression(max_iter=1000)
-        model.fit(X, y)
+        with stage("model_fit"):
+            model.fit(X, y)
         # y_pred = model.predict(X)
         # print("\n--- Classification Report ---")
         # print(classification_report(y, y_pred))
@@ -89,7 +98,10 @@ def Logistic_regression_analysis(gamepk, molded_data):
                 "prob": probs[v_idx],
                 "detail": detail
             }
-        with open(f"data/logistic_regression_analysis/{gamepk}_logistic_regression_analysis_data.json", "w", encoding="utf-8") as f:
-            json.dump(logistic_regression_data, f, ensure_ascii=False, indent=4)
+        if save:
+            with stage("json_output"), open(f"data/logistic_regression_analysis/{gamepk}_logistic_regression_analysis_data.json", "w", encoding="utf-8") as f:
+                json.dump(logistic_regression_data, f, ensure_ascii=False, indent=4)
+        return logistic_regression_data
     else:
         print("⚠️ Warning: ラベルが一種類のみのため、学習不可。")
+        return None
@@ -0,0 +1,191 @@
+# 複数試合をまとめて1回だけ学習し、係数をJSONに保存して使い回すためのモデル置き場
+# 推論は内積 + シグモイドだけなので sklearn は読み込まない(学習時のみ遅延 import)
+# analysys/app.py は data/models/latest.json が指すモデルで推論する。無ければ試合ごとの学習にフォールバックし、
+# 特徴量の並びが変わって古いモデルが使えない場合は ModelSchemaError で止める(学習し直すこと)
+#
+# 学習(data/models/lra-<version>.json と latest.json を作る):
+#   python analysys/logistic_regression_analysis/model_registry.py --all-cached      # 記録済み・キャッシュ済みの試合から
+#   python analysys/logistic_regression_analysis/model_registry.py --gamepks 777708 777709
+#   python analysys/logistic_regression_analysis/model_registry.py                   # data/molded_data の保存済みデータから
+
+import json
+import glob
+import io
+import contextlib
+import hashlib
+import argparse
+import time
+import sys
+import os
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from preprocess.feature_encoder import FEATURE_NAMES, flatten_score
+from preprocess.profiling import stage
+from preprocess.raw_cache import atomic_write
+
+MODELS_DIR = os.environ.get("MODELS_DIR", "data/models")
+
+# NOTE:特徴量の並びが変わったら別のハッシュになり、古いモデルは読み込み時に弾かれる
+SCHEMA_HASH = hashlib.sha256(json.dumps(FEATURE_NAMES).encode("utf-8")).hexdigest()[:12]
+
+def is_play_feature_highlight(minute):
+    for group in ["hit_event", "rbi_impact"]:
+        if any(minute["play_features"][group].values()):
+            return 1
+    return 0
+
+# molded_data(time_data_sellecting の出力)から特徴量行列とラベルを作る
+def molded_to_xy(molded_data):
+    X, y = [], []
+    for minute_list in molded_data["minutes"].values():
+        if not minute_list:
+            continue
+        minute = minute_list[0]  # 1分ごとに1イベントのみと仮定
+        X.append(flatten_score(minute))
+        y.append(is_play_feature_highlight(minute))
+    return np.array(X, dtype=np.float64).reshape(-1, len(FEATURE_NAMES)), np.array(y, dtype=np.int64)
+
+TRAIN_COMMAND = "python analysys/logistic_regression_analysis/model_registry.py --all-cached"
+
+class ModelSchemaError(ValueError):
+    pass
+
+class LogisticModel:
+    def __init__(self, coef, intercept, schema_hash=SCHEMA_HASH, meta=None):
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.schema_hash = schema_hash
+        self.meta = meta or {}
+        body = json.dumps([self.coef.tolist(), self.intercept, schema_hash]).encode("utf-8")
+        # モデルのバージョン(= 係数とスキーマのハッシュ)
+        self.version = f"{schema_hash}-{hashlib.sha256(body).hexdigest()[:12]}"
+
+    def predict_proba(self, X):
+        z = np.asarray(X, dtype=np.float64) @ self.coef + self.intercept
+        return 1.0 / (1.0 + np.exp(-z))
+
+    def to_dict(self):
+        return {
+            "version": self.version,
+            "schema_hash": self.schema_hash,
+            "feature_names": FEATURE_NAMES,
+            "coef": self.coef.tolist(),
+            "intercept": self.intercept,
+            "meta": self.meta,
+        }
+
+    # NOTE:学習中に起動したワーカーが書きかけのファイルを読まないよう、どちらも atomic_write で置き換える。
+    # latest.json はモデル本体を書き終えてから切り替える
+    def save(self, models_dir=MODELS_DIR):
+        os.makedirs(models_dir, exist_ok=True)
+        path = os.path.join(models_dir, f"lra-{self.version}.json")
+        atomic_write(path, json.dumps(self.to_dict(), ensure_ascii=False, indent=2).encode("utf-8"))
+        atomic_write(os.path.join(models_dir, "latest.json"), json.dumps({"path": os.path.basename(path)}).encode("utf-8"))
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            d = json.load(f)
+        if d["schema_hash"] != SCHEMA_HASH:
+            raise ModelSchemaError(f"feature schema mismatch: model {d['schema_hash']} != current {SCHEMA_HASH} ({path}). "
+                                   f"Retrain with: {TRAIN_COMMAND}")
+        return cls(d["coef"], d["intercept"], d["schema_hash"], d.get("meta"))
+
+# NOTE:学習済みモデルが無ければ None(呼び出し側は従来の試合ごとの学習にフォールバックする)。
+# latest.json はあるのに読めない・スキーマが違う場合は黙ってフォールバックせず例外にする
+def load_latest_model(models_dir=MODELS_DIR):
+    latest_path = os.path.join(models_dir, "latest.json")
+    if not os.path.exists(latest_path):
+        print(f"⚠️ 学習済みモデルがありません({latest_path})。試合ごとに学習します。作成: {TRAIN_COMMAND}")
+        return None
+    with open(latest_path, encoding="utf-8") as f:
+        latest = json.load(f)
+    return LogisticModel.load(os.path.join(models_dir, latest["path"]))
+
+def train(molded_datas, gamepks=None):
+    from sklearn.linear_model import LogisticRegression
+
+    Xs, ys = zip(*[molded_to_xy(m) for m in molded_datas])
+    X = np.concatenate(Xs)
+    y = np.concatenate(ys)
+    if len(np.unique(y)) < 2:
+        raise ValueError("ラベルが一種類のみのため、学習不可。")
+    model = LogisticRegression(max_iter=1000)
+    with stage("model_fit"):
+        model.fit(X, y)
+    return LogisticModel(model.coef_[0], model.intercept_[0], meta={
+        "gamepks": [str(pk) for pk in gamepks] if gamepks is not None else None,
+        "n_samples": int(len(y)),
+        "label_distribution": np.bincount(y).tolist(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+
+# NOTE:Logistic_regression_analysis と同じ形({v_idx: {"prob", "detail"}})で返す
+def score_molded(model, molded_data):
+    X, _ = molded_to_xy(molded_data)
+    probs = model.predict_proba(X)
+    logistic_regression_data = {}
+    for v_idx, value in enumerate(molded_data["minutes"].values()):
+        logistic_regression_data[v_idx] = {
+            "prob": float(probs[v_idx]),
+            "detail": [v["detail"] for v in value],
+        }
+    return logistic_regression_data
+
+# 生フィード(キャッシュ・種データ、無ければ取得)から time_data_sellecting の出力まで作る
+def molded_from_feed(gamepk):
+    from preprocess.data_processor import data_download, process_data
+    from preprocess.data_process_for_ra import get_scores
+    from analysys.data_collection.time_data_sellecting import time_data_sellecting
+
+    raw_data = data_download(gamepk)
+    if raw_data is None:
+        return None
+    # NOTE:各段の print は試合数分出るので捨てる
+    with contextlib.redirect_stdout(io.StringIO()):
+        return time_data_sellecting(gamepk, get_scores(process_data(raw_data)))
+
+def load_molded_dir(molded_dir):
+    molded_datas = []
+    gamepks = []
+    for path in sorted(glob.glob(os.path.join(molded_dir, "*_molded_data.json"))):
+        with open(path, encoding="utf-8") as f:
+            molded_datas.append(json.load(f))
+        gamepks.append(os.path.basename(path).split("_")[0])
+    return molded_datas, gamepks
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--molded-dir", default="data/molded_data", help="--gamepks / --all-cached が無いときの学習データ")
+    parser.add_argument("--gamepks", type=int, nargs="*", help="生フィードから学習データを作る試合")
+    parser.add_argument("--all-cached", action="store_true", help="記録済み・キャッシュ済みの試合を全部使う")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    args = parser.parse_args()
+
+    if args.gamepks or args.all_cached:
+        from preprocess.raw_cache import cached_gamepks
+        gamepks = list(dict.fromkeys((args.gamepks or []) + (cached_gamepks() if args.all_cached else [])))
+        molded_datas = []
+        used = []
+        for gamepk in gamepks:
+            molded_data = molded_from_feed(gamepk)
+            if molded_data is None:
+                print(f"⚠️ {gamepk}: 取得できないためスキップ")
+                continue
+            molded_datas.append(molded_data)
+            used.append(gamepk)
+        gamepks = used
+    else:
+        molded_datas, gamepks = load_molded_dir(args.molded_dir)
+    if not molded_datas:
+        parser.error("学習データがありません")
+
+    model = train(molded_datas, gamepks)
+    path = model.save(args.models_dir)
+    print(f"学習データ: {len(gamepks)}試合 {model.meta['n_samples']}件")
+    print(f"保存完了：{path}")
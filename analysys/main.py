@@ -11,6 +11,7 @@ from analysys.data_collection.time_data_sellecting import time_data_sellecting
 from analysys.logistic_regression_analysis.Logistic_regression_analysis import Logistic_regression_analysis
 from preprocess.data_process_for_ra import data_process_for_ra
 from preprocess.data_processor import data_process
+from analysys.logistic_regression_analysis.model_registry import score_molded
 
 def main():
     # 777398
@@ -24,15 +25,22 @@ def main():
 
     Logistic_regression_analysis(gamepk,molded_data)
 
-def get_data(gamepk):
-    
-    _,processed_data = data_process(gamepk)
+def get_data(gamepk, save=True):
+    _,data = analyze_game(gamepk, save)
+    return data
+
+# NOTE:生データも返す(試合が終了済みかどうかで結果をキャッシュしてよいか判断するため)
+# model(model_registry の学習済みモデル)を渡すと、試合ごとの学習をせずに内積 + シグモイドだけで推論する
+def analyze_game(gamepk, save=True, model=None):
+    raw_data,processed_data = data_process(gamepk)
     
     match_data = data_process_for_ra(processed_data,gamepk)
         
     molded_data = time_data_sellecting(gamepk,match_data)
 
-    Logistic_regression_analysis(gamepk,molded_data)
+    if model is not None:
+        return raw_data, score_molded(model,molded_data)
+    return raw_data, Logistic_regression_analysis(gamepk,molded_data,save)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
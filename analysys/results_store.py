@@ -0,0 +1,147 @@
+# (gamepk, モデルバージョン) をキーにした分析結果のストア
+# プロセス内のLRU + ディスク(data/results/<version>/<gamepk>.json)の2段。
+# 同じキーへの同時リクエストは1回だけ計算し、待っている側はその結果を受け取る(single-flight)
+
+import json
+import hashlib
+import threading
+import time
+import sys
+import os
+from collections import OrderedDict
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocess.raw_cache import atomic_write
+
+# NOTE:特徴量やモデルの中身を変えたら上げる(古い結果は別ディレクトリになり参照されなくなる)
+MODEL_VERSION = "lra-1"
+RESULTS_DIR = os.environ.get("RESULTS_DIR", "data/results")
+
+class StoredResult:
+    def __init__(self, body, etag, last_modified):
+        # NOTE:JSONはシリアライズ済みのbytesで持ち、レスポンスではそのまま返す
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self._encoded = {}
+
+    # NOTE:圧縮済みのbytesを Content-Encoding ごとにメモする
+    def encoded(self, encoding, compress):
+        if encoding not in self._encoded:
+            self._encoded[encoding] = compress(self.body, encoding)
+        return self._encoded[encoding]
+
+    @classmethod
+    def from_data(cls, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        return cls(body, hashlib.sha256(body).hexdigest()[:32], time.time())
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class ResultsStore:
+    def __init__(self, results_dir=RESULTS_DIR, model_version=MODEL_VERSION, max_items=256):
+        self.results_dir = os.path.join(results_dir, model_version)
+        self.model_version = model_version
+        self.max_items = max_items
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "computed": 0, "shared": 0}
+
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = {}
+        os.makedirs(self.results_dir, exist_ok=True)
+
+    def _path(self, gamepk):
+        return os.path.join(self.results_dir, f"{gamepk}.json")
+
+    def _remember(self, key, result):
+        self._lru[key] = result
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def get(self, gamepk):
+        key = str(gamepk)
+        with self._lock:
+            result = self._lru.get(key)
+            if result is not None:
+                self._lru.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return result
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+            last_modified = os.path.getmtime(path)
+        except FileNotFoundError:
+            return None
+        result = StoredResult(body, hashlib.sha256(body).hexdigest()[:32], last_modified)
+        with self._lock:
+            self._remember(key, result)
+            self.stats["disk_hits"] += 1
+        return result
+
+    def put(self, gamepk, data, persist=True):
+        key = str(gamepk)
+        result = StoredResult.from_data(data)
+        if persist:
+            atomic_write(self._path(key), result.body)
+        with self._lock:
+            self._remember(key, result)
+        return result
+
+    # NOTE:compute(gamepk) は (data, cacheable) を返す。試合中など cacheable=False の結果は保存しない
+    def get_or_compute(self, gamepk, compute):
+        result = self.get(gamepk)
+        if result is not None:
+            return result
+
+        key = str(gamepk)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                # NOTE:上の get のあとに前の leader が put して抜けた場合は、ここで見つかる
+                result = self._lru.get(key)
+                if result is not None:
+                    self._lru.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return result
+                flight = _Flight()
+                self._flights[key] = flight
+        if not leader:
+            flight.done.wait()
+            with self._lock:
+                self.stats["shared"] += 1
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            # NOTE:LRU から追い出されていてもディスクには保存済みのことがあるので、計算する前にもう一度見る
+            result = self.get(gamepk)
+            if result is not None:
+                flight.result = result
+                return result
+            data, cacheable = compute(gamepk)
+            if data is None:
+                flight.result = None
+            elif cacheable:
+                flight.result = self.put(gamepk, data)
+            else:
+                flight.result = StoredResult.from_data(data)
+            with self._lock:
+                self.stats["computed"] += 1
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
@@ -0,0 +1,195 @@
+# フロント(frontend/src/utils/pca.js, kmeans.js)でやっていたシーズンサマリーの PCA・k-means をサーバー側で行う
+# 特徴量は data_processor_for_cr.get_score の5つ。標準化してから PCA(2次元)と k-means をかける
+
+import json
+import hashlib
+import threading
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+SEASON_DATA_DIR = os.environ.get("SEASON_DATA_DIR", "frontend/public/data")
+DEFAULT_DATASET = "2025-03-16-2025-06-16"
+
+FEATURES = ["time", "ex_base_hit_cnt", "total_score", "diff_score", "lead_change_cnt"]
+
+# NOTE:これより試合数が多いときはミニバッチ k-means にする
+MINIBATCH_THRESHOLD = 5000
+MINIBATCH_SIZE = 1024
+N_INIT = 10
+# クラスタ数の自動決定(エルボー法)で試す最大数。kmeans.js の findOptimalClusters と同じ
+MAX_K = 8
+
+def standardize(X):
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    # NOTE:全試合で同じ値の特徴量は 0 にする
+    std[std == 0] = 1.0
+    return (X - mean) / std
+
+def pca(Z, components=2):
+    cov = np.cov(Z, rowvar=False)
+    eigenvalues, eigenvectors = np.linalg.eigh(cov)
+    order = np.argsort(eigenvalues)[::-1]
+    eigenvalues = eigenvalues[order]
+    eigenvectors = eigenvectors[:, order[:components]]
+    # 固有ベクトルの符号は不定なので、絶対値が最大の成分が正になるように揃える
+    signs = np.sign(eigenvectors[np.argmax(np.abs(eigenvectors), axis=0), np.arange(components)])
+    eigenvectors *= np.where(signs == 0, 1, signs)
+    total = eigenvalues.sum()
+    ratios = eigenvalues[:components] / total if total > 0 else np.zeros(components)
+    return Z @ eigenvectors, ratios
+
+def squared_distances(X, centroids):
+    return (X * X).sum(axis=1)[:, None] - 2 * X @ centroids.T + (centroids * centroids).sum(axis=1)[None, :]
+
+# k-means++ の初期値
+def init_centroids(X, k, rng):
+    centroids = [X[rng.integers(len(X))]]
+    closest = ((X - centroids[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = closest.sum()
+        idx = rng.choice(len(X), p=closest / total) if total > 0 else rng.integers(len(X))
+        centroids.append(X[idx])
+        closest = np.minimum(closest, ((X - X[idx]) ** 2).sum(axis=1))
+    return np.array(centroids)
+
+def lloyd(X, centroids, max_iter=100, tol=1e-4):
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        labels = squared_distances(X, centroids).argmin(axis=1)
+        counts = np.bincount(labels, minlength=len(centroids))
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, X)
+        # 空になったクラスタは元の重心のまま
+        new = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centroids)
+        shift = np.sqrt(((new - centroids) ** 2).sum(axis=1)).max()
+        centroids = new
+        if shift < tol:
+            break
+    return centroids, iterations
+
+# NOTE:Sculley (2010) のミニバッチ k-means。重心ごとの割り当て数で学習率を下げていく
+def minibatch(X, centroids, rng, batch_size=MINIBATCH_SIZE, max_iter=100, tol=1e-4):
+    counts = np.zeros(len(centroids))
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        batch = X[rng.choice(len(X), size=min(batch_size, len(X)), replace=False)]
+        labels = squared_distances(batch, centroids).argmin(axis=1)
+        old = centroids.copy()
+        for c in np.unique(labels):
+            members = batch[labels == c]
+            counts[c] += len(members)
+            centroids[c] += (members.sum(axis=0) - len(members) * centroids[c]) / counts[c]
+        if np.sqrt(((centroids - old) ** 2).sum(axis=1)).max() < tol:
+            break
+    return centroids, iterations
+
+# NOTE:初期値を変えて n_init 回実行し、慣性が最小のものを採用する(seed が同じなら結果も同じ)
+def kmeans(X, k, seed=0, n_init=N_INIT):
+    rng = np.random.default_rng(seed)
+    k = max(1, min(int(k), len(X)))
+    best = None
+    for _ in range(n_init):
+        centroids = init_centroids(X, k, rng)
+        if len(X) > MINIBATCH_THRESHOLD:
+            centroids, iterations = minibatch(X, centroids, rng)
+        else:
+            centroids, iterations = lloyd(X, centroids)
+        d = squared_distances(X, centroids)
+        labels = d.argmin(axis=1)
+        inertia = float(np.maximum(d[np.arange(len(X)), labels], 0).sum())
+        if best is None or inertia < best[3]:
+            best = (labels, centroids, iterations, inertia)
+    return best
+
+# kmeans.js の findOptimalClusters と同じ判定(慣性の減り方の差が最大の k、無ければ 3)
+def choose_k(X, seed=0, max_k=MAX_K):
+    elbow = [{"k": k, "inertia": kmeans(X, k, seed)[3]} for k in range(1, min(max_k, len(X)) + 1)]
+    optimal_k = 3
+    best = 0
+    for i in range(1, len(elbow) - 1):
+        score = (elbow[i - 1]["inertia"] - elbow[i]["inertia"]) - (elbow[i]["inertia"] - elbow[i + 1]["inertia"])
+        if score > best:
+            best = score
+            optimal_k = i + 1
+    return optimal_k, elbow
+
+def cluster_season(rows, k=None, seed=0):
+    X = np.array([[row[f] for f in FEATURES] for row in rows], dtype=np.float64).reshape(-1, len(FEATURES))
+    Z = standardize(X)
+    coords, ratios = pca(Z)
+    result = {}
+    if k is None:
+        k, result["elbow"] = choose_k(Z, seed)
+    labels, _, iterations, inertia = kmeans(Z, k, seed)
+    result.update({
+        "k": int(k),
+        "seed": seed,
+        "features": FEATURES,
+        "gamepk": [row["gamepk"] for row in rows],
+        "x": np.round(coords[:, 0], 4).tolist(),
+        "y": np.round(coords[:, 1], 4).tolist(),
+        "labels": labels.tolist(),
+        "variance_ratio": np.round(ratios, 4).tolist(),
+        "iterations": iterations,
+        "inertia": round(inertia, 4),
+    })
+    return result
+
+# NOTE:同じディレクトリには manifest.json や列指向の書き出しもあるので、シーズンサマリーの行の配列でなければ ValueError
+def validate_rows(rows, path):
+    if not isinstance(rows, list) or not rows:
+        raise ValueError(f"not a season summary dataset: {os.path.basename(path)}")
+    for row in rows:
+        if not isinstance(row, dict) or "gamepk" not in row or not all(isinstance(row.get(f), (int, float)) for f in FEATURES):
+            raise ValueError(f"not a season summary dataset: {os.path.basename(path)}")
+
+# NOTE:データセット(シーズンサマリーのJSON)ごとに内容のハッシュをバージョンとし、
+# 結果は (バージョン, k, seed) で LRU に持つ。ファイルが更新されればバージョンが変わる
+class SeasonClusterCache:
+    def __init__(self, data_dir=SEASON_DATA_DIR, max_entries=64):
+        self.data_dir = data_dir
+        self.max_entries = max_entries
+        self._datasets = {}
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def dataset_path(self, dataset):
+        # NOTE:ディレクトリの外を指定されないよう、ファイル名だけを使う
+        return os.path.join(self.data_dir, f"{os.path.basename(dataset)}.json")
+
+    def load_dataset(self, dataset):
+        path = self.dataset_path(dataset)
+        st = os.stat(path)
+        stat = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._datasets.get(path)
+            if cached is not None and cached[0] == stat:
+                return cached[1], cached[2]
+        with open(path, "rb") as f:
+            body = f.read()
+        version = hashlib.sha256(body).hexdigest()[:16]
+        rows = json.loads(body)
+        validate_rows(rows, path)
+        with self._lock:
+            self._datasets[path] = (stat, version, rows)
+        return version, rows
+
+    # 戻り値は (バージョン, JSONのbytes)
+    def get(self, dataset=DEFAULT_DATASET, k=None, seed=0):
+        version, rows = self.load_dataset(dataset)
+        key = (version, k, seed)
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return version, self._results[key]
+        result = cluster_season(rows, k, seed)
+        result["dataset_version"] = version
+        body = json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            self._results[key] = body
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return version, body
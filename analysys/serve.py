@@ -0,0 +1,76 @@
+# 本番用の起動スクリプト(app.run(debug=True) の開発サーバーの代わり)
+# gunicorn があれば gthread ワーカーで、無ければ waitress、それも無ければ werkzeug のスレッドサーバー(デバッグ・リローダー無し)で起動する
+# ロジスティック回帰までの重い処理は各ワーカーのプロセスプールに逃がし、リクエストスレッドを塞がない
+#
+# 例: python analysys/serve.py --workers 2 --threads 16 --scoring-workers 4 --timeout 30
+# 試合中の配信(/live-excitement の SSE)を1本のポーリングにまとめるなら --workers 1(live_feed.py 参照)
+
+import argparse
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app as app_module
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("threads", args.threads)
+            # NOTE:プロセスプール側のタイムアウトより少し長くしておく
+            self.cfg.set("timeout", int(args.timeout) + 10)
+            self.cfg.set("keepalive", 5)
+
+        def load(self):
+            return app_module.app
+
+    Application().run()
+
+def run_waitress(args):
+    import waitress
+    waitress.serve(app_module.app, host=args.host, port=args.port, threads=args.threads, channel_timeout=args.timeout)
+
+def run_werkzeug(args):
+    from werkzeug.serving import run_simple
+    run_simple(args.host, args.port, app_module.app, threaded=True, use_reloader=False, use_debugger=False)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn のワーカープロセス数")
+    parser.add_argument("--threads", type=int, default=16, help="ワーカーあたりのリクエストスレッド数")
+    parser.add_argument("--scoring-workers", type=int, default=None, help="ワーカーあたりの計算用プロセス数(既定は CPU 数 / ワーカー数)")
+    parser.add_argument("--timeout", type=float, default=30, help="1リクエストの計算タイムアウト(秒)")
+    parser.add_argument("--server", choices=["auto", "gunicorn", "waitress", "werkzeug"], default="auto")
+    args = parser.parse_args()
+
+    server = args.server if args.server != "auto" else detect_server()
+    # NOTE:プロセスプールはワーカーごとに作られるので、合計が CPU 数になるように割る(gunicorn 以外は1プロセス)
+    if args.scoring_workers is None:
+        processes = args.workers if server == "gunicorn" else 1
+        args.scoring_workers = max(1, (os.cpu_count() or 1) // max(1, processes))
+    app_module.configure(scoring_workers=args.scoring_workers, request_timeout=args.timeout)
+    # NOTE:試合中の配信(SSE)のポーリングはワーカーごとなので、複数ワーカーだと同じ試合を重複して取りに行く
+    if server == "gunicorn" and args.workers > 1:
+        print(f"⚠️ live-excitement はワーカーごとにポーリングします(--workers {args.workers})。1本にまとめるなら --workers 1")
+
+    servers = {"gunicorn": run_gunicorn, "waitress": run_waitress, "werkzeug": run_werkzeug}
+    servers[server](args)
+
+def detect_server():
+    for name in ["gunicorn", "waitress"]:
+        try:
+            __import__(name)
+        except ImportError:
+            continue
+        return name
+    return "werkzeug"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import platform
+import resource
+import time
+import sys
+import os
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocess.data_processor import process_data
+from preprocess.data_process_for_ra import data_process_for_ra
+from preprocess.data_processor_for_cr import data_process_for_cr
+from analysys.data_collection.time_data_sellecting import time_data_sellecting
+from analysys.logistic_regression_analysis.model_registry import train, score_molded
+
+# NOTE:data/raw/game の記録済みフィードをオフラインで前処理〜ロジスティック回帰の推論まで流し、
+# 段ごとのレイテンシ分布・events/s・ピークRSSを測る。--games で記録済みの試合を繰り返して規模を増やす(2430 = 1シーズン)
+# 結果は benchmark/baseline.json と比べ、許容幅を超えて遅く(重く)なっていたら終了コード1で落とす
+#
+# 例: python benchmark/bench_pipeline.py                     (記録済み12試合 x 10周)
+#     python benchmark/bench_pipeline.py --games 2430 --scenario season --runs 1
+#     python benchmark/bench_pipeline.py --update-baseline
+
+STAGES = ["process_data", "data_process_for_ra", "data_process_for_cr", "time_data_sellecting", "logistic_scoring"]
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def load_feeds(raw_dir="data/raw/game"):
+    feeds = []
+    for path in sorted(glob.glob(os.path.join(raw_dir, "*.json"))):
+        gamepk = os.path.basename(path).split(".")[0]
+        if not gamepk.isdigit():
+            continue
+        with open(path, encoding="utf-8") as f:
+            feeds.append((gamepk, json.load(f)))
+    return feeds
+
+def peak_rss_mb():
+    # NOTE:Linux は KB、macOS は bytes
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+# NOTE:推論用のモデルは計測の外で1回だけ学習しておく(記録済みの全試合から)
+def prepare_model(feeds):
+    with contextlib.redirect_stdout(io.StringIO()):
+        molded_datas = []
+        for gamepk, raw_data in feeds:
+            match_data = data_process_for_ra(process_data(raw_data), gamepk)
+            molded_datas.append(time_data_sellecting(gamepk, match_data))
+    return train(molded_datas, [gamepk for gamepk, _ in feeds])
+
+def run_game(gamepk, raw_data, model, timings):
+    def timed(stage, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings[stage].append(time.perf_counter() - start)
+        return result
+
+    processed_data = timed("process_data", process_data, raw_data)
+    match_data = timed("data_process_for_ra", data_process_for_ra, processed_data, gamepk)
+    timed("data_process_for_cr", data_process_for_cr, raw_data, processed_data, gamepk)
+    molded_data = timed("time_data_sellecting", time_data_sellecting, gamepk, match_data)
+    timed("logistic_scoring", score_molded, model, molded_data)
+    return sum(len(events) for events in processed_data.values())
+
+# NOTE:games を省略すると記録済みの試合を REPLAY_ROUNDS 周流す(12試合1周だとばらつきが大きい)
+REPLAY_ROUNDS = 10
+
+def run_once(feeds, model, games):
+    timings = {stage: [] for stage in STAGES}
+    events = 0
+    # NOTE:各段の print は捨てる(件数が多いと出力がボトルネックになる)
+    with contextlib.redirect_stdout(io.StringIO()) as sink:
+        start = time.perf_counter()
+        for i in range(games):
+            gamepk, raw_data = feeds[i % len(feeds)]
+            events += run_game(gamepk, raw_data, model, timings)
+            # 出力を溜め込まないよう定期的に捨てる
+            if i % 64 == 0:
+                sink.seek(0)
+                sink.truncate()
+        wall = time.perf_counter() - start
+    return timings, events, wall
+
+# NOTE:runs 回流して wall が最短の回を採用する(timeit と同じく、ばらつきのうち速い側がそのコードの実力)
+def run(games=None, raw_dir="data/raw/game", runs=3):
+    feeds = load_feeds(raw_dir)
+    if not feeds:
+        raise SystemExit(f"no recorded feeds in {raw_dir}")
+    model = prepare_model(feeds)
+    games = games or len(feeds) * REPLAY_ROUNDS
+
+    # 初回呼び出しのコストを除くため、1周分は計測せずに流す
+    run_once(feeds, model, len(feeds))
+    timings, events, wall = min((run_once(feeds, model, games) for _ in range(runs)), key=lambda r: r[2])
+
+    stages = {}
+    for stage, values in timings.items():
+        ms = np.array(values) * 1000
+        stages[stage] = {
+            "mean_ms": float(ms.mean()),
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p90_ms": float(np.percentile(ms, 90)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "max_ms": float(ms.max()),
+        }
+    return {
+        "games": games,
+        "recorded_games": len(feeds),
+        "events": events,
+        "wall_s": wall,
+        "runs": runs,
+        "games_per_s": games / wall,
+        "events_per_s": events / wall,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stages,
+    }
+
+# NOTE:1ms未満の段は揺れが大きいので、差がこれ未満なら割合に関わらず回帰とみなさない
+MIN_DELTA_MS = 0.5
+
+# NOTE:比べるのは規模に依らない指標だけ(events/s は下がったら、レイテンシとRSSは上がったら回帰)
+def compare(result, baseline, tolerance, min_delta_ms=MIN_DELTA_MS):
+    regressions = []
+    def check(name, value, base, higher_is_better=False, min_delta=0.0):
+        if base is None or base == 0:
+            return
+        change = (value - base) / base
+        worse = -change if higher_is_better else change
+        regressed = worse > tolerance and abs(value - base) >= min_delta
+        status = "REGRESSION" if regressed else "ok"
+        print(f"  {name:<34} {base:12.3f} -> {value:12.3f}  ({change:+7.1%})  {status}")
+        if regressed:
+            regressions.append(name)
+
+    check("events_per_s", result["events_per_s"], baseline.get("events_per_s"), higher_is_better=True)
+    check("peak_rss_mb", result["peak_rss_mb"], baseline.get("peak_rss_mb"))
+    for stage, s in result["stages"].items():
+        base = baseline.get("stages", {}).get(stage, {})
+        check(f"{stage}.p50_ms", s["p50_ms"], base.get("p50_ms"), min_delta=min_delta_ms)
+        check(f"{stage}.p90_ms", s["p90_ms"], base.get("p90_ms"), min_delta=min_delta_ms)
+    return regressions
+
+def print_result(result):
+    print(f"{result['games']} games ({result['recorded_games']} recorded), {result['events']} events, {result['wall_s']:.2f}s")
+    print(f"  {result['events_per_s']:,.0f} events/s  {result['games_per_s']:.1f} games/s  peak RSS {result['peak_rss_mb']:.0f} MB")
+    for stage, s in result["stages"].items():
+        print(f"  {stage:<22} mean {s['mean_ms']:7.2f}  p50 {s['p50_ms']:7.2f}  p90 {s['p90_ms']:7.2f}  p99 {s['p99_ms']:7.2f}  max {s['max_ms']:7.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=None, help="流す試合数(記録済みの試合を繰り返す)")
+    parser.add_argument("--scenario", default=None, help="ベースライン上の名前(既定は replay / games-<N>)")
+    parser.add_argument("--raw-dir", default="data/raw/game")
+    parser.add_argument("--runs", type=int, default=3, help="繰り返し回数(最速の回を採用)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="許容する悪化の割合")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", help="結果のJSONの出力先")
+    args = parser.parse_args()
+
+    scenario = args.scenario or ("replay" if args.games is None else f"games-{args.games}")
+    result = run(args.games, args.raw_dir, args.runs)
+    result["scenario"] = scenario
+    result["python"] = platform.python_version()
+    result["machine"] = f"{platform.system()}-{platform.machine()} cpus={os.cpu_count()}"
+    print_result(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baselines = json.load(f)
+    except FileNotFoundError:
+        baselines = {}
+
+    if args.update_baseline:
+        baselines[scenario] = result
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2)
+        print(f"ベースラインを更新しました: {args.baseline} [{scenario}]")
+    elif scenario in baselines:
+        print(f"ベースライン [{scenario}] ({baselines[scenario].get('machine')}) との比較 (許容 {args.tolerance:.0%}):")
+        regressions = compare(result, baselines[scenario], args.tolerance)
+        if regressions:
+            print(f"❌ 性能が悪化しました: {', '.join(regressions)}")
+            sys.exit(1)
+        print("✅ ベースライン内です")
+    else:
+        print(f"ベースライン [{scenario}] が無いので比較しません(--update-baseline で保存)")
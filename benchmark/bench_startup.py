@@ -0,0 +1,124 @@
+import argparse
+import json
+import re
+import subprocess
+import time
+import sys
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# NOTE:サービス・CLI のコールドスタート(import にかかる時間)を python -X importtime で測る。
+# 毎回新しいプロセスで import し、runs 回のうち最短の回を採用する。
+# 予算(ミリ秒)を超えるか、重いライブラリ(sklearn / pandas / matplotlib)が import 時に読み込まれていたら終了コード1
+#
+# 例: python benchmark/bench_startup.py
+#     python benchmark/bench_startup.py --target service --top 20
+
+# 名前: (sys.path に足すディレクトリ, import するモジュール, 予算 ms)
+# NOTE:予算は 1CPU の開発機で測った値(service 約310ms / analysis 約140ms / preprocess 約115ms、うち numpy 約70ms)に余裕を持たせたもの。
+# 以前(time_data_sellecting の import 時読み込み・pandas の即時 import あり)は service が約610ms
+TARGETS = {
+    "service": ("analysys", "app", 450),
+    "analysis": ("analysys", "main", 250),
+    "preprocess": ("preprocess", "data_processor", 200),
+}
+
+# 最初に使うときまで読み込まないもの
+LAZY_MODULES = ["sklearn", "pandas", "matplotlib", "scipy", "requests"]
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+CHILD = """
+import json, sys
+sys.path.insert(0, {path!r})
+import {module}
+print(json.dumps(sorted(m for m in {lazy!r} if m in sys.modules)))
+"""
+
+def parse_importtime(stderr):
+    modules = []
+    for line in stderr.splitlines():
+        m = IMPORTTIME_LINE.match(line)
+        if m:
+            modules.append({
+                "module": m.group(4),
+                "self_ms": int(m.group(1)) / 1000,
+                "cumulative_ms": int(m.group(2)) / 1000,
+                "depth": len(m.group(3)) // 2,
+            })
+    return modules
+
+def measure(path, module):
+    code = CHILD.format(path=os.path.join(ROOT, path), module=module, lazy=LAZY_MODULES)
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    modules = parse_importtime(proc.stderr)
+    # NOTE:対象モジュールの行は一番最後に出る(累積が import 全体の時間)
+    top = [m for m in modules if m["module"] == module and m["depth"] == 0]
+    return {
+        "import_ms": top[-1]["cumulative_ms"] if top else sum(m["self_ms"] for m in modules),
+        "process_ms": wall * 1000,
+        "lazy_loaded": json.loads(proc.stdout.strip().splitlines()[-1]),
+        "modules": modules,
+    }
+
+def run(target, runs=5, top=10):
+    path, module, budget = TARGETS[target]
+    best = min((measure(path, module) for _ in range(runs)), key=lambda r: r["import_ms"])
+    heaviest = sorted((m for m in best["modules"] if m["depth"] <= 1 and m["module"] != module), key=lambda m: -m["cumulative_ms"])[:top]
+    return {
+        "target": target,
+        "module": module,
+        "budget_ms": budget,
+        "import_ms": best["import_ms"],
+        "process_ms": best["process_ms"],
+        "modules_imported": len(best["modules"]),
+        "lazy_loaded": best["lazy_loaded"],
+        "heaviest": [{k: m[k] for k in ("module", "cumulative_ms", "self_ms")} for m in heaviest],
+    }
+
+def print_result(result):
+    over = result["import_ms"] > result["budget_ms"]
+    status = "OVER BUDGET" if over else "ok"
+    print(f"{result['target']} (import {result['module']}): {result['import_ms']:.1f} ms / budget {result['budget_ms']} ms  "
+          f"process {result['process_ms']:.1f} ms  {result['modules_imported']} modules  {status}")
+    if result["lazy_loaded"]:
+        print(f"  ❌ import 時に読み込まれている: {', '.join(result['lazy_loaded'])}")
+    for m in result["heaviest"]:
+        print(f"    {m['module']:<50} {m['cumulative_ms']:8.1f} ms (self {m['self_ms']:6.1f})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", choices=list(TARGETS), action="append", help="既定は全部")
+    parser.add_argument("--runs", type=int, default=5, help="繰り返し回数(最短の回を採用)")
+    parser.add_argument("--top", type=int, default=10, help="表示する重いモジュールの数")
+    parser.add_argument("--budget", type=float, default=None, help="予算(ms)を上書きする")
+    parser.add_argument("--output", help="結果のJSONの出力先")
+    args = parser.parse_args()
+
+    results = []
+    failed = []
+    for target in args.target or list(TARGETS):
+        result = run(target, args.runs, args.top)
+        if args.budget is not None:
+            result["budget_ms"] = args.budget
+        print_result(result)
+        results.append(result)
+        if result["import_ms"] > result["budget_ms"] or result["lazy_loaded"]:
+            failed.append(target)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if failed:
+        print(f"❌ 起動が予算を超えました: {', '.join(failed)}")
+        sys.exit(1)
+    print("✅ 予算内です")
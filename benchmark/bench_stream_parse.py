@@ -0,0 +1,48 @@
+import json
+import glob
+import time
+import tracemalloc
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocess.data_processor import process_data, process_data_stream
+from preprocess.stream_loader import iter_all_plays, load_game
+
+# NOTE:data/raw/game の記録済みフィードで、json.load 一括パースと逐次パースの時間・ピークメモリを比べる
+
+def measure(label, fn, paths):
+    start = time.perf_counter()
+    for path in paths:
+        fn(path)
+    elapsed = time.perf_counter() - start
+
+    # NOTE:tracemalloc は遅くなるので時間計測とは別に回す
+    tracemalloc.start()
+    for path in paths:
+        fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed * 1000 / len(paths):8.1f} ms/game   peak {peak / 1024 ** 2:7.1f} MB")
+
+def full_json(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return process_data(data)
+
+def slim(path):
+    return process_data(load_game(path))
+
+def stream(path):
+    return process_data_stream(iter_all_plays(path))
+
+if __name__ == "__main__":
+    paths = sorted(glob.glob("data/raw/game/*.json"))
+    paths = [p for p in paths if not p.endswith("index.json")]
+    for path in paths:
+        assert full_json(path) == stream(path), path
+    measure("json.load + process_data", full_json, paths)
+    measure("load_game + process_data", slim, paths)
+    measure("iter_all_plays (stream)", stream, paths)
@@ -0,0 +1,52 @@
+import json
+import glob
+import timeit
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocess.calculate.measure_time import calc_time_diff, parse_epoch_ms, calc_time_diff_ms, parse_epoch_ms_array
+from analysys.data_collection.time_data_sellecting import parse_time
+
+# NOTE:1イベントあたりの時刻処理コストの比較
+# before: calc_time_diff(process_event) + parse_time 2回(time_data_sellecting) = fromisoformat 4回
+# after : parse_epoch_ms 2回(process_event)のみ。後段は整数の引き算
+# vector: 1試合分の列を parse_epoch_ms_array でまとめてパース
+
+def load_times():
+    times = []
+    for path in sorted(glob.glob("data/raw/game/*.json")):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for play in data["liveData"]["plays"]["allPlays"]:
+            for event in play["playEvents"]:
+                if event.get("startTime") and event.get("endTime"):
+                    times.append((event["startTime"], event["endTime"]))
+    return times
+
+def before(times):
+    for start, end in times:
+        calc_time_diff(start, end)
+        parse_time(start)
+        parse_time(end)
+
+def after(times):
+    for start, end in times:
+        start_ms = parse_epoch_ms(start)
+        end_ms = parse_epoch_ms(end)
+        calc_time_diff_ms(start_ms, end_ms)
+
+def vector(times):
+    starts = parse_epoch_ms_array([s for s, _ in times])
+    ends = parse_epoch_ms_array([e for _, e in times])
+    (ends - starts) / 1000
+
+if __name__ == "__main__":
+    times = load_times()
+    n = len(times)
+    print(f"{n} events")
+    for label, fn in [("before", before), ("after", after), ("vector", vector)]:
+        best = min(timeit.repeat(lambda: fn(times), number=1, repeat=5))
+        print(f"{label:<8} {best * 1e6 / n:6.2f} us/event")
@@ -0,0 +1,102 @@
+import argparse
+import json
+import logging
+import threading
+import time
+import sys
+import os
+
+import requests
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "analysys"))
+
+from benchmark.mock_mlb_server import serve as serve_mock
+
+# NOTE:記録済みの試合を mock_mlb_server で「試合中」として再生し、analysys の SSE(live-excitement)に複数クライアントで接続する。
+# 確認すること:
+#   - 購読者が何人でもフィードの取得は1本(mock へのリクエスト数 ≒ ポーリング回数)
+#   - 全購読者が同じ内容を受け取り、最後は試合全体をまとめて計算した結果と一致する
+# 例: python benchmark/live_replay.py --gamepk 777866 --clients 8 --speed 600
+
+ENDPOINT = "/api/clusterVisualization/live-excitement"
+
+# SSE を読み、snapshot / points を分ごとに反映していく。final が来たら終わる
+def subscribe(base_url, gamepk, state, timeout):
+    minutes = {}
+    received = 0
+    with requests.get(f"{base_url}{ENDPOINT}", params={"gamepk": gamepk}, stream=True, timeout=timeout) as resp:
+        event = None
+        for line in resp.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                received += 1
+                if event == "snapshot":
+                    minutes = {}
+                for point in data.get("points", []):
+                    minutes[point["minute"]] = point
+                if event == "final":
+                    break
+    state.update({"minutes": minutes, "received": received})
+
+def expected_points(gamepk):
+    from preprocess.data_processor import process_data
+    from analysys.live_feed import score_live
+    from analysys.excitement_scorer import ExcitementScorer
+    from app import get_model
+    with open(f"data/raw/game/{gamepk}.json", encoding="utf-8") as f:
+        raw_data = json.load(f)
+    return score_live(gamepk, process_data(raw_data), ExcitementScorer(), get_model())
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--gamepk", type=int, default=777866)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--speed", type=float, default=600, help="再生速度(何倍速)")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    mock, mock_url = serve_mock(replay_speed=args.speed)
+    # NOTE:app を import する前に向き先とポーリング間隔を決めておく
+    os.environ["MLB_API_BASE_URL"] = mock_url
+    os.environ["LIVE_POLL_INTERVAL"] = str(args.poll_interval)
+    from werkzeug.serving import make_server
+    import app as app_module
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    states = [{} for _ in range(args.clients)]
+    start = time.perf_counter()
+    threads = [threading.Thread(target=subscribe, args=(base_url, args.gamepk, state, args.timeout)) for state in states]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    expected = expected_points(args.gamepk)
+    same = all(state.get("minutes") == states[0].get("minutes") for state in states)
+    matches = states[0].get("minutes") == expected
+    feed_requests = mock.stats["requests"]
+    polls = elapsed / args.poll_interval
+
+    print(f"{args.clients} clients, replay x{args.speed:g}, {elapsed:.1f}s")
+    print(f"  feed requests to mock: {feed_requests} (~{polls:.0f} poll intervals; one poller regardless of clients)")
+    print(f"  messages per client: {[state.get('received') for state in states]}")
+    print(f"  minutes: {len(states[0].get('minutes', {}))} (expected {len(expected)})")
+    print(f"  all clients identical: {same}")
+    print(f"  final state matches full-game scoring: {matches}")
+    ok = same and matches and feed_requests <= polls + args.clients + 2
+    print("✅ OK" if ok else "❌ NG")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import sys
+import os
+
+import numpy as np
+import requests
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.mock_mlb_server import serve as serve_mock
+
+# NOTE:analysys/serve.py をサブプロセスで起動し、MLB API はローカルのスタンドイン(mock_mlb_server)に向けて負荷をかける
+# 例: python benchmark/load_test.py --clients 32 --duration 20 --server gunicorn
+
+ENDPOINT = "/api/clusterVisualization/logistic-regression-data"
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+def start_app(args, mock_url, port, work_dir):
+    env = dict(os.environ)
+    env["MLB_API_BASE_URL"] = mock_url
+    # NOTE:キャッシュは空の一時ディレクトリにする(初回はスタンドインから取得させる)
+    env["RAW_CACHE_DIR"] = os.path.join(work_dir, "raw")
+    env["RAW_SEED_DIR"] = ""
+    env["RESULTS_DIR"] = os.path.join(work_dir, "results")
+    cmd = [
+        sys.executable, "analysys/serve.py",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--server", args.server,
+        "--workers", str(args.workers),
+        "--threads", str(args.threads),
+        "--timeout", str(args.timeout),
+    ]
+    if args.scoring_workers is not None:
+        cmd += ["--scoring-workers", str(args.scoring_workers)]
+    return subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def run_clients(base_url, gamepks, clients, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def client(i):
+        session = requests.Session()
+        session.headers["Accept-Encoding"] = "gzip"
+        n = i
+        while time.time() < deadline:
+            gamepk = gamepks[n % len(gamepks)]
+            n += 1
+            start = time.perf_counter()
+            try:
+                resp = session.get(f"{base_url}{ENDPOINT}", params={"gamepk": gamepk}, timeout=60)
+                ok = resp.status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return np.array(latencies), errors[0], time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--server", default="auto")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--scoring-workers", type=int, default=None, help="既定は serve.py に任せる(CPU 数 / ワーカー数)")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--mlb-latency", type=float, default=0.05, help="スタンドインの応答遅延(秒)")
+    args = parser.parse_args()
+
+    mock, mock_url = serve_mock(latency=args.mlb_latency)
+    gamepks = sorted(mock.feeds)
+    port = free_port()
+    with tempfile.TemporaryDirectory() as work_dir:
+        proc = start_app(args, mock_url, port, work_dir)
+        try:
+            if not wait_for_port(port):
+                print("サーバーが起動しませんでした")
+                return
+            latencies, errors, wall = run_clients(f"http://127.0.0.1:{port}", gamepks, args.clients, args.duration)
+        finally:
+            proc.terminate()
+            proc.wait()
+            mock.shutdown()
+
+    if len(latencies) == 0:
+        print("リクエストが完了しませんでした")
+        return
+    print(f"server={args.server} clients={args.clients} requests={len(latencies)} errors={errors} rps={len(latencies) / wall:.1f}")
+    print(f"latency p50 {np.percentile(latencies, 50) * 1000:.1f} ms  p99 {np.percentile(latencies, 99) * 1000:.1f} ms  max {latencies.max() * 1000:.1f} ms")
+    print(f"MLB stand-in requests: {mock.stats['requests']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import json
+import glob
+import os
+import random
+import threading
+import time
+import argparse
+from collections import defaultdict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# NOTE:MLB APIのスタンドイン。data/raw/game の記録済みフィードを返す
+# MLB_API_BASE_URL=http://127.0.0.1:<port> を指定すると preprocess 側がこちらを参照する
+# --replay-speed を付けると、試合中の feed/live を再現する(起動時を試合開始とし、speed 倍の速さで時刻が進む。
+# その時刻までに始まったイベントだけを返し、全部終わったら Final にする)
+
+RAW_DIR = "data/raw/game"
+
+def load_games(raw_dir=RAW_DIR):
+    feeds = {}
+    schedule = defaultdict(list)
+    for path in sorted(glob.glob(os.path.join(raw_dir, "*.json"))):
+        with open(path, "rb") as f:
+            body = f.read()
+        game = json.loads(body)
+        gamepk = game["gamePk"]
+        feeds[gamepk] = body
+        game_data = game.get("gameData", {})
+        schedule[game_data.get("datetime", {}).get("officialDate")].append({
+            "gamePk": gamepk,
+            "seriesDescription": "Regular Season",
+            "status": {"statusCode": game_data.get("status", {}).get("statusCode")},
+        })
+    return feeds, schedule
+
+def to_ms(t):
+    return datetime.fromisoformat(t.replace("Z", "+00:00")).timestamp() * 1000
+
+def game_start_ms(game):
+    starts = [to_ms(e["startTime"]) for play in game["liveData"]["plays"]["allPlays"] for e in play["playEvents"] if e.get("startTime")]
+    return min(starts) if starts else 0
+
+# NOTE:clock_ms の時点の feed/live。打席の結果(result)は記録のまま返す(途中の打席でも結果が見える)点だけ本物と違う
+def replay_feed(game, clock_ms):
+    all_plays = game["liveData"]["plays"]["allPlays"]
+    plays = []
+    for play in all_plays:
+        events = [e for e in play["playEvents"] if not e.get("startTime") or to_ms(e["startTime"]) <= clock_ms]
+        if not events:
+            break
+        end_time = play["about"].get("endTime") or events[-1].get("endTime")
+        complete = len(events) == len(play["playEvents"]) and end_time is not None and to_ms(end_time) <= clock_ms
+        plays.append(dict(play, playEvents=events, about=dict(play["about"], isComplete=complete)))
+        if not complete:
+            break
+    final = len(plays) == len(all_plays) and (not plays or plays[-1]["about"]["isComplete"])
+    status = dict(game["gameData"].get("status", {}))
+    if not final:
+        status.update({"abstractGameState": "Live", "codedGameState": "I", "statusCode": "I", "detailedState": "In Progress"})
+    n_events = sum(len(play["playEvents"]) for play in plays)
+
+    feed = dict(game)
+    feed["metaData"] = dict(game.get("metaData", {}), timeStamp=f"replay-{len(plays)}-{n_events}-{int(final)}", wait=0)
+    feed["gameData"] = dict(game["gameData"], status=status)
+    feed["liveData"] = dict(game["liveData"], plays=dict(game["liveData"]["plays"], allPlays=plays))
+    return feed
+
+class MockMLBHandler(BaseHTTPRequestHandler):
+    # NOTE:keep-aliveの確認のためHTTP/1.1で応答する
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.stats_lock:
+            server.stats["requests"] += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if server.fail_rate and random.random() < server.fail_rate:
+            with server.stats_lock:
+                server.stats["failures"] += 1
+            self._send(503, b"{}")
+            return
+
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        # /api/v1/schedule?sportId=1&date=MM/DD/YYYY
+        if url.path == "/api/v1/schedule":
+            date = parse_qs(url.query).get("date", [""])[0]
+            try:
+                date = datetime.strptime(date, "%m/%d/%Y").strftime("%Y-%m-%d")
+            except ValueError:
+                pass
+            games = server.schedule.get(date, [])
+            body = {"dates": [{"date": date, "games": games}] if games else []}
+            self._send(200, json.dumps(body).encode("utf-8"))
+        # /api/v1.1/game/<gamepk>/feed/live
+        elif len(parts) == 6 and parts[:3] == ["api", "v1.1", "game"] and parts[4:] == ["feed", "live"]:
+            gamepk = int(parts[3]) if parts[3].isdigit() else None
+            body = server.feeds.get(gamepk)
+            if body is None:
+                self._send(404, b"{}")
+            elif server.replay_speed:
+                self._send(200, json.dumps(replay_feed(server.replay_game(gamepk), server.replay_clock(gamepk))).encode("utf-8"))
+            else:
+                self._send(200, body)
+        else:
+            self._send(404, b"{}")
+
+class MockMLBServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def replay_game(self, gamepk):
+        with self.stats_lock:
+            if gamepk not in self.replay_games:
+                game = json.loads(self.feeds[gamepk])
+                self.replay_games[gamepk] = (game, game_start_ms(game))
+            return self.replay_games[gamepk][0]
+
+    # 再生中の試合時刻(ms)。replay_started をずらせば早送り・巻き戻しできる
+    def replay_clock(self, gamepk):
+        self.replay_game(gamepk)
+        elapsed = time.monotonic() - self.replay_started
+        return self.replay_games[gamepk][1] + elapsed * self.replay_speed * 1000
+
+def serve(host="127.0.0.1", port=0, raw_dir=RAW_DIR, latency=0.0, fail_rate=0.0, replay_speed=None):
+    server = MockMLBServer((host, port), MockMLBHandler)
+    server.feeds, server.schedule = load_games(raw_dir)
+    server.latency = latency
+    server.fail_rate = fail_rate
+    server.replay_speed = replay_speed
+    server.replay_started = time.monotonic()
+    server.replay_games = {}
+    server.stats = {"requests": 0, "failures": 0}
+    server.stats_lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="1リクエストあたりの遅延(秒)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="503を返す確率")
+    parser.add_argument("--replay-speed", type=float, default=None, help="試合中のフィードを再現する(何倍速で進めるか)")
+    args = parser.parse_args()
+    server, base_url = serve(port=args.port, latency=args.latency, fail_rate=args.fail_rate, replay_speed=args.replay_speed)
+    print(f"MLB_API_BASE_URL={base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,8 +1,6 @@
 import React, { useEffect, useRef, useState } from "react";
 import * as d3 from "d3";
 import { processGameData } from "../utils/dataProcessor";
-import { performClustering, findOptimalClusters } from "../utils/kmeans";
-import { performPCA } from "../utils/pca";
 import { ClusterVisualizationService } from "../service/ClusterVisualizationService";
 
 /**
@@ -35,19 +33,15 @@ const ClusterVisualization = () => {
           "/data/2025-03-16-2025-06-16.json",
         );
 
-        // エルボー法でクラスタ数候補を分析
-        console.log("📊 エルボー分析を実行中...");
-        const { optimalK, elbowData: elbowResult } = findOptimalClusters(
-          processedData.normalizedData,
-          processedData.features,
-          8, // 最大8クラスタまで試行
-        );
+        // エルボー法でのクラスタ数候補はサーバー側で計算（最大8クラスタまで試行）
+        const autoResult =
+          await ClusterVisualizationService.getSeasonClusters();
 
         setProcessedData(processedData);
-        setElbowData(elbowResult);
-        setClusterCount(optimalK);
+        setElbowData(autoResult.elbow);
+        setClusterCount(autoResult.k);
 
-        console.log(`✅ 推奨クラスタ数: ${optimalK}`);
+        console.log(`✅ 推奨クラスタ数: ${autoResult.k}`);
       } catch (err) {
         console.error("データ読み込みエラー:", err);
         setError(err.message);
@@ -67,24 +61,35 @@ const ClusterVisualization = () => {
       try {
         setUpdating(true);
 
-        // 指定されたクラスタ数でクラスタリング実行
-        const clusteringResult = performClustering(
-          processedData.normalizedData,
-          processedData.features,
-          clusterCount, // 手動指定されたクラスタ数を使用
-        );
+        // 指定されたクラスタ数での k-means と PCA(2次元)はサーバー側で計算し、座標とラベルだけ受け取る
+        const result =
+          await ClusterVisualizationService.getSeasonClusters(clusterCount);
 
-        // PCAで次元削減
-        const pcaResult = performPCA(
-          clusteringResult.clusteredData,
-          processedData.features,
-          2,
+        const indexByGamepk = new Map(
+          result.gamepk.map((gamepk, index) => [gamepk, index]),
         );
+        const clusteredData = processedData.normalizedData
+          .filter((item) => indexByGamepk.has(item.gamepk))
+          .map((item) => {
+            const index = indexByGamepk.get(item.gamepk);
+            return {
+              ...item,
+              cluster: result.labels[index],
+              pc1: result.x[index],
+              pc2: result.y[index],
+            };
+          });
 
         setData({
           ...processedData,
-          ...clusteringResult,
-          pca: pcaResult,
+          clusteredData,
+          k: result.k,
+          iterations: result.iterations,
+          inertia: result.inertia,
+          pca: {
+            data: clusteredData,
+            varianceRatios: result.variance_ratio,
+          },
         });
       } catch (err) {
         console.error("クラスタリングエラー:", err);
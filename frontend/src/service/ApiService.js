@@ -16,6 +16,35 @@ export class ApiService {
     }
   }
 
+  // NDJSON のレスポンスを1行ずつ onLine に渡す(全部揃うのを待たない)
+  static async callStreamApi(endpoint, params = {}, onLine = () => {}) {
+    const url = new URL(endpoint, ApiService.baseUrl);
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== null) url.searchParams.set(key, value);
+    });
+    try {
+      const response = await fetch(url);
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+      }
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split("\n");
+        buffer = lines.pop();
+        lines.filter((line) => line.trim()).forEach((line) => onLine(JSON.parse(line)));
+      }
+      if (buffer.trim()) onLine(JSON.parse(buffer));
+    } catch (error) {
+      console.error("API STREAM Error:", error);
+      throw error;
+    }
+  }
+
   static async callPostApi(endpoint, data = {}) {
     try {
       const response = await axios.post(endpoint, data, {
@@ -9,4 +9,72 @@ export class ClusterVisualizationService {
       },
     );
   }
+
+  // 複数試合の結果を1試合ずつ onGame({gamepk, data} / {gamepk, error}) に渡す。
+  // スケジュールが取れなかった日は onGame({date, error}) になる(gamepk なし)。
+  // gamepks(配列)か { start, end }(YYYY-MM-DD)で指定する。戻り値は最後のまとめ行 {done, count, errors}
+  static async streamLogisticRegressionData(
+    { gamepks = null, start = null, end = null },
+    onGame,
+  ) {
+    const params = gamepks ? { gamepks: gamepks.join(",") } : { start, end };
+    let summary = null;
+    await ApiService.callStreamApi(
+      "api/clusterVisualization/logistic-regression-data/batch",
+      params,
+      (line) => {
+        if (line.done) {
+          summary = line;
+        } else {
+          onGame(line);
+        }
+      },
+    );
+    return summary;
+  }
+
+  // 試合中の1分ごとの盛り上がり度・確率を SSE で受け取る。points は {minute, time, events, excitement, prob} の配列
+  // onUpdate(points, { status, snapshot }) は接続直後(snapshot=true、今までの全分)と、変わった分が届くたびに呼ばれる
+  // 戻り値の関数を呼ぶと購読をやめる
+  static subscribeLiveExcitement(gamepk, onUpdate, onFinal = () => {}) {
+    const url = new URL(
+      "api/clusterVisualization/live-excitement",
+      ApiService.baseUrl,
+    );
+    url.searchParams.set("gamepk", gamepk);
+    const source = new EventSource(url);
+    source.addEventListener("snapshot", (e) => {
+      const data = JSON.parse(e.data);
+      onUpdate(data.points, { status: data.status, snapshot: true });
+    });
+    source.addEventListener("points", (e) => {
+      const data = JSON.parse(e.data);
+      onUpdate(data.points, { status: data.status, snapshot: false });
+    });
+    source.addEventListener("final", (e) => {
+      // NOTE:サーバーが閉じたあと EventSource が自動で再接続しないよう、こちらからも閉じる
+      source.close();
+      onFinal(JSON.parse(e.data));
+    });
+    return () => source.close();
+  }
+
+  // 1試合の特徴量のタイムラインを widthS 秒ごとに集計して返す（ズームで幅を変えるたびに呼ぶ）
+  // 戻り値は { gamepk, start_time, width_s, columns, values }。columns（配列）を渡すとその列だけ返る
+  static async getGameTimeline(gamepk, widthS = 60, columns = null) {
+    const params = { gamepk: gamepk, width: widthS };
+    if (columns) params.columns = columns.join(",");
+    return ApiService.callGetApi("api/clusterVisualization/timeline", params);
+  }
+
+  // k を省略するとサーバー側でエルボー法により決定し、elbow も返る
+  static async getSeasonClusters(k = null, seed = 0, dataset = undefined) {
+    const params = { seed: seed };
+    if (k !== null) params.k = k;
+    if (dataset !== undefined) params.dataset = dataset;
+    return ApiService.callGetApi(
+      "api/clusterVisualization/season-clusters",
+      params,
+    );
+  }
 }
@@ -15,6 +15,10 @@ export async function loadJsonData(filePath) {
       throw new Error(`HTTP error! status: ${response.status}`);
     }
     const data = await response.json();
+    // 列指向の形式（preprocess/columnar_export.py）なら行の配列に戻す
+    if (data && data.format === "season-columnar") {
+      return decodeColumnarSeason(data);
+    }
     return data;
   } catch (error) {
     console.error("Error loading JSON data:", error);
@@ -22,6 +26,63 @@ export async function loadJsonData(filePath) {
   }
 }
 
+/**
+ * 列指向の形式（列ごとの配列 + チーム・日付の文字列テーブル）を行の配列に戻す
+ * @param {Object} doc - { format, length, encoding, strings, columns }
+ * @returns {Array} - 元の JSON と同じ形の行の配列
+ */
+export function decodeColumnarSeason(doc) {
+  const { columns, strings } = doc;
+  const rows = new Array(doc.length);
+  const deltaGamepk = doc.encoding?.gamepk === "delta";
+  let gamepk = 0;
+
+  for (let i = 0; i < doc.length; i++) {
+    gamepk = deltaGamepk ? gamepk + columns.gamepk[i] : columns.gamepk[i];
+    const row = {
+      gamepk,
+      time: columns.time[i],
+      ex_base_hit_cnt: columns.ex_base_hit_cnt[i],
+      total_score: columns.total_score[i],
+      diff_score: columns.diff_score[i],
+      lead_change_cnt: columns.lead_change_cnt[i],
+    };
+    if (columns.date[i] !== null) {
+      row.date = strings.date[columns.date[i]];
+    }
+    if (columns.away[i] !== null) {
+      row.team = {
+        away: strings.team[columns.away[i]],
+        home: strings.team[columns.home[i]],
+      };
+    }
+    rows[i] = row;
+  }
+  return rows;
+}
+
+/**
+ * manifest.json に列指向の形式があれば、そのファイル（ハッシュ入りの名前）のパスを返す
+ * manifest が無い・載っていない場合は元のパスのまま
+ * @param {string} filePath - 元の JSON ファイルのパス
+ * @returns {Promise<string>} - 読み込むファイルのパス
+ */
+export async function resolveDataPath(filePath) {
+  const dir = filePath.slice(0, filePath.lastIndexOf("/") + 1);
+  const name = filePath.slice(dir.length).replace(/\.json$/, "");
+  try {
+    const response = await fetch(`${dir}manifest.json`, { cache: "no-cache" });
+    if (!response.ok) {
+      return filePath;
+    }
+    const manifest = await response.json();
+    const columnar = manifest.datasets?.[name]?.columnar;
+    return columnar ? `${dir}${columnar.path}` : filePath;
+  } catch {
+    return filePath;
+  }
+}
+
 /**
  * gamepk 以外の特徴量を抽出し、date と team 情報も保持
  * @param {Array} rawData - 元データ
@@ -145,7 +206,7 @@ export function denormalizeFeatures(
 export async function processGameData(filePath = "/data/testdata.json") {
   try {
     // 1. JSON データを読み込み
-    const originalData = await loadJsonData(filePath);
+    const originalData = await loadJsonData(await resolveDataPath(filePath));
     console.log(`✅ JSON データを読み込みました: ${originalData.length} 件`);
 
     // 2. 特徴量を抽出
@@ -1,4 +1,9 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ONE_MS = timedelta(milliseconds=1)
 
 # NOTE:ISO 8601フォーマットの文字列（小数秒あり）を引数にとる
 def calc_time_diff(start_time,end_time):
@@ -11,3 +16,37 @@ def calc_time_diff(start_time,end_time):
     duration = end_dt - start_dt
     
     return duration.total_seconds()
+
+# NOTE:ISO 8601の文字列をエポックミリ秒(int)に。時刻が無い({}やNone)場合はNone
+# 処理の中で1イベントにつき1回だけパースし、以降はこの整数を使う
+def parse_epoch_ms(t):
+    if not t:
+        return None
+    return (datetime.fromisoformat(t.replace("Z", "+00:00")) - EPOCH) // ONE_MS
+
+# エポックミリ秒同士の差(秒)。calc_time_diff と同じ値になる(MLBの時刻はミリ秒精度)
+def calc_time_diff_ms(start_ms,end_ms):
+    if start_ms is None or end_ms is None:
+        return None
+    return (end_ms - start_ms) / 1000
+
+# NOTE:処理済みイベントの time から start/end のエポックミリ秒を取る。start_ms/end_ms を持たない古い処理済みデータは文字列からパースする
+def event_time_ms(time, key):
+    ms = time.get(f"{key}_ms")
+    if ms is not None:
+        return ms
+    return parse_epoch_ms(time[f"{key}_time"])
+
+def epoch_ms_to_datetime(ms):
+    return EPOCH + timedelta(milliseconds=ms)
+
+# NOTE:1試合分の時刻の列をまとめてパースする。時刻が無いものは -1
+def parse_epoch_ms_array(times):
+    times = list(times)
+    valid = np.array([bool(t) for t in times], dtype=bool)
+    out = np.full(len(times), -1, dtype=np.int64)
+    if valid.any():
+        # NOTE:numpy は末尾の "Z"(タイムゾーン指定)を受け付けないので落とす(UTCとして扱われる)
+        stripped = [t[:-1] if t.endswith("Z") else t for t, v in zip(times, valid) if v]
+        out[valid] = np.array(stripped, dtype="datetime64[ms]").astype(np.int64)
+    return out
@@ -0,0 +1,389 @@
+# フロント向けのデータ(シーズンの試合サマリー配列 / LRA の分ごとの結果)を、列指向 + 文字列テーブルの形式で書き出す
+# 行ごとに同じキー名・チーム名・選手名を繰り返さないよう、列ごとの配列と辞書(チーム・日付・選手・イベント名)に分ける。
+# 書き出すと同じディレクトリに .gz / .br を並べ、中身のハッシュ入りのファイル名を manifest.json に載せる(キャッシュ破棄用)
+#
+# 例: python preprocess/columnar_export.py frontend/public/data/2025-03-16-2025-06-16.json
+#     python preprocess/columnar_export.py frontend/public/data/2025-03-16-2025-06-16.json --format columnar msgpack
+#     python preprocess/columnar_export.py data/logistic_regression_analysis/777511_logistic_regression_analysis_data.json --report-only
+
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import time
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocess.raw_cache import atomic_write
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# NOTE:msgpack は任意。無ければ列指向の JSON だけ書き出す
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+SEASON_FORMAT = "season-columnar"
+LRA_FORMAT = "lra-columnar"
+FORMAT_VERSION = 1
+FORMATS = ["columnar", "msgpack"]
+EXTENSIONS = {"columnar": "json", "msgpack": "msgpack"}
+
+# シーズンの1試合分のキー(この順で復元する)
+SEASON_NUMERIC = ["gamepk", "time", "ex_base_hit_cnt", "total_score", "diff_score", "lead_change_cnt"]
+BASES = ["1B", "2B", "3B"]
+COUNT_KEYS = ["balls", "strikes", "outs"]
+
+class StringTable:
+    def __init__(self, values=()):
+        self.values = []
+        self.index = {}
+        for value in values:
+            self.add(value)
+
+    def add(self, value):
+        idx = self.index.get(value)
+        if idx is None:
+            idx = self.index[value] = len(self.values)
+            self.values.append(value)
+        return idx
+
+# NOTE:gamepk はほぼ連番なので、前の試合との差分で持つ(JSON の桁数が減る)
+def delta_encode(values):
+    out = []
+    prev = 0
+    for value in values:
+        out.append(value - prev)
+        prev = value
+    return out
+
+def delta_decode(values):
+    out = []
+    prev = 0
+    for value in values:
+        prev += value
+        out.append(prev)
+    return out
+
+# --- シーズン(get_score の配列) ---
+
+# time_precision を指定すると time を小数点以下その桁で丸める(指定しなければ元の値のまま = 可逆)
+def encode_season(rows, time_precision=None):
+    dates = StringTable()
+    teams = StringTable()
+    columns = {name: [] for name in SEASON_NUMERIC}
+    columns.update(date=[], away=[], home=[])
+    for row in rows:
+        for name in SEASON_NUMERIC:
+            columns[name].append(row.get(name))
+        if time_precision is not None and columns["time"][-1] is not None:
+            columns["time"][-1] = round(columns["time"][-1], time_precision)
+        # NOTE:date / team が無い行(古い出力)は null。復元時はキーごと省く
+        date = row.get("date")
+        columns["date"].append(None if date is None else dates.add(date))
+        team = row.get("team")
+        columns["away"].append(None if team is None else teams.add(team.get("away")))
+        columns["home"].append(None if team is None else teams.add(team.get("home")))
+    columns["gamepk"] = delta_encode(columns["gamepk"])
+    return {
+        "format": SEASON_FORMAT,
+        "version": FORMAT_VERSION,
+        "length": len(rows),
+        "encoding": {"gamepk": "delta"},
+        "strings": {"date": dates.values, "team": teams.values},
+        "columns": columns,
+    }
+
+def decode_season(doc):
+    columns = doc["columns"]
+    dates = doc["strings"]["date"]
+    teams = doc["strings"]["team"]
+    gamepks = delta_decode(columns["gamepk"]) if doc.get("encoding", {}).get("gamepk") == "delta" else columns["gamepk"]
+    rows = []
+    for i in range(doc["length"]):
+        row = {"gamepk": gamepks[i]}
+        for name in SEASON_NUMERIC[1:]:
+            row[name] = columns[name][i]
+        if columns["date"][i] is not None:
+            row["date"] = dates[columns["date"][i]]
+        if columns["away"][i] is not None:
+            row["team"] = {"away": teams[columns["away"][i]], "home": teams[columns["home"][i]]}
+        rows.append(row)
+    return rows
+
+# --- LRA({分: {"prob", "detail": [...]}}) ---
+
+# NOTE:選手は (id, full_name) の組で1つの番号にする。0 は走者なし({"id": null, "full_name": null})
+def encode_lra(data):
+    players = StringTable([(None, None)])
+    names = StringTable()
+    events = StringTable()
+    minutes = {"key": [], "prob": [], "offset": [0]}
+    columns = {name: [] for name in ["inning", "inning_top", "batter", "event"] + COUNT_KEYS}
+    for phase in ["pre", "pos"]:
+        for base in BASES + ["out"]:
+            columns[f"{phase}_{base}"] = []
+
+    def player(entry):
+        if entry is None:
+            return None
+        return players.add((entry.get("id"), entry.get("full_name")))
+
+    for key, value in data.items():
+        minutes["key"].append(str(key))
+        minutes["prob"].append(float(value["prob"]))
+        for detail in value["detail"]:
+            columns["inning"].append(detail.get("inning"))
+            columns["inning_top"].append(None if detail.get("inning_top") is None else int(detail["inning_top"]))
+            columns["batter"].append(None if detail.get("batter") is None else names.add(detail["batter"]))
+            columns["event"].append(None if detail.get("event") is None else events.add(detail["event"]))
+            count = detail.get("count") or {}
+            extra = set(count) - set(COUNT_KEYS)
+            if extra:
+                raise ValueError(f"unsupported count keys: {sorted(extra)}")
+            for name in COUNT_KEYS:
+                columns[name].append(count.get(name))
+            runner_state = detail.get("runner_state", {})
+            for phase in ["pre", "pos"]:
+                state = runner_state.get(f"{phase}_runner_state", {})
+                for base in BASES:
+                    columns[f"{phase}_{base}"].append(player(state.get(base)))
+                # NOTE:アウトになった走者のキーは None(JSON にすると "null")
+                columns[f"{phase}_out"].append(player(state.get(None, state.get("null"))))
+        minutes["offset"].append(len(columns["inning"]))
+
+    return {
+        "format": LRA_FORMAT,
+        "version": FORMAT_VERSION,
+        "length": len(minutes["key"]),
+        "strings": {
+            "player": [list(p) for p in players.values],
+            "name": names.values,
+            "event": events.values,
+        },
+        "minutes": minutes,
+        "columns": columns,
+    }
+
+# JSON で読み直したときと同じ形({"<分>": ...}、アウトの走者のキーは "null")で返す
+def decode_lra(doc):
+    strings = doc["strings"]
+    players = [{"id": p[0], "full_name": p[1]} for p in strings["player"]]
+    columns = doc["columns"]
+    minutes = doc["minutes"]
+    data = {}
+    for m, key in enumerate(minutes["key"]):
+        detail = []
+        for i in range(minutes["offset"][m], minutes["offset"][m + 1]):
+            runner_state = {}
+            for phase in ["pre", "pos"]:
+                state = {base: players[columns[f"{phase}_{base}"][i]] for base in BASES}
+                if columns[f"{phase}_out"][i] is not None:
+                    state["null"] = players[columns[f"{phase}_out"][i]]
+                runner_state[f"{phase}_runner_state"] = state
+            detail.append({
+                "inning": columns["inning"][i],
+                "inning_top": None if columns["inning_top"][i] is None else bool(columns["inning_top"][i]),
+                "batter": None if columns["batter"][i] is None else strings["name"][columns["batter"][i]],
+                "count": {name: columns[name][i] for name in COUNT_KEYS if columns[name][i] is not None},
+                "event": None if columns["event"][i] is None else strings["event"][columns["event"][i]],
+                "runner_state": runner_state,
+            })
+        data[key] = {"prob": minutes["prob"][m], "detail": detail}
+    return data
+
+def encode(data, time_precision=None):
+    if isinstance(data, list):
+        return encode_season(data, time_precision)
+    return encode_lra(data)
+
+def decode(doc):
+    if doc.get("format") == SEASON_FORMAT:
+        return decode_season(doc)
+    if doc.get("format") == LRA_FORMAT:
+        return decode_lra(doc)
+    raise ValueError(f"unknown format: {doc.get('format')}")
+
+# --- 書き出し ---
+
+def dumps_compact(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+# NOTE:msgpack が入っていなければ外して警告する(書き出しの途中で失敗しないように)
+def available_formats(formats):
+    available = [fmt for fmt in formats if fmt != "msgpack" or msgpack is not None]
+    if len(available) < len(formats):
+        print("⚠️ msgpack がインストールされていないため、msgpack は書き出しません")
+    return available
+
+def serialize(doc, fmt):
+    if fmt == "columnar":
+        return dumps_compact(doc)
+    if fmt == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("msgpack がインストールされていません(pip install msgpack)")
+        return msgpack.packb(doc, use_bin_type=True)
+    raise ValueError(f"unknown format: {fmt}")
+
+def deserialize(body, fmt):
+    if fmt == "msgpack":
+        return msgpack.unpackb(body, raw=False, strict_map_key=False)
+    return json.loads(body)
+
+# NOTE:gzip は mtime=0 にして、中身が同じなら .gz も同じバイト列になるようにする
+def compress(body):
+    compressed = {"gz": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressed["br"] = brotli.compress(body, quality=11)
+    return compressed
+
+# 本体と .gz / .br を書き出し、manifest に載せる情報を返す
+def write_with_siblings(path, body):
+    atomic_write(path, body)
+    entry = {"path": os.path.basename(path), "bytes": len(body), "sha256": hashlib.sha256(body).hexdigest()}
+    for ext, compressed in compress(body).items():
+        atomic_write(f"{path}.{ext}", compressed)
+        entry[ext] = len(compressed)
+    return entry
+
+def manifest_path_for(output_dir):
+    return os.path.join(output_dir, "manifest.json")
+
+def load_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"version": FORMAT_VERSION, "datasets": {}}
+
+# <name>.<fmt>.*.<拡張子>(と .gz / .br)のうち keep で始まらないものを消す
+def remove_exports(output_dir, name, fmt, keep=None):
+    for old in glob.glob(os.path.join(output_dir, f"{glob.escape(name)}.{fmt}.*.{EXTENSIONS[fmt]}*")):
+        if keep is None or not os.path.basename(old).startswith(keep):
+            os.remove(old)
+
+# NOTE:元の JSON だけ書き直したときに、manifest が古い列指向のファイルを指したままにならないよう、
+# その名前の書き出し済みファイルと manifest の項目を消す(フロントは元の JSON を読むようになる)
+def drop_dataset(json_path, output_dir=None):
+    output_dir = output_dir or os.path.dirname(json_path)
+    name = os.path.splitext(os.path.basename(json_path))[0]
+    for fmt in FORMATS:
+        remove_exports(output_dir, name, fmt)
+    manifest_path = manifest_path_for(output_dir)
+    if not os.path.exists(manifest_path):
+        return False
+    manifest = load_manifest(manifest_path)
+    if manifest.get("datasets", {}).pop(name, None) is None:
+        return False
+    atomic_write(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+    return True
+
+# ファイル名は <元の名前>.<形式>.<ハッシュ10桁>.<拡張子>。前回書き出した古いハッシュのファイルと、今回書き出さない形式のファイルは消す
+def export_data(data, name, output_dir, formats=("columnar",), time_precision=None, source_path=None):
+    doc = encode(data, time_precision)
+    manifest_path = manifest_path_for(output_dir)
+    manifest = load_manifest(manifest_path)
+    dataset = {"kind": doc["format"], "length": doc["length"], "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    if source_path is not None:
+        dataset["source"] = {"path": os.path.basename(source_path), "bytes": os.path.getsize(source_path)}
+    os.makedirs(output_dir, exist_ok=True)
+    for fmt in formats:
+        body = serialize(doc, fmt)
+        digest = hashlib.sha256(body).hexdigest()[:10]
+        filename = f"{name}.{fmt}.{digest}.{EXTENSIONS[fmt]}"
+        dataset[fmt] = write_with_siblings(os.path.join(output_dir, filename), body)
+        remove_exports(output_dir, name, fmt, keep=filename)
+    for fmt in FORMATS:
+        if fmt not in formats:
+            remove_exports(output_dir, name, fmt)
+    manifest.setdefault("datasets", {})[name] = dataset
+    atomic_write(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+    return dataset
+
+def export_dataset(json_path, formats=("columnar",), output_dir=None, time_precision=None):
+    with open(json_path, encoding="utf-8") as f:
+        data = json.load(f)
+    name = os.path.splitext(os.path.basename(json_path))[0]
+    return export_data(data, name, output_dir or os.path.dirname(json_path), formats, time_precision, json_path)
+
+# --- 比較 ---
+
+def best_ms(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+# NOTE:現行の形式(indent=4 の JSON)と比べて、サイズ(生 / gzip / brotli)と読み込み時間(パース + 行の形に戻す)を測る。
+# 時間は Python での値なので、ブラウザの JSON.parse とは絶対値は違うが比は目安になる
+def size_report(data, time_precision=None, repeat=5):
+    doc = encode(data, time_precision)
+    variants = [
+        ("json indent=4 (現行)", json.dumps(data, ensure_ascii=False, indent=4).encode("utf-8"), "json", False),
+        ("json compact", dumps_compact(data), "json", False),
+        ("columnar json", serialize(doc, "columnar"), "columnar", True),
+    ]
+    if msgpack is not None:
+        variants.append(("columnar msgpack", serialize(doc, "msgpack"), "msgpack", True))
+
+    report = []
+    for label, body, fmt, columnar in variants:
+        compressed = compress(body)
+        parse_ms = best_ms(lambda: deserialize(body, fmt), repeat)
+        parsed = deserialize(body, fmt)
+        decode_ms = best_ms(lambda: decode(parsed), repeat) if columnar else 0.0
+        report.append({
+            "format": label,
+            "bytes": len(body),
+            "gz": len(compressed["gz"]),
+            "br": len(compressed.get("br", b"")) or None,
+            "parse_ms": parse_ms,
+            "decode_ms": decode_ms,
+        })
+    return report
+
+def print_report(report):
+    base = report[0]
+    print(f"{'format':<24}{'bytes':>10}{'gz':>10}{'br':>10}{'parse ms':>10}{'decode ms':>11}{'size':>8}")
+    for r in report:
+        br = "-" if r["br"] is None else r["br"]
+        print(f"{r['format']:<24}{r['bytes']:>10}{r['gz']:>10}{br:>10}{r['parse_ms']:>10.2f}{r['decode_ms']:>11.2f}"
+              f"{r['bytes'] / base['bytes']:>8.1%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="+", help="シーズンの JSON(get_score の配列) / LRA の JSON")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=["columnar"])
+    parser.add_argument("--output-dir", help="既定は元の JSON と同じディレクトリ")
+    parser.add_argument("--time-precision", type=int, default=None, help="time を丸める桁数(既定は丸めない)")
+    parser.add_argument("--report-only", action="store_true", help="書き出さず、現行の形式とのサイズ・読み込み時間の比較だけ出す")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for path in args.paths:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        print(path)
+        # NOTE:書き出す前に、戻したものが元と一致するか確かめる(time を丸めたときはシーズンの time 以外)
+        if args.time_precision is None and decode(encode(data)) != data:
+            raise SystemExit(f"❌ 列指向に変換して戻した結果が元と一致しません: {path}")
+        print_report(size_report(data, args.time_precision, args.repeat))
+        if args.report_only:
+            continue
+        formats = available_formats(args.format)
+        if not formats:
+            continue
+        dataset = export_dataset(path, formats, args.output_dir, args.time_precision)
+        for fmt in formats:
+            print(f"保存完了：{os.path.join(args.output_dir or os.path.dirname(path), dataset[fmt]['path'])} (+ .gz / .br)")
@@ -0,0 +1,149 @@
+import threading
+import time
+import sys
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocess.data_processor import API_BASE_URL
+from preprocess.raw_cache import get_raw_cache
+from preprocess.profiling import stage, count
+
+# NOTE:リトライ対象のステータス(レート制限とサーバー側の一時エラー)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# NOTE:start〜end(YYYY-MM-DD、両端含む)をスケジュール API の日付形式(MM/DD/YYYY)のリストにする
+# 日付の形式がおかしい・start が end より後・max_days を超える期間は ValueError
+def date_range(start, end, max_days=None):
+    start_date = datetime.strptime(start, "%Y-%m-%d")
+    end_date = datetime.strptime(end, "%Y-%m-%d")
+    days = (end_date - start_date).days + 1
+    if days < 1:
+        raise ValueError(f"start ({start}) is after end ({end})")
+    if max_days is not None and days > max_days:
+        raise ValueError(f"date range must be 1-{max_days} days")
+    return [(start_date + timedelta(days=i)).strftime("%m/%d/%Y") for i in range(days)]
+
+def fetch_season_gamepks(start, end):
+    crawler = Crawler()
+    gamepks = []
+    for date in date_range(start, end):
+        gamepks.extend(crawler.fetch_gamepks(date))
+    return gamepks
+
+def extract_gamepks(schedule):
+    try:
+        games = schedule["dates"][0]["games"]
+        return [g["gamePk"] for g in games if g.get("seriesDescription") == "Regular Season" and g["status"].get("statusCode") == "F"]
+    except Exception:
+        return []
+
+class Crawler:
+    def __init__(self, base_url=API_BASE_URL, max_workers=16, per_host_limit=8, max_retries=3, backoff=0.5, timeout=30, use_cache=True):
+        self.base_url = base_url
+        self.cache = get_raw_cache() if use_cache else None
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self._local = threading.local()
+        self._host_limits = {}
+        self._host_lock = threading.Lock()
+
+    # NOTE:requests.Sessionはスレッド間で共有しない。スレッドごとに持たせてkeep-aliveで再利用する
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.per_host_limit)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._local.session = session
+        return session
+
+    def _host_limit(self, url):
+        host = urlparse(url).netloc
+        with self._host_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_limits[host]
+
+    def get_json(self, url):
+        limit = self._host_limit(url)
+        for attempt in range(self.max_retries + 1):
+            try:
+                with limit, stage("download"):
+                    resp = self._session().get(url, timeout=self.timeout)
+                count("bytes_fetched", len(resp.content))
+                if resp.ok:
+                    return resp.json()
+                if resp.status_code not in RETRY_STATUS:
+                    return None
+            except (requests.ConnectionError, requests.Timeout):
+                pass
+            if attempt < self.max_retries:
+                # NOTE:指数バックオフ
+                time.sleep(self.backoff * (2 ** attempt))
+        return None
+
+    # NOTE:スケジュールが取れなかった日は None(試合がない日は [])
+    def fetch_schedule(self, date_str):
+        schedule = self.get_json(f"{self.base_url}/api/v1/schedule?sportId=1&date={date_str}")
+        if schedule is None:
+            return None
+        return extract_gamepks(schedule)
+
+    def fetch_gamepks(self, date_str):
+        return self.fetch_schedule(date_str) or []
+
+    def fetch_feed(self, gamepk):
+        if self.cache is not None:
+            data = self.cache.get(gamepk)
+            if data is not None:
+                count("cache_hits")
+                return data
+            count("cache_misses")
+        data = self.get_json(f"{self.base_url}/api/v1.1/game/{gamepk}/feed/live")
+        if data is not None and self.cache is not None:
+            self.cache.put(gamepk, data)
+        return data
+
+    # NOTE:取得は並列だが、結果は日付順・スケジュール順で返す
+    # NOTE:skip(gamepk) が True の試合は生データを取りに行かない(保存済みのサマリーがある場合など)
+    # NOTE:with_order=True なら (gamepk, raw_data, その日のスケジュール内の位置) を返す。位置は skip の前に数える
+    def crawl(self, dates, skip=None, with_order=False):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            gamepks = []
+            for pks in executor.map(self.fetch_gamepks, dates):
+                gamepks.extend((pk, order) for order, pk in enumerate(pks) if skip is None or not skip(pk))
+
+            # NOTE:未消費の生データを溜め込みすぎないよう、投入数をウィンドウで制限する
+            window = deque()
+            pending = iter(gamepks)
+            for gamepk, order in pending:
+                window.append((gamepk, order, executor.submit(self.fetch_feed, gamepk)))
+                if len(window) >= self.max_workers * 2:
+                    break
+            while window:
+                gamepk, order, future = window.popleft()
+                next_item = next(pending, None)
+                if next_item is not None:
+                    window.append((*next_item, executor.submit(self.fetch_feed, next_item[0])))
+                raw_data = future.result()
+                if raw_data is None:
+                    print(f"取得失敗: {gamepk}")
+                    continue
+                if with_order:
+                    yield gamepk, raw_data, order
+                else:
+                    yield gamepk, raw_data
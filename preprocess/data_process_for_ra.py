@@ -5,6 +5,9 @@ import os
 # プロジェクトルートをパスに追加
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from preprocess.profiling import timed
+
+@timed("get_scores")
 def get_scores(processed_data):
     game_data = processed_data
     scores_data = {}
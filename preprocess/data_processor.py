@@ -1,51 +1,118 @@
 import json
-import requests
 import sys
 import os
 
 # プロジェクトルートをパスに追加
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from preprocess.calculate.measure_time import calc_time_diff
+from preprocess.calculate.measure_time import parse_epoch_ms, calc_time_diff_ms
+from preprocess.raw_cache import get_raw_cache
+from preprocess.profiling import stage, timed, count
+from preprocess.runner_state import PlayerTable, EMPTY_STATE
 
-def data_download(gamepk):
-    url = f"https://statsapi.mlb.com/api/v1.1/game/{gamepk}/feed/live"
-    resp = requests.get(url)
+# NOTE:ローカルのスタンドインサーバーで試す場合は環境変数で差し替える
+API_BASE_URL = os.environ.get("MLB_API_BASE_URL", "https://statsapi.mlb.com")
+
+def data_download(gamepk, use_cache=True):
+    # NOTE:終了済みの試合は内容が変わらないのでディスクキャッシュから返す
+    cache = get_raw_cache() if use_cache else None
+    if cache is not None:
+        data = cache.get(gamepk)
+        if data is not None:
+            count("cache_hits")
+            return data
+        count("cache_misses")
+
+    # NOTE:キャッシュから返せるときや処理だけ使うときに読み込まないよう、取得する直前で import する
+    import requests
+
+    url = f"{API_BASE_URL}/api/v1.1/game/{gamepk}/feed/live"
+    with stage("download"):
+        resp = requests.get(url)
+    count("bytes_fetched", len(resp.content))
     if resp.ok:
-        return resp.json()
+        data = resp.json()
+        if cache is not None:
+            cache.put(gamepk, data)
+        return data
     else:
         return None
 
-def process_data(data):
+# NOTE:1打席分の処理。process_data / process_data_stream / IncrementalProcessor で共通。
+# state は打席開始時点の (isInningTop_, pre_runner_state, pre_away_score, pre_home_score)。
+# 戻り値は (その打席のイベント {e_idx: event}, 打席終了時点の state)
+def process_play(play, p_idx, state, last_inning, players, compact=False):
+    isInningTop_, pre_runner_state, pre_away_score, pre_home_score = state
+    playEvents = play["playEvents"]
+    isInningTop = play["about"]["isTopInning"]
+
+    events = {}
+    for e_idx, event in enumerate(playEvents):
+        # NOTE:周辺イベントの排除(ウォーミングアップやタイム)
+        if event["type"] == "action" and event.get("isBaseRunningPlay") == None:
+            continue
+        
+        is_inning_first = isInningTop_ != isInningTop
+        if is_inning_first:
+            isInningTop_ = not isInningTop_
+        
+        isLast = e_idx == len(play["playEvents"])-1
+        isPlayFirst = p_idx == 0
+        
+        events[e_idx], pre_runner_state,pre_away_score,pre_home_score = process_event(play,event,is_inning_first,isPlayFirst,isLast,pre_runner_state,p_idx,e_idx,pre_home_score,pre_away_score,0,0,last_inning,players,compact)
+    return events, (isInningTop_, pre_runner_state, pre_away_score, pre_home_score)
+
+INITIAL_PLAY_STATE = (False, EMPTY_STATE, 0, 0)
+
+def count_processed(event_lookup):
+    count("games")
+    count("plays", len(event_lookup))
+    count("events", sum(len(events) for events in event_lookup.values()))
+
+# NOTE:compact=True だと runner_state は RunnerState のまま持つ(従来の形が必要なら expand_runner_states か
+# json.dump(..., default=players.json_default) で展開する)。選手名は players(PlayerTable)に試合で1回だけ持つ
+@timed("process_data")
+def process_data(data, compact=False, players=None):
     allPlays = data["liveData"]["plays"]["allPlays"]
     event_lookup = {}
-    isInningTop_ = False
-    pre_runner_state = {}
-    pre_home_score,pre_away_score,pos_home_score,pos_away_score = 0,0,0,0
-    last_inning = max(play["about"]["inning"] for play in allPlays)
+    state = INITIAL_PLAY_STATE
+    players = PlayerTable() if players is None else players
+    # NOTE:試合開始前(打席がまだ無い)のフィードは空の event_lookup
+    last_inning = max((play["about"]["inning"] for play in allPlays), default=0)
     for p_idx, play in enumerate(allPlays):
-        playEvents = play["playEvents"]
-        isInningTop = play["about"]["isTopInning"]
-        
-        event_lookup[p_idx] = {}
-        for e_idx, event in enumerate(playEvents):
-            # NOTE:周辺イベントの排除(ウォーミングアップやタイム)
-            if event["type"] == "action" and event.get("isBaseRunningPlay") == None:
-                continue
-            
-            is_inning_first = isInningTop_ != isInningTop
-            if is_inning_first:
-                isInningTop_ = not isInningTop_
-            
-            isLast = e_idx == len(play["playEvents"])-1
-            isPlayFirst = p_idx == 0
-            
-            event_lookup[p_idx][e_idx], pre_runner_state,pre_away_score,pre_home_score = process_event(play,event,is_inning_first,isPlayFirst,isLast,pre_runner_state,p_idx,e_idx,pre_home_score,pre_away_score,pos_home_score,pos_away_score,last_inning)
-                
+        event_lookup[p_idx], state = process_play(play, p_idx, state, last_inning, players, compact)
+
+    count_processed(event_lookup)
+    return event_lookup
+
+# NOTE:allPlays を1打席ずつ受け取る版(stream_loader.iter_all_plays と組み合わせる)
+# last_inning は最後まで読まないと決まらないので、is_last_inning は最後にまとめて付け直す
+@timed("process_data")
+def process_data_stream(plays, compact=False, players=None):
+    event_lookup = {}
+    state = INITIAL_PLAY_STATE
+    players = PlayerTable() if players is None else players
+    last_inning = 0
+    for p_idx, play in enumerate(plays):
+        last_inning = max(last_inning, play["about"]["inning"])
+        event_lookup[p_idx], state = process_play(play, p_idx, state, last_inning, players, compact)
+    
+    for play in event_lookup.values():
+        for event in play.values():
+            event["is_last_inning"] = event["is_away"] == False and event["inning"] == last_inning
+
+    count_processed(event_lookup)
     return event_lookup
+
+# NOTE:ディスクキャッシュにある終了済みの試合のファイルから、フィード全体を読み込まずに処理する(ijson があれば1打席ずつ)
+def process_data_file(path, compact=False, players=None):
+    from preprocess.stream_loader import iter_all_plays
+    return process_data_stream(iter_all_plays(path), compact, players)
     
-def process_event(play,event,is_inning_first,isPlayFirst,isLast,pre_runner_state,p_idx,e_idx,pre_home_score,pre_away_score,pos_home_score,pos_away_score,last_inning):
+def process_event(play,event,is_inning_first,isPlayFirst,isLast,pre_runner_state,p_idx,e_idx,pre_home_score,pre_away_score,pos_home_score,pos_away_score,last_inning,players=None,compact=False):
     processed_event = {}
+    if players is None:
+        players = PlayerTable()
     
     # is away
     is_away = None
@@ -60,7 +127,8 @@ def process_event(play,event,is_inning_first,isPlayFirst,isLast,pre_runner_state
     # event type
     event_type = event["type"]
     description = event["details"].get("description")
-    pe_type = play["result"]["eventType"]
+    # NOTE:進行中の打席はresultにeventTypeが無い
+    pe_type = play["result"].get("eventType")
     
     if isLast:
         description = pe_type
@@ -70,29 +138,15 @@ def process_event(play,event,is_inning_first,isPlayFirst,isLast,pre_runner_state
     is_base_running_play = event.get("isBaseRunningPlay", "null")
         
     # batter
-    batter = {
-        "id":play["matchup"]["batter"]["id"],
-        "full_name":play["matchup"]["batter"]["fullName"],
-    }
+    # NOTE:{"id", "full_name"} は PlayerTable で選手ごとに1つだけ作って共有する
+    batter_id = players.add(play["matchup"]["batter"]["id"], play["matchup"]["batter"]["fullName"])
+    batter = players.entry(batter_id)
     
     # runner state
+    # NOTE:RunnerState(占有マスク + 塁ごとの選手ID)で遷移させ、従来の dict は出力時に組み立てる
     runner_state = {}
-    pos_runner_state = {}
     if is_inning_first:
-        pre_runner_state = {
-            "1B": {
-                "id":None,
-                "full_name":None
-            },
-            "2B": {
-                "id":None,
-                "full_name":None
-            },
-            "3B": {
-                "id":None,
-                "full_name":None
-            },
-        }
+        pre_runner_state = EMPTY_STATE
 
     base_movements = {}
     
@@ -111,36 +165,13 @@ def process_event(play,event,is_inning_first,isPlayFirst,isLast,pre_runner_state
             else:
                 base_movements[start_] = end
     
-    pos_runner_state = {
-        "1B": {"id": None, "full_name": None},
-        "2B": {"id": None, "full_name": None},
-        "3B": {"id": None, "full_name": None},
-    }
-
-    state = {"1B":False,"2B":False,"3B":False}
-    for k,v in base_movements.items():
-        state[k] = True
-        if not (v == "score"):
-            if k == None:
-                if v != None:
-                    pos_runner_state[v] = batter
-            else:
-                pos_runner_state[v] = pre_runner_state[k]
-    for sk,sv in state.items():
-        if sv == False and pre_runner_state[sk]["id"] != None:
-            pos_runner_state[sk] = pre_runner_state[sk]
+    pos_runner_state = pre_runner_state.advance(base_movements, batter_id)
     
     # runner count
+    # NOTE:塁上の人数はマスクの popcount(+ アウトになったランナー)
     runner_count = {}
-    pre_runner_count = 0
-    for v in pre_runner_state.values():
-        if v["id"] != None:
-            pre_runner_count += 1
-    
-    pos_runner_count = 0
-    for v in pos_runner_state.values():
-        if v["id"] != None:
-            pos_runner_count += 1
+    pre_runner_count = pre_runner_state.count()
+    pos_runner_count = pos_runner_state.count()
             
     # score from event
     score_from_event = 0
@@ -162,7 +193,7 @@ def process_event(play,event,is_inning_first,isPlayFirst,isLast,pre_runner_state
     # rbi
     rbi = 0
     if isLast:
-        rbi = play["result"]["rbi"]
+        rbi = play["result"].get("rbi", 0)
     
     # is_last_inning    
     is_last_inning =  is_away == False and inning == last_inning
@@ -171,7 +202,10 @@ def process_event(play,event,is_inning_first,isPlayFirst,isLast,pre_runner_state
     time = {}
     start_time = event.get("startTime",{})
     end_time = event.get("endTime",{})
-    diff_time = calc_time_diff(start_time,end_time)
+    # NOTE:時刻のパースはここで1回だけ。後段はエポックミリ秒(start_ms, end_ms)を使う
+    start_ms = parse_epoch_ms(start_time)
+    end_ms = parse_epoch_ms(end_time)
+    diff_time = calc_time_diff_ms(start_ms,end_ms)
     
     # detail
     detail = {}
@@ -189,8 +223,12 @@ def process_event(play,event,is_inning_first,isPlayFirst,isLast,pre_runner_state
     processed_event["is_base_running_play"] = is_base_running_play
     processed_event["batter"] = batter
     processed_event["runner_state"] = runner_state
-    runner_state["pre_runner_state"] = pre_runner_state
-    runner_state["pos_runner_state"] = pos_runner_state
+    if compact:
+        runner_state["pre_runner_state"] = pre_runner_state
+        runner_state["pos_runner_state"] = pos_runner_state
+    else:
+        runner_state["pre_runner_state"] = pre_runner_state.to_dict(players)
+        runner_state["pos_runner_state"] = pos_runner_state.to_dict(players)
     processed_event["runner_count"] = runner_count
     runner_count["pre_runner_count"] = pre_runner_count
     runner_count["pos_runner_count"] = pos_runner_count
@@ -209,10 +247,122 @@ def process_event(play,event,is_inning_first,isPlayFirst,isLast,pre_runner_state
     time["start_time"] = start_time
     time["end_time"] = end_time
     time["diff_time"] = diff_time
+    time["start_ms"] = start_ms
+    time["end_ms"] = end_ms
     processed_event["detail"] = detail
     
     return processed_event, pre_runner_state,pos_away_score,pos_home_score
 
+# NOTE:試合中のフィードを数秒おきにポーリングする用途向け。
+# 打席ごとに開始時点の状態(表裏・ランナー・得点)を保存しておき、未完了の打席(もしくはdiffPatchで変わった打席)から再開する
+class IncrementalProcessor:
+    def __init__(self):
+        self.raw_data = None
+        self.event_lookup = {}
+        self.last_inning = 0
+        # play_states[p_idx] = 打席p_idx開始時点の (isInningTop_, pre_runner_state, pre_away_score, pre_home_score)
+        self.play_states = [INITIAL_PLAY_STATE]
+        self.players = PlayerTable()
+        # NOTE:完了済みの打席の数(= 次に処理すべき打席のインデックス)
+        self.next_play = 0
+
+    def update(self, data, from_play=None):
+        self.raw_data = data
+        allPlays = data["liveData"]["plays"]["allPlays"]
+        start = self.next_play if from_play is None else min(from_play, self.next_play)
+        start = min(start, len(allPlays))
+        changed = {}
+
+        # last_inning は新しい打席だけ見て更新する
+        last_inning = max([self.last_inning] + [play["about"]["inning"] for play in allPlays[start:]])
+        if last_inning != self.last_inning:
+            for p_idx in range(start):
+                for e_idx, event in self.event_lookup[p_idx].items():
+                    is_last_inning = event["is_away"] == False and event["inning"] == last_inning
+                    if event["is_last_inning"] != is_last_inning:
+                        event["is_last_inning"] = is_last_inning
+                        changed.setdefault(p_idx, {})[e_idx] = event
+            self.last_inning = last_inning
+
+        del self.play_states[start + 1:]
+        state = self.play_states[start]
+        next_play = start
+        for p_idx in range(start, len(allPlays)):
+            play = allPlays[p_idx]
+            old_events = self.event_lookup.get(p_idx, {})
+            new_events, state = process_play(play, p_idx, state, self.last_inning, self.players)
+            for e_idx, event in new_events.items():
+                if old_events.get(e_idx) != event:
+                    changed.setdefault(p_idx, {})[e_idx] = event
+            self.event_lookup[p_idx] = new_events
+            self.play_states.append(state)
+            if next_play == p_idx and play["about"].get("isComplete"):
+                next_play = p_idx + 1
+
+        for p_idx in range(len(allPlays), len(self.event_lookup)):
+            del self.event_lookup[p_idx]
+        self.next_play = next_play
+        return changed
+
+    # NOTE:feed/live/diffPatch のレスポンスを受け取る。全体フィードが返ってきた場合はそのまま update する
+    def update_from_diff_patch(self, diff_patch):
+        if isinstance(diff_patch, dict):
+            return self.update(diff_patch)
+        from_play = None
+        for patch in diff_patch:
+            for op in patch.get("diff", []):
+                apply_json_patch_op(self.raw_data, op)
+                p_idx = touched_play_index(op["path"])
+                if p_idx is not None:
+                    from_play = p_idx if from_play is None else min(from_play, p_idx)
+        return self.update(self.raw_data, from_play)
+
+def touched_play_index(path):
+    parts = path.split("/")
+    if parts[1:4] == ["liveData", "plays", "allPlays"] and len(parts) > 4 and parts[4].isdigit():
+        return int(parts[4])
+    return None
+
+# NOTE:RFC 6902 (JSON Patch) の add/remove/replace/copy/move
+def apply_json_patch_op(doc, op):
+    def resolve(path):
+        parts = [p.replace("~1", "/").replace("~0", "~") for p in path.split("/")[1:]]
+        parent = doc
+        for p in parts[:-1]:
+            parent = parent[int(p)] if isinstance(parent, list) else parent[p]
+        return parent, parts[-1]
+
+    def get(path):
+        parent, key = resolve(path)
+        return parent[int(key)] if isinstance(parent, list) else parent[key]
+
+    def remove(path):
+        parent, key = resolve(path)
+        return parent.pop(int(key)) if isinstance(parent, list) else parent.pop(key)
+
+    def add(path, value):
+        parent, key = resolve(path)
+        if isinstance(parent, list):
+            if key == "-":
+                parent.append(value)
+            else:
+                parent.insert(int(key), value)
+        else:
+            parent[key] = value
+
+    kind = op["op"]
+    if kind == "add":
+        add(op["path"], op["value"])
+    elif kind == "remove":
+        remove(op["path"])
+    elif kind == "replace":
+        parent, key = resolve(op["path"])
+        parent[int(key) if isinstance(parent, list) else key] = op["value"]
+    elif kind == "copy":
+        add(op["path"], json.loads(json.dumps(get(op["from"]))))
+    elif kind == "move":
+        add(op["path"], remove(op["from"]))
+
 def output_data(processed_data,gamepk):
     output_path = f"data/processed/{gamepk}_processed_data.json"
 
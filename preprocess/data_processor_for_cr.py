@@ -1,4 +1,11 @@
 import json
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocess.profiling import timed
 
 # def data_download():
 #     with open("data/processed/777471_processed_data.json", encoding="utf-8") as f:
@@ -63,6 +70,7 @@ def get_score(raw_data,data,gamepk):
     
     return score
     
+@timed("get_score")
 def data_process_for_cr(raw_data,process_data,gamepk):
     score = get_score(raw_data,process_data,gamepk)
     return score
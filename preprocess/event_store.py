@@ -0,0 +1,221 @@
+import json
+import sys
+import os
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocess.calculate.measure_time import parse_epoch_ms
+# ランナーのビットマスク(1B=1, 2B=2, 3B=4)
+from preprocess.runner_state import runner_state_mask
+
+# NOTE:process_data の入れ子dict(event_lookup[p_idx][e_idx])を列ごとのNumPy配列で持つ版
+# 1列 = 1フィールド。複数試合は gamepk 列で区別し、試合順・(打席, イベント)順に並べる
+
+
+COLUMNS = {
+    "gamepk": np.int64,
+    "play_idx": np.int32,
+    "event_idx": np.int32,
+    "inning": np.int8,
+    "is_away": np.bool_,
+    "is_inning_first": np.bool_,
+    "is_last_inning": np.bool_,
+    # NOTE:True=1, False=0, キー無し("null")=-1, null(None)=-2
+    "is_base_running_play": np.int8,
+    "event_type": np.int16,
+    "batter_id": np.int64,
+    "pre_runner_mask": np.uint8,
+    "pos_runner_mask": np.uint8,
+    # NOTE:runner_count は pos_runner_state[None](アウトになったランナー)も数えているのでマスクとは別に持つ
+    "pre_runner_count": np.int8,
+    "pos_runner_count": np.int8,
+    "score_from_event": np.int8,
+    "away_pre_score": np.int16,
+    "away_pos_score": np.int16,
+    "home_pre_score": np.int16,
+    "home_pos_score": np.int16,
+    "rbi": np.int8,
+    # NOTE:エポックミリ秒。時刻が無いイベントは -1
+    "start_ms": np.int64,
+    "end_ms": np.int64,
+    "diff_time": np.float64,
+}
+
+# NOTE:dict(従来の形)でも RunnerState(compact=True)でも受け付ける
+def runner_mask(runner_state):
+    return runner_state_mask(runner_state)
+
+def to_epoch_ms(t):
+    ms = parse_epoch_ms(t)
+    return -1 if ms is None else ms
+
+class EventStore:
+    def __init__(self, columns, event_types):
+        self.columns = columns
+        # event_type 列はこのリストへのインデックス(辞書エンコード)
+        self.event_types = event_types
+
+    def __len__(self):
+        return len(self.columns["play_idx"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @classmethod
+    def from_processed(cls, processed_data, gamepk, event_types=None):
+        event_types = list(event_types) if event_types is not None else []
+        codes = {t: i for i, t in enumerate(event_types)}
+        rows = {name: [] for name in COLUMNS}
+        for p_idx, play in processed_data.items():
+            for e_idx, event in play.items():
+                event_type = event["event_type"]
+                if event_type not in codes:
+                    codes[event_type] = len(event_types)
+                    event_types.append(event_type)
+                is_base_running_play = event["is_base_running_play"]
+                team_score = event["team_score"]
+                time = event["time"]
+                start_ms = time.get("start_ms")
+                end_ms = time.get("end_ms")
+
+                rows["gamepk"].append(int(gamepk))
+                rows["play_idx"].append(int(p_idx))
+                rows["event_idx"].append(int(e_idx))
+                rows["inning"].append(event["inning"])
+                rows["is_away"].append(event["is_away"])
+                rows["is_inning_first"].append(event["is_inning_first"])
+                rows["is_last_inning"].append(event["is_last_inning"])
+                if isinstance(is_base_running_play, bool):
+                    rows["is_base_running_play"].append(int(is_base_running_play))
+                else:
+                    rows["is_base_running_play"].append(-2 if is_base_running_play is None else -1)
+                rows["event_type"].append(codes[event_type])
+                rows["batter_id"].append(event["batter"]["id"])
+                rows["pre_runner_mask"].append(runner_mask(event["runner_state"]["pre_runner_state"]))
+                rows["pos_runner_mask"].append(runner_mask(event["runner_state"]["pos_runner_state"]))
+                rows["pre_runner_count"].append(event["runner_count"]["pre_runner_count"])
+                rows["pos_runner_count"].append(event["runner_count"]["pos_runner_count"])
+                rows["score_from_event"].append(event["score_from_event"])
+                rows["away_pre_score"].append(team_score["away"]["pre_score"])
+                rows["away_pos_score"].append(team_score["away"]["pos_score"])
+                rows["home_pre_score"].append(team_score["home"]["pre_score"])
+                rows["home_pos_score"].append(team_score["home"]["pos_score"])
+                rows["rbi"].append(event["rbi"])
+                # NOTE:start_ms を持たない古い処理済みデータは文字列からパースする
+                rows["start_ms"].append(start_ms if start_ms is not None else to_epoch_ms(time["start_time"]))
+                rows["end_ms"].append(end_ms if end_ms is not None else to_epoch_ms(time["end_time"]))
+                rows["diff_time"].append(np.nan if time["diff_time"] is None else time["diff_time"])
+        columns = {name: np.array(values, dtype=COLUMNS[name]) for name, values in rows.items()}
+        return cls(columns, event_types)
+
+    # NOTE:複数試合をまとめる。event_type の辞書は統合してコードを振り直す
+    @classmethod
+    def concat(cls, stores):
+        event_types = []
+        codes = {}
+        parts = {name: [] for name in COLUMNS}
+        for store in stores:
+            for t in store.event_types:
+                if t not in codes:
+                    codes[t] = len(event_types)
+                    event_types.append(t)
+            remap = np.array([codes[t] for t in store.event_types], dtype=np.int16)
+            for name in COLUMNS:
+                col = store.columns[name]
+                if name == "event_type" and len(col):
+                    col = remap[col]
+                parts[name].append(col)
+        columns = {name: np.concatenate(cols) if cols else np.array([], dtype=COLUMNS[name]) for name, cols in parts.items()}
+        return cls(columns, event_types)
+
+    def event_type_code(self, event_type):
+        try:
+            return self.event_types.index(event_type)
+        except ValueError:
+            return -1
+
+    def is_event_type(self, *event_types):
+        codes = [self.event_type_code(t) for t in event_types]
+        return np.isin(self.columns["event_type"], codes)
+
+    # 試合ごとの [start, end) の範囲
+    def game_slices(self):
+        gamepk = self.columns["gamepk"]
+        if len(gamepk) == 0:
+            return []
+        bounds = np.flatnonzero(np.diff(gamepk)) + 1
+        starts = np.concatenate([[0], bounds])
+        ends = np.concatenate([bounds, [len(gamepk)]])
+        return [(int(gamepk[s]), s, e) for s, e in zip(starts, ends)]
+
+    # --- 保存・読み込み ---
+    def save_npz(self, path):
+        np.savez_compressed(path, event_types=np.array(json.dumps(self.event_types)), **self.columns)
+
+    @classmethod
+    def load_npz(cls, path):
+        with np.load(path) as f:
+            columns = {name: f[name] for name in COLUMNS}
+            event_types = json.loads(str(f["event_types"]))
+        return cls(columns, event_types)
+
+    def to_arrow(self):
+        import pyarrow as pa
+        arrays = {name: pa.array(col) for name, col in self.columns.items()}
+        # NOTE:event_type は Arrow の辞書型にして文字列として読めるようにする
+        arrays["event_type"] = pa.DictionaryArray.from_arrays(
+            pa.array(self.columns["event_type"], type=pa.int16()),
+            pa.array(self.event_types, type=pa.string()),
+        )
+        return pa.table(arrays)
+
+    @classmethod
+    def from_arrow(cls, table):
+        columns = {}
+        event_types = []
+        for name, dtype in COLUMNS.items():
+            col = table.column(name).combine_chunks()
+            if name == "event_type":
+                event_types = col.dictionary.to_pylist()
+                columns[name] = col.indices.to_numpy(zero_copy_only=False).astype(dtype)
+            else:
+                columns[name] = col.to_numpy(zero_copy_only=False).astype(dtype)
+        return cls(columns, event_types)
+
+    def write_feather(self, path):
+        import pyarrow.feather as feather
+        feather.write_feather(self.to_arrow(), path, compression="zstd")
+
+    @classmethod
+    def read_feather(cls, path):
+        import pyarrow.feather as feather
+        return cls.from_arrow(feather.read_table(path))
+
+    def write_parquet(self, path):
+        import pyarrow.parquet as pq
+        pq.write_table(self.to_arrow(), path, compression="zstd")
+
+    @classmethod
+    def read_parquet(cls, path):
+        import pyarrow.parquet as pq
+        return cls.from_arrow(pq.read_table(path))
+
+    # NOTE:拡張子で形式を選ぶ(.npz は NumPy だけで読み書きできる。.feather / .parquet は pyarrow が必要)
+    def save(self, path):
+        if path.endswith(".feather"):
+            self.write_feather(path)
+        elif path.endswith(".parquet"):
+            self.write_parquet(path)
+        else:
+            self.save_npz(path)
+
+    @classmethod
+    def load(cls, path):
+        if path.endswith(".feather"):
+            return cls.read_feather(path)
+        if path.endswith(".parquet"):
+            return cls.read_parquet(path)
+        return cls.load_npz(path)
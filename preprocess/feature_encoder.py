@@ -0,0 +1,161 @@
+import sys
+import os
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocess.event_store import runner_mask
+
+# NOTE:data_process_for_ra.get_scores の play_features / situation_features を、
+# 1試合分(もしくは EventStore)まとめて one-hot の uint8 行列にする。
+# 列の並びは Logistic_regression_analysis.flatten_features と同じ
+
+FEATURE_GROUPS = {
+    "hit_event": ["single", "double", "triple", "home_run"],
+    "rbi_impact": ["regular_rbi", "tie_rbi", "go_ahead_rbi", "sayonara_rbi"],
+    "runner_status": [
+        "none", "first", "second", "third", "first-second",
+        "first-third", "second-third", "first-second-third"
+    ],
+    "is_goahead_runner_on_base": [None],
+    "score_difference": [
+        "minus_less_3", "minus_2", "minus_1", "tie",
+        "plus_1", "plus_2", "plus_more_3"
+    ],
+    # NOTE:get_situation_score では "early" が上書きされて inning >= 7 の1列だけになっている
+    "inning_phase": ["early"],
+}
+
+FEATURE_NAMES = [group if key is None else f"{group}.{key}" for group, keys in FEATURE_GROUPS.items() for key in keys]
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+# グループ名 -> 列の範囲
+FEATURE_SLICES = {}
+_start = 0
+for _group, _keys in FEATURE_GROUPS.items():
+    FEATURE_SLICES[_group] = slice(_start, _start + len(_keys))
+    _start += len(_keys)
+
+# runner_status の各列に対応する塁のビットマスク(1B=1, 2B=2, 3B=4)
+RUNNER_STATUS_MASKS = [0, 1, 2, 4, 3, 5, 6, 7]
+
+HIT_EVENT_TYPES = FEATURE_GROUPS["hit_event"]
+
+def encode_columns(is_hit, rbi, is_away, away_pre, home_pre, is_last_inning, pre_mask, pre_runner_count, inning):
+    n = len(rbi)
+    X = np.zeros((n, len(FEATURE_NAMES)), dtype=np.uint8)
+    rbi = rbi.astype(np.int32)
+    away_pre = away_pre.astype(np.int32)
+    home_pre = home_pre.astype(np.int32)
+
+    # hit_event
+    X[:, FEATURE_SLICES["hit_event"]] = is_hit
+
+    # rbi_impact
+    # 攻撃側から見た、相手チームとの点差(負けていれば正)
+    behind = np.where(is_away, home_pre - away_pre, away_pre - home_pre)
+    has_rbi = rbi > 0
+    # NOTE:表(away)は同点(behind == 0)でも判定に入り、裏(home)は負けている時だけ
+    judged = has_rbi & np.where(is_away, behind >= 0, behind > 0)
+    lead_taken = judged & (behind > rbi)
+    tie = judged & (behind == rbi) & is_away
+    sayonara = lead_taken & is_last_inning
+    go_ahead = lead_taken & ~is_last_inning
+    regular = has_rbi & ~tie & ~lead_taken
+    rbi_slice = FEATURE_SLICES["rbi_impact"]
+    X[:, rbi_slice.start + 0] = regular
+    X[:, rbi_slice.start + 1] = tie
+    X[:, rbi_slice.start + 2] = go_ahead
+    X[:, rbi_slice.start + 3] = sayonara
+
+    # runner_status
+    runner_slice = FEATURE_SLICES["runner_status"]
+    X[:, runner_slice] = pre_mask[:, None] == np.array(RUNNER_STATUS_MASKS, dtype=np.uint8)[None, :]
+
+    # is_goahead_runner_on_base
+    X[:, FEATURE_SLICES["is_goahead_runner_on_base"].start] = (behind > 0) & (pre_runner_count > behind)
+
+    # score_difference(get_situation_score では表の攻撃時のみ)
+    lead = np.clip(away_pre - home_pre, -3, 3)
+    diff_slice = FEATURE_SLICES["score_difference"]
+    X[:, diff_slice] = (lead[:, None] == np.arange(-3, 4)[None, :]) & is_away[:, None]
+
+    # inning_phase
+    X[:, FEATURE_SLICES["inning_phase"].start] = inning >= 7
+    return X
+
+# NOTE:process_data の出力(event_lookup)から。戻り値の keys は get_scores と同じ (p_idx, e_idx) の並び
+def encode_processed(processed_data):
+    keys = []
+    is_hit, rbi, is_away, away_pre, home_pre, is_last_inning, pre_mask, pre_runner_count, inning = [], [], [], [], [], [], [], [], []
+    for p_idx, play in processed_data.items():
+        for e_idx, event in play.items():
+            if event["event_type"] == "action" and event["is_base_running_play"] == None:
+                continue
+            team_score = event["team_score"]
+            keys.append((p_idx, e_idx))
+            is_hit.append([event["event_type"] == t for t in HIT_EVENT_TYPES])
+            rbi.append(event["rbi"])
+            is_away.append(event["is_away"])
+            away_pre.append(team_score["away"]["pre_score"])
+            home_pre.append(team_score["home"]["pre_score"])
+            is_last_inning.append(event["is_last_inning"])
+            pre_mask.append(runner_mask(event["runner_state"]["pre_runner_state"]))
+            pre_runner_count.append(event["runner_count"]["pre_runner_count"])
+            inning.append(event["inning"])
+    X = encode_columns(
+        np.array(is_hit, dtype=bool).reshape(-1, len(HIT_EVENT_TYPES)),
+        np.array(rbi, dtype=np.int32),
+        np.array(is_away, dtype=bool),
+        np.array(away_pre, dtype=np.int32),
+        np.array(home_pre, dtype=np.int32),
+        np.array(is_last_inning, dtype=bool),
+        np.array(pre_mask, dtype=np.uint8),
+        np.array(pre_runner_count, dtype=np.int32),
+        np.array(inning, dtype=np.int32),
+    )
+    return X, keys
+
+# NOTE:EventStore(複数試合可)から。戻り値の rows は store 内の行番号
+def encode_store(store):
+    event_type = store["event_type"]
+    keep = ~((event_type == store.event_type_code("action")) & (store["is_base_running_play"] == -2))
+    rows = np.flatnonzero(keep)
+    is_hit = np.stack([event_type[rows] == store.event_type_code(t) for t in HIT_EVENT_TYPES], axis=1)
+    X = encode_columns(
+        is_hit,
+        store["rbi"][rows],
+        store["is_away"][rows],
+        store["away_pre_score"][rows],
+        store["home_pre_score"][rows],
+        store["is_last_inning"][rows],
+        store["pre_runner_mask"][rows],
+        store["pre_runner_count"][rows],
+        store["inning"][rows],
+    )
+    return X, rows
+
+# NOTE:get_scores の出力(dict)の1イベント分を行に。辞書経由の従来パスとの突き合わせ用
+def flatten_score(e_score):
+    play = e_score["play_features"]
+    situ = e_score["situation_features"]
+    row = []
+    for group, keys in FEATURE_GROUPS.items():
+        if group == "is_goahead_runner_on_base":
+            row.append(int(situ.get(group, False)))
+            continue
+        features = play.get(group) if group in play else situ.get(group, {})
+        for key in keys:
+            row.append(int(features.get(key, False)))
+    return row
+
+def encode_scores(scores_data):
+    rows = []
+    keys = []
+    for p_idx, p_score in scores_data.items():
+        for e_idx, e_score in p_score.items():
+            rows.append(flatten_score(e_score))
+            keys.append((p_idx, e_idx))
+    return np.array(rows, dtype=np.uint8).reshape(-1, len(FEATURE_NAMES)), keys
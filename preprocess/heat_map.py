@@ -1,76 +1,110 @@
 import json
 import logging
-import matplotlib.pyplot as plt
 import sys
 import os
 
+import numpy as np
+
 # プロジェクトルートをパスに追加
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-logging.basicConfig(level=logging.WARNING)
-
-from calculate.measure_time import calc_time_diff
-
-with open("data/raw/game/777708.json", encoding="utf-8") as f:
-    data = json.load(f)
-
-all_plays = data["liveData"]["plays"]["allPlays"]
-
-durations = []
-sec = 0
-
-for play in all_plays:
-    # NOTE:True:表,False:裏
-    if  play["about"]["isTopInning"] == True:
-        events = play["playEvents"]
-
-        for event in events:
-            # NOTE:周辺イベントの排除(ウォーミングアップやタイム)
-            if event["type"] == "action" and event.get("isBaseRunningPlay") == None:
-                continue
-            # if event["details"].get("eventType") == "game_advisory":
-            #     continue
-            d = calc_time_diff(event["startTime"] ,event["endTime"])
-            sec += d
-            durations.append(d)
-            if d <= 0:
-                continue
-            
-            # NOTE:logの出し方忘れないように残しとく
-            # try:
-            #     print(event["details"]["description"])
-                
-            # # NOTE:keyがない:KeyError,eventが辞書でない等:TypeError
-            # except (KeyError, TypeError) as e:
-            #     logging.warning("description 取得失敗 (%s): %s", e, event)
-
-bins = [d/sec for d in durations]
-pos = []
-cur = 0
-# TODO:要素数はbinの個数に一致させる　
-# 評価値を正規化して(若しくは正規化された評価値を使用して)ヒートマップに反映する
-# 評価値を取得できるようになったら書き直すこと
-# scores = [i for i in range(len(bins))]
-scores = [idx for idx, _ in enumerate(bins)]
-
-# scores = get_scores()
-
-for bin_p in bins:
-    pos.append((cur,bin_p))
-    cur += bin_p
-
-cmap = plt.cm.get_cmap("viridis")
-normed = [(s - min(scores)) / (max(scores) - min(scores) + 1e-6) for s in scores]
-colors = [cmap(n) for n in normed]
-
-plt.figure(figsize=(10, 2))
-for (start, width), color in zip(pos, colors):
-    plt.barh(0, width, left=start, color=color, edgecolor='black')
-
-plt.xlabel("Proportional Timeline (Top Innings Only)")
-plt.yticks([])
-plt.title("Top Inning Events Colored by Duration Proportion")
-plt.xlim(0, 1)
-plt.margins(x=0)
-plt.tight_layout()
-plt.show()
+from preprocess.calculate.measure_time import parse_epoch_ms, calc_time_diff_ms
+from preprocess.stream_loader import iter_all_plays
+
+# NOTE:import しただけで読み込み・描画しないよう、処理は関数にして単体実行のときだけ呼ぶ。
+# matplotlib は描画するときに import する
+# 描画はイベントごとに barh を呼ばず、(start, width, score) の配列から PolyCollection 1つで描く(analysys/heat_map_renderer.py と共通)
+
+def top_inning_durations(path):
+    # NOTE:allPlays を1打席ずつ逐次パースする
+    all_plays = iter_all_plays(path)
+
+    durations = []
+    sec = 0
+
+    for play in all_plays:
+        # NOTE:True:表,False:裏
+        if  play["about"]["isTopInning"] == True:
+            events = play["playEvents"]
+
+            for event in events:
+                # NOTE:周辺イベントの排除(ウォーミングアップやタイム)
+                if event["type"] == "action" and event.get("isBaseRunningPlay") == None:
+                    continue
+                # if event["details"].get("eventType") == "game_advisory":
+                #     continue
+                d = calc_time_diff_ms(parse_epoch_ms(event["startTime"]), parse_epoch_ms(event["endTime"]))
+                sec += d
+                durations.append(d)
+                if d <= 0:
+                    continue
+
+                # NOTE:logの出し方忘れないように残しとく
+                # try:
+                #     print(event["details"]["description"])
+
+                # # NOTE:keyがない:KeyError,eventが辞書でない等:TypeError
+                # except (KeyError, TypeError) as e:
+                #     logging.warning("description 取得失敗 (%s): %s", e, event)
+
+    return durations, sec
+
+# 長さの配列 -> 0〜1 に詰めて並べたときの (start, width)
+def proportional_layout(durations):
+    widths = np.asarray(durations, dtype=np.float64)
+    total = widths.sum()
+    if total > 0:
+        widths = widths / total
+    starts = np.cumsum(widths) - widths
+    return starts, widths
+
+# 0〜1 に正規化(全部同じ値なら 0)
+def normalize_scores(scores):
+    scores = np.asarray(scores, dtype=np.float64)
+    if len(scores) == 0:
+        return scores
+    return (scores - scores.min()) / (np.ptp(scores) + 1e-6)
+
+# NOTE:バーを1本ずつ描かず、(n, 4, 2) の頂点配列から PolyCollection を1つ作って ax に足す
+def draw_timeline(ax, starts, widths, scores, cmap="viridis", edgecolor="black", linewidth=0.3, norm=None):
+    from matplotlib.collections import PolyCollection
+    from matplotlib.colors import Normalize
+
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = starts + np.asarray(widths, dtype=np.float64)
+    verts = np.empty((len(starts), 4, 2))
+    verts[:, 0, 0] = starts
+    verts[:, 1, 0] = starts
+    verts[:, 2, 0] = ends
+    verts[:, 3, 0] = ends
+    verts[:, :, 1] = [-0.4, 0.4, 0.4, -0.4]
+    collection = PolyCollection(verts, array=np.asarray(scores, dtype=np.float64), cmap=cmap,
+                                norm=norm or Normalize(0, 1), edgecolors=edgecolor, linewidths=linewidth)
+    ax.add_collection(collection)
+    ax.set_ylim(-0.5, 0.5)
+    return collection
+
+def plot_heat_map(durations, sec, scores=None):
+    import matplotlib.pyplot as plt
+
+    starts, widths = proportional_layout(durations)
+    # TODO:評価値を正規化して(若しくは正規化された評価値を使用して)ヒートマップに反映する
+    # 評価値を渡さなければ、従来どおりイベントの順番で色を付ける
+    if scores is None:
+        scores = np.arange(len(widths))
+
+    fig, ax = plt.subplots(figsize=(10, 2))
+    draw_timeline(ax, starts, widths, normalize_scores(scores))
+
+    ax.set_xlabel("Proportional Timeline (Top Innings Only)")
+    ax.set_yticks([])
+    ax.set_title("Top Inning Events Colored by Duration Proportion")
+    ax.set_xlim(0, 1)
+    ax.margins(x=0)
+    fig.tight_layout()
+    plt.show()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    path = sys.argv[1] if len(sys.argv) > 1 else "data/raw/game/777708.json"
+    plot_heat_map(*top_inning_durations(path))
@@ -1,59 +1,166 @@
-import requests
-from datetime import datetime, timedelta
-import pandas as pd
 import time
 import json
+import argparse
+import os
 
-from data_processor import data_process
+from data_processor import data_process, data_download, process_data
 from data_processor_for_cr import data_process_for_cr
+from crawler import Crawler, date_range
+from summary_store import SummaryStore
+from event_store import EventStore
+from columnar_export import export_dataset, drop_dataset, available_formats, FORMATS as EXPORT_FORMATS
+from preprocess.profiling import profiler, stage, profile_dump
 
-def get_date_list():
-    # start_date = datetime(2025, 3, 16)
-    s_y, s_m, s_d = 2025, 3, 16
-    e_y, e_m, e_d = 2025, 6, 16
-    
-    # start_date = datetime(2025, 3, 16)
-    start_date = datetime(s_y, s_m, s_d)
-    # end_date = datetime.today()
-    end_date = datetime(e_y, e_m, e_d)
-    
-    days = (end_date - start_date).days + 1 
-    return [(start_date + timedelta(days=i)).strftime("%m/%d/%Y") for i in range(days)],s_y,s_m,s_d,e_y,e_m,e_d
-
-def fetch_gamepks(date_str):
-    url = f"https://statsapi.mlb.com/api/v1/schedule?sportId=1&date={date_str}"
-    resp = requests.get(url)
-    if not resp.ok:
-        return []
-    try:
-        games = resp.json()["dates"][0]["games"]
-        return [g["gamePk"] for g in games if g.get("seriesDescription") == "Regular Season" and g["status"].get("statusCode") == "F"]
-    except Exception:
-        return []
+# NOTE:--start / --end (YYYY-MM-DD) で期間を指定できる(省略時は 2025-03-16〜2025-06-16)
+DEFAULT_START = "2025-03-16"
+DEFAULT_END = "2025-06-16"
+
+# 日付の形式がおかしい・start が end より後なら ValueError(crawler.date_range)
+def get_date_list(start=None, end=None):
+    start = start or DEFAULT_START
+    end = end or DEFAULT_END
+    dates = date_range(start, end)
+    s_y, s_m, s_d = map(int, start.split("-"))
+    e_y, e_m, e_d = map(int, end.split("-"))
+    return dates,s_y,s_m,s_d,e_y,e_m,e_d
 
-def output_data(process_datas_dor_rc,s_y,s_m,s_d,e_y,e_m,e_d):
+def output_path_for(s_y,s_m,s_d,e_y,e_m,e_d):
     start_date_str = f"{s_y}-{s_m:02d}-{s_d:02d}"
     end_date_str = f"{e_y}-{e_m:02d}-{e_d:02d}"
-    output_path = f"frontend/public/data/{start_date_str}-{end_date_str}.json"
+    return f"frontend/public/data/{start_date_str}-{end_date_str}.json", start_date_str, end_date_str
 
-    with open(output_path, "w", encoding="utf-8") as f:
+def output_data(process_datas_dor_rc,s_y,s_m,s_d,e_y,e_m,e_d,export_formats=None):
+    output_path, _, _ = output_path_for(s_y,s_m,s_d,e_y,e_m,e_d)
+
+    with stage("json_output"), open(output_path, "w", encoding="utf-8") as f:
         json.dump(process_datas_dor_rc, f, ensure_ascii=False, indent=4)
+    export_columnar(output_path, export_formats)
+
+def output_event_store(stores, event_store_path):
+    if not event_store_path:
+        return
+    with stage("event_store_output"):
+        store = EventStore.concat(stores)
+        if os.path.dirname(event_store_path):
+            os.makedirs(os.path.dirname(event_store_path), exist_ok=True)
+        store.save(event_store_path)
+    print(f"保存完了：{event_store_path} ({len(stores)}試合, {len(store)}イベント)")
+
+# NOTE:--export-format を指定したら、書き出した JSON から列指向の形式(+ .gz / .br、manifest.json)も作る
+# 指定しなければ、前回の書き出しが今回の JSON と食い違わないよう manifest から外す
+def export_columnar(output_path, export_formats):
+    export_formats = available_formats(export_formats or [])
+    if not export_formats:
+        if drop_dataset(output_path):
+            print(f"manifest から外しました：{output_path} の列指向データ(--export-format で作り直せます)")
+        return
+    with stage("columnar_output"):
+        dataset = export_dataset(output_path, export_formats)
+    for fmt in export_formats:
+        print(f"保存完了：{dataset[fmt]['path']} ({dataset[fmt]['bytes']} bytes, gz {dataset[fmt]['gz']} / br {dataset[fmt].get('br')})")
+
+# NOTE:サマリーストア(SQLite)経由。保存済みの試合は取得も処理もせず、新しい試合・変わった試合だけ計算して
+# 最後に期間分を1クエリでコンパクトなJSONとして書き出す
+# NOTE:game_order はその日のスケジュール内の位置(0始まり)。並列・逐次どちらもスキップ前の位置で数える
+def main_with_store(date_str, output_path, start_date_str, end_date_str, concurrent=False, max_workers=16, per_host_limit=8, refresh=False, export_only=False, export_formats=None):
+    store = SummaryStore()
+    skip = None if refresh else store.is_current
+
+    if not export_only:
+        def compute_for(gamepk):
+            return lambda raw_data: data_process_for_cr(raw_data, process_data(raw_data), gamepk)
+
+        if concurrent:
+            crawler = Crawler(max_workers=max_workers, per_host_limit=per_host_limit)
+            for gamepk, raw_data, order in crawler.crawl(date_str, skip, with_order=True):
+                print(gamepk)
+                store.update(gamepk, raw_data, compute_for(gamepk), order)
+        else:
+            crawler = Crawler(max_workers=max_workers, per_host_limit=per_host_limit)
+            for date in date_str:
+                gamepks = crawler.fetch_gamepks(date)
+                print(gamepks)
+                for order, gamepk in enumerate(gamepks):
+                    if skip is not None and skip(gamepk):
+                        store.stats["skipped"] += 1
+                        continue
+                    print(gamepk)
+                    raw_data = data_download(gamepk)
+                    if raw_data is None:
+                        continue
+                    store.update(gamepk, raw_data, compute_for(gamepk), order)
+
+    count = store.export(start_date_str, end_date_str, output_path)
+    print(f"計算: {store.stats['computed']} 変化なし: {store.stats['unchanged']} スキップ: {store.stats['skipped']}")
+    print(f"保存完了：{output_path} ({count}試合)")
+    store.close()
+    export_columnar(output_path, export_formats)
         
-def main():
+def main(concurrent=False, max_workers=16, per_host_limit=8, use_store=False, start=None, end=None, refresh=False, export_only=False, export_formats=None, event_store_path=None):
     process_datas_dor_rc = []
-    date_str,s_y,s_m,s_d,e_y,e_m,e_d = get_date_list()
+    # NOTE:--event-store を指定したら、試合ごとの処理済みイベントを列形式(EventStore)にしてシーズン分まとめて保存する
+    stores = []
+    date_str,s_y,s_m,s_d,e_y,e_m,e_d = get_date_list(start, end)
+
+    if use_store or export_only:
+        output_path, start_date_str, end_date_str = output_path_for(s_y,s_m,s_d,e_y,e_m,e_d)
+        main_with_store(date_str, output_path, start_date_str, end_date_str, concurrent, max_workers, per_host_limit, refresh, export_only, export_formats)
+        return
+    
+    # NOTE:並列クローラーモード(取得のみ並列、処理は日付順に逐次)
+    if concurrent:
+        crawler = Crawler(max_workers=max_workers, per_host_limit=per_host_limit)
+        for gamepk, raw_data in crawler.crawl(date_str):
+            print(gamepk)
+            processed_data = process_data(raw_data)
+            process_datas_dor_rc.append(data_process_for_cr(raw_data,processed_data,gamepk))
+            if event_store_path:
+                stores.append(EventStore.from_processed(processed_data, gamepk))
+        output_data(process_datas_dor_rc,s_y,s_m,s_d,e_y,e_m,e_d,export_formats)
+        output_event_store(stores, event_store_path)
+        return
+    
+    crawler = Crawler(max_workers=max_workers, per_host_limit=per_host_limit)
     for date in date_str:
-        gamepks = fetch_gamepks(date)
+        gamepks = crawler.fetch_gamepks(date)
         print(gamepks)
         for gamepk in gamepks:
             print(gamepk)
-            raw_data,process_data = data_process(gamepk)
+            raw_data,processed_data = data_process(gamepk)
 
-            process_data_dor_rc = data_process_for_cr(raw_data,process_data,gamepk)
+            process_data_dor_rc = data_process_for_cr(raw_data,processed_data,gamepk)
             # print(process_data_dor_rc)
             process_datas_dor_rc.append(process_data_dor_rc)
+            if event_store_path:
+                stores.append(EventStore.from_processed(processed_data, gamepk))
     
-    output_data(process_datas_dor_rc,s_y,s_m,s_d,e_y,e_m,e_d)
+    output_data(process_datas_dor_rc,s_y,s_m,s_d,e_y,e_m,e_d,export_formats)
+    output_event_store(stores, event_store_path)
     
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrent", action="store_true", help="並列クローラーで取得する")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--per-host", type=int, default=8)
+    parser.add_argument("--store", action="store_true", help="サマリーストア(SQLite)経由で差分だけ計算する")
+    parser.add_argument("--start", help="開始日 YYYY-MM-DD")
+    parser.add_argument("--end", help="終了日 YYYY-MM-DD")
+    parser.add_argument("--refresh", action="store_true", help="保存済みの試合も取得し直して変化を確認する")
+    parser.add_argument("--export-only", action="store_true", help="取得せずストアから期間分を書き出すだけ")
+    parser.add_argument("--export-format", nargs="+", choices=EXPORT_FORMATS, help="列指向の形式も書き出す(columnar / msgpack。msgpack は入っていなければ飛ばす)")
+    parser.add_argument("--event-store", help="処理済みイベントを列形式で保存する先(.npz / .feather / .parquet)。--store なしのときだけ")
+    parser.add_argument("--profile", help="cProfile(.prof) / pyinstrument(.html) の出力先")
+    parser.add_argument("--profile-report", nargs="?", const="", help="段ごとの時間とカウンタを JSON に残す(パス省略時は PROFILE_DIR=data/profiling の下)")
+    args = parser.parse_args()
+    try:
+        get_date_list(args.start, args.end)
+    except ValueError as e:
+        parser.error(f"--start / --end: {e}")
+    if args.event_store and (args.store or args.export_only):
+        parser.error("--event-store は --store / --export-only と一緒には使えません(保存済みの試合は処理しないため)")
+    with profile_dump(args.profile):
+        main(args.concurrent, args.workers, args.per_host, args.store, args.start, args.end, args.refresh, args.export_only, args.export_format, args.event_store)
+    profiler.print_report()
+    # NOTE:ファイルに残すのは --profile-report を付けたときだけ(実行のたびに data/profiling に増えないように)
+    if args.profile_report is not None:
+        print(f"計測結果：{profiler.write_report('preprocess', {'argv': vars(args)}, args.profile_report or None)}")
@@ -0,0 +1,170 @@
+import contextlib
+import cProfile
+import functools
+import json
+import threading
+import time
+import os
+
+# NOTE:処理段ごとの時間と件数を集計する軽量な計測。
+# 記録するのは段ごとの (回数, 合計, 最大) と カウンタだけなので、本番でも入れっぱなしでよい。
+# 段はイベント単位ではなく試合単位(download / process_data / get_scores ...)で囲む
+#
+#   with stage("download"): ...
+#   @timed("process_data")
+#   count("events", n)
+#   profiler.write_report("preprocess")   # CLI では --profile-report を付けたときだけ
+
+PROFILING = os.environ.get("PROFILING", "1") != "0"
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "data/profiling")
+
+class Profiler:
+    def __init__(self, enabled=PROFILING):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+            self.started_at = time.time()
+            self._start = time.perf_counter()
+
+    def record(self, name, elapsed):
+        with self._lock:
+            s = self.stages.get(name)
+            if s is None:
+                self.stages[name] = [1, elapsed, elapsed]
+            else:
+                s[0] += 1
+                s[1] += elapsed
+                if elapsed > s[2]:
+                    s[2] = elapsed
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name=None):
+        def decorator(fn):
+            stage_name = name or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(stage_name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    # NOTE:プロセスプールのワーカーから親へ返して merge する用
+    def snapshot(self):
+        with self._lock:
+            return {
+                "stages": {name: list(s) for name, s in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+
+    def merge(self, snapshot):
+        with self._lock:
+            for name, (n, total, longest) in snapshot["stages"].items():
+                s = self.stages.setdefault(name, [0, 0.0, 0.0])
+                s[0] += n
+                s[1] += total
+                s[2] = max(s[2], longest)
+            for name, n in snapshot["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self, extra=None):
+        with self._lock:
+            report = {
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+                "wall_s": time.perf_counter() - self._start,
+                "pid": os.getpid(),
+                "stages": {
+                    name: {
+                        "count": n,
+                        "total_s": total,
+                        "mean_ms": total / n * 1000 if n else 0.0,
+                        "max_ms": longest * 1000,
+                    }
+                    for name, (n, total, longest) in self.stages.items()
+                },
+                "counters": dict(self.counters),
+            }
+        if extra:
+            report.update(extra)
+        return report
+
+    # data/profiling/<name>-<時刻>.json に書き出してパスを返す
+    def write_report(self, name, extra=None, path=None):
+        report = self.report(extra)
+        if path is None:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return path
+
+    def print_report(self):
+        report = self.report()
+        print(f"wall {report['wall_s']:.2f}s")
+        for name, s in sorted(report["stages"].items(), key=lambda kv: -kv[1]["total_s"]):
+            print(f"  {name:<22} x{s['count']:<6} total {s['total_s']:8.3f} s  mean {s['mean_ms']:8.2f} ms  max {s['max_ms']:8.2f} ms")
+        for name, n in report["counters"].items():
+            print(f"  {name:<22} {n}")
+
+profiler = Profiler()
+stage = profiler.stage
+timed = profiler.timed
+count = profiler.count
+
+# NOTE:関数単位の詳細が欲しいとき用。path が .html で pyinstrument があればそちら、無ければ cProfile(.prof)
+@contextlib.contextmanager
+def profile_dump(path):
+    if path is None:
+        yield
+        return
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    if path.endswith(".html"):
+        try:
+            from pyinstrument import Profiler as InstrumentProfiler
+        except ImportError:
+            InstrumentProfiler = None
+            path = path[:-len(".html")] + ".prof"
+        if InstrumentProfiler is not None:
+            p = InstrumentProfiler()
+            p.start()
+            try:
+                yield
+            finally:
+                p.stop()
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(p.output_html())
+            return
+    p = cProfile.Profile()
+    p.enable()
+    try:
+        yield
+    finally:
+        p.disable()
+        p.dump_stats(path)
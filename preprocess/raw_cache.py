@@ -0,0 +1,332 @@
+import json
+import glob
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import atexit
+from multiprocessing import util as mp_util
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# NOTE:gamePkをキーにした生フィード(feed/live)のディスクキャッシュ
+# data/raw/cache/<gamepk>.json(.gz|.zst) に保存し、index.json に sha256・サイズ・最終アクセスを持つ
+# 同じディレクトリに複数のプロセス(クローラー・プロセスプール・gunicorn のワーカー)が書くので、
+# index.json は index.lock を取ってディスク上の内容に自分の変更を重ねてから書き直す(後勝ちで他のプロセスの分を消さない)
+# data/raw/game はリポジトリで管理している記録済みの試合(種データ)。読むだけで、書き込みも削除もしない
+
+CACHE_DIR = os.environ.get("RAW_CACHE_DIR", "data/raw/cache")
+SEED_DIR = os.environ.get("RAW_SEED_DIR", "data/raw/game")
+MAX_BYTES = int(os.environ.get("RAW_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+# NOTE:試合中(Final以外)のフィードは数秒で古くなるのでTTLで捨てる。FinalはTTLなし(容量の上限を超えたときだけ古い順に消す)
+LIVE_TTL = float(os.environ.get("RAW_CACHE_LIVE_TTL", 10))
+COMPRESSION = os.environ.get("RAW_CACHE_COMPRESSION", "none")
+# NOTE:index.json を書き直す間隔(秒)。put のたびに全体を書き直すと試合数の2乗になるので、変更を溜めてまとめて書く
+FLUSH_INTERVAL = float(os.environ.get("RAW_CACHE_FLUSH_INTERVAL", 5))
+
+EXTENSIONS = {"none": ".json", "gzip": ".json.gz", "zstd": ".json.zst"}
+
+def is_final(data):
+    return data.get("gameData", {}).get("status", {}).get("abstractGameState") == "Final"
+
+def compress(body, compression):
+    if compression == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    return body
+
+def decompress(body, filename):
+    if filename.endswith(".gz"):
+        return gzip.decompress(body)
+    if filename.endswith(".zst"):
+        return zstandard.ZstdDecompressor().decompress(body)
+    return body
+
+# NOTE:orjson があれば高速パス
+def loads(body):
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+# NOTE:mkstemp は 0600 で作るので、普通に open したときと同じ権限(0666 & ~umask)に直してから置き換える。
+# (Web サーバーなど別ユーザーからも読めるように)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def atomic_write(path, body):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        os.fchmod(fd, 0o666 & ~_UMASK)
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class RawFeedCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES, live_ttl=LIVE_TTL, compression=COMPRESSION, seed_dir=SEED_DIR, flush_interval=FLUSH_INTERVAL):
+        if compression == "zstd" and zstandard is None:
+            # NOTE:zstandard が無い環境では gzip にフォールバック
+            compression = "gzip"
+        if compression not in EXTENSIONS:
+            raise ValueError(f"unknown compression: {compression}")
+        self.cache_dir = cache_dir
+        self.seed_dir = seed_dir
+        self.max_bytes = max_bytes
+        self.live_ttl = live_ttl
+        self.compression = compression
+        self.flush_interval = flush_interval
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.lock_path = os.path.join(cache_dir, "index.lock")
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._seed_final = {}
+
+        self._lock = threading.RLock()
+        # NOTE:まだ index.json に書いていない変更。_changes は key -> エントリ(None は削除)、_touched は key -> (sha256, 最終アクセス)
+        self._changes = {}
+        self._touched = {}
+        self._flushed_at = time.time()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self._load_index()
+        self._index_mtime = self._mtime()
+        atexit.register(self.flush)
+        # NOTE:プロセスプールのワーカーは atexit を呼ばずに終わるので、multiprocessing の終了処理でも書き出す
+        mp_util.Finalize(self, self.flush, exitpriority=10)
+        mp_util.register_after_fork(self, RawFeedCache._after_fork)
+
+    # NOTE:プロセスプールで fork した子では、親の未書き込みの変更は親が書くので捨てる。
+    # multiprocessing は子で終了処理の登録を消すので登録し直す
+    def _after_fork(self):
+        self._lock = threading.RLock()
+        self._changes = {}
+        self._touched = {}
+        mp_util.Finalize(self, self.flush, exitpriority=10)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _mtime(self):
+        try:
+            return os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _file_lock(self):
+        f = open(self.lock_path, "a")
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        return f
+
+    # NOTE:ディスク上の index に、このプロセスの未書き込みの変更を重ねたもの
+    def _merged(self, disk):
+        for key, entry in self._changes.items():
+            if entry is None:
+                disk.pop(key, None)
+            else:
+                disk[key] = entry
+        for key, (sha256, last_access) in self._touched.items():
+            entry = disk.get(key)
+            # NOTE:別のプロセスが取り直した(中身が変わった)エントリの最終アクセスは上書きしない
+            if entry is not None and entry["sha256"] == sha256:
+                entry["last_access"] = max(entry["last_access"], last_access)
+        return disk
+
+    # 他のプロセスが index.json を書き直していたら読み直す(未書き込みの変更はそのまま重ねる)
+    def _refresh(self):
+        mtime = self._mtime()
+        if mtime is None or mtime == self._index_mtime:
+            return
+        self.index = self._merged(self._load_index())
+        self._index_mtime = mtime
+
+    def flush(self):
+        with self._lock:
+            if not self._changes and not self._touched:
+                return
+            with self._file_lock():
+                self.index = self._merged(self._load_index())
+                self._evict(self.index, keep=set(self._changes))
+                atomic_write(self.index_path, json.dumps(self.index).encode("utf-8"))
+            self._index_mtime = self._mtime()
+            self._changes.clear()
+            self._touched.clear()
+            self._flushed_at = time.time()
+
+    def _seed_path(self, key):
+        if not self.seed_dir:
+            return None
+        for ext in EXTENSIONS.values():
+            path = os.path.join(self.seed_dir, f"{key}{ext}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    # NOTE:種データは index に入れない(容量の上限・追い出しの対象外)。Final の試合だけヒットとして返す
+    def _get_seed(self, key):
+        path = self._seed_path(key)
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            body = decompress(f.read(), path)
+        try:
+            data = loads(body)
+        except ValueError:
+            return None
+        return data if is_final(data) else None
+
+    # NOTE:読み込みとハッシュの計算(数 MB)はロックの外でする。キャッシュヒットでリクエストのスレッドが直列にならないように
+    def get(self, gamepk):
+        key = str(gamepk)
+        with self._lock:
+            entry = self.index.get(key)
+            if entry is None:
+                self._refresh()
+                entry = self.index.get(key)
+        if entry is None:
+            data = self._get_seed(key)
+            with self._lock:
+                self.stats["misses" if data is None else "hits"] += 1
+            return data
+
+        if not entry["final"] and time.time() - entry["fetched_at"] > self.live_ttl:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        body = self._read(entry)
+        with self._lock:
+            if body is None:
+                # NOTE:別のプロセスが書き直していた(index が古い)だけなら、読み直した index でもう一度
+                self._refresh()
+                if self.index.get(key, entry)["sha256"] != entry["sha256"]:
+                    return self.get(gamepk)
+                if self.index.get(key) is not None:
+                    self._drop(key)
+                self.stats["misses"] += 1
+                return None
+            now = time.time()
+            entry["last_access"] = now
+            self._touched[key] = (entry["sha256"], now)
+            self.stats["hits"] += 1
+        return loads(body)
+
+    # NOTE:内容のハッシュが一致しないもの・消えていたものは None(壊れているとみなして取り直す)
+    def _read(self, entry):
+        try:
+            with open(os.path.join(self.cache_dir, entry["file"]), "rb") as f:
+                body = decompress(f.read(), entry["file"])
+        except FileNotFoundError:
+            return None
+        return body if hashlib.sha256(body).hexdigest() == entry["sha256"] else None
+
+    # NOTE:終了済みの試合のキャッシュ(無ければ種データ)のファイルのパス。試合中・未取得なら None
+    # process_data_file で、フィード全体を読み込まずに1打席ずつ処理するときに使う
+    def path(self, gamepk):
+        key = str(gamepk)
+        with self._lock:
+            entry = self.index.get(key)
+            if entry is None:
+                self._refresh()
+                entry = self.index.get(key)
+            if entry is not None:
+                return os.path.join(self.cache_dir, entry["file"]) if entry["final"] else None
+            path = self._seed_path(key)
+            if path is None:
+                return None
+            if path not in self._seed_final:
+                # NOTE:gameData は liveData より前にあるので、状態だけなら先頭を読めば分かる
+                from preprocess.stream_loader import read_game_data
+                _, game_data = read_game_data(path)
+                self._seed_final[path] = game_data.get("status", {}).get("abstractGameState") == "Final"
+            return path if self._seed_final[path] else None
+
+    def put(self, gamepk, data):
+        key = str(gamepk)
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        stored = compress(body, self.compression)
+        filename = f"{key}{EXTENSIONS[self.compression]}"
+        sha256 = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            atomic_write(os.path.join(self.cache_dir, filename), stored)
+            old = self.index.get(key)
+            if old is not None and old["file"] != filename:
+                self._remove_file(old["file"])
+            now = time.time()
+            self.index[key] = self._changes[key] = {
+                "file": filename,
+                "bytes": len(stored),
+                "sha256": sha256,
+                "final": is_final(data),
+                "fetched_at": now,
+                "last_access": now,
+            }
+            self._touched.pop(key, None)
+            if now - self._flushed_at >= self.flush_interval:
+                self.flush()
+
+    def _remove_file(self, filename):
+        try:
+            os.remove(os.path.join(self.cache_dir, filename))
+        except FileNotFoundError:
+            pass
+
+    def _drop(self, key):
+        entry = self.index.pop(key, None)
+        if entry is not None:
+            self._remove_file(entry["file"])
+            self._changes[key] = None
+            self._touched.pop(key, None)
+
+    # NOTE:合計サイズが上限を超えたら最終アクセスの古い順に消す(index.lock を取った状態で、全プロセス分の index に対して)。
+    # 試合中のフィード(TTL 切れで取り直すもの)から先に消し、Final の試合はそれでも足りないときだけ消す
+    def _evict(self, index, keep=()):
+        total = sum(e["bytes"] for e in index.values())
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(index.items(), key=lambda kv: (kv[1]["final"], kv[1]["last_access"])):
+            if total <= self.max_bytes:
+                break
+            if key in keep:
+                continue
+            total -= entry["bytes"]
+            del index[key]
+            self._remove_file(entry["file"])
+            self.stats["evictions"] += 1
+
+# NOTE:記録済みの試合(種データ)と生フィードのキャッシュにある gamePk の一覧
+def cached_gamepks(raw_dirs=(SEED_DIR, CACHE_DIR)):
+    names = {os.path.basename(path).split(".")[0] for raw_dir in raw_dirs if raw_dir for path in glob.glob(os.path.join(raw_dir, "*.json*"))}
+    return sorted(int(name) for name in names if name.isdigit())
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_raw_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RawFeedCache()
+        return _cache
@@ -0,0 +1,119 @@
+# NOTE:塁上の状態を「3ビットの占有マスク(1B=1, 2B=2, 3B=4) + 塁ごとの選手ID」で持つ。
+# 名前は試合ごとの PlayerTable に1回だけ持ち、{"1B": {"id":..., "full_name":...}} の形が必要なときだけ組み立てる。
+# アウトになったランナーは従来どおり None キー(pos_runner_state[None])相当として out に持つ
+
+BASES = ("1B", "2B", "3B")
+BASE_INDEX = {"1B": 0, "2B": 1, "3B": 2}
+BASE_BITS = {"1B": 1, "2B": 2, "3B": 4}
+# マスク -> 人数(popcount)
+POPCOUNT = (0, 1, 1, 2, 1, 2, 2, 3)
+
+# NOTE:id は 0 を「空き」として使う(MLB の選手IDは正の整数)
+EMPTY_ID = 0
+
+class PlayerTable:
+    __slots__ = ("names", "_entries")
+
+    def __init__(self):
+        self.names = {}
+        # {"id", "full_name"} の dict は選手ごとに1つだけ作って使い回す
+        self._entries = {EMPTY_ID: {"id": None, "full_name": None}}
+
+    def add(self, player_id, full_name):
+        if player_id not in self.names:
+            self.names[player_id] = full_name
+        return player_id
+
+    def entry(self, player_id):
+        entry = self._entries.get(player_id)
+        if entry is None:
+            entry = {"id": player_id, "full_name": self.names.get(player_id)}
+            self._entries[player_id] = entry
+        return entry
+
+    # json.dump(..., default=players.json_default) で RunnerState を従来の形に展開する
+    def json_default(self, obj):
+        if isinstance(obj, RunnerState):
+            return obj.to_dict(self)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class RunnerState:
+    __slots__ = ("mask", "ids", "out", "_dict")
+
+    def __init__(self, ids=(EMPTY_ID, EMPTY_ID, EMPTY_ID), out=None):
+        self.ids = ids
+        # NOTE:out は None なら無し、EMPTY_ID なら「空きの塁から出たランナー」(従来の {"id": None} と同じ)
+        self.out = out
+        self.mask = (ids[0] != EMPTY_ID) | (ids[1] != EMPTY_ID) << 1 | (ids[2] != EMPTY_ID) << 2
+        self._dict = None
+
+    # 従来の runner_count と同じく、アウトになったランナーも数える
+    def count(self):
+        return POPCOUNT[self.mask] + (self.out is not None and self.out != EMPTY_ID)
+
+    def __eq__(self, other):
+        if isinstance(other, RunnerState):
+            return self.ids == other.ids and self.out == other.out
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.ids, self.out))
+
+    def __repr__(self):
+        return f"RunnerState(ids={self.ids}, out={self.out})"
+
+    # NOTE:組み立てた dict は覚えておく(次のイベントの pre_runner_state は前のイベントの pos_runner_state と同じもの)
+    def to_dict(self, players):
+        if self._dict is None:
+            state = {base: players.entry(player_id) for base, player_id in zip(BASES, self.ids)}
+            if self.out is not None:
+                state[None] = players.entry(self.out)
+            self._dict = state
+        return self._dict
+
+    # base_movements({開始塁: 終了塁}、開始塁 None は打者)を適用したイベント後の状態
+    def advance(self, base_movements, batter_id):
+        ids = [EMPTY_ID, EMPTY_ID, EMPTY_ID]
+        out = None
+        moved = 0
+        for start, end in base_movements.items():
+            if start is not None:
+                moved |= BASE_BITS[start]
+            if end == "score":
+                continue
+            if start is None:
+                if end is not None:
+                    ids[BASE_INDEX[end]] = batter_id
+                continue
+            runner = self.ids[BASE_INDEX[start]]
+            if end is None:
+                out = runner
+            else:
+                ids[BASE_INDEX[end]] = runner
+        # 動かなかったランナーはそのまま
+        for i in range(3):
+            if not moved & (1 << i) and self.ids[i] != EMPTY_ID:
+                ids[i] = self.ids[i]
+        return RunnerState(tuple(ids), out)
+
+EMPTY_STATE = RunnerState()
+
+def runner_state_mask(runner_state):
+    if isinstance(runner_state, RunnerState):
+        return runner_state.mask
+    mask = 0
+    for base, v in runner_state.items():
+        # NOTE:アウトになったランナーは pos_runner_state[None] に入るので塁として数えない
+        if base in BASE_BITS and v["id"] != None:
+            mask |= BASE_BITS[base]
+    return mask
+
+# NOTE:compact=True で処理した event_lookup の runner_state を従来の dict に展開する(その場で書き換え)
+def expand_runner_states(event_lookup, players):
+    for play in event_lookup.values():
+        for event in play.values():
+            runner_state = event["runner_state"]
+            for key in ("pre_runner_state", "pos_runner_state"):
+                if isinstance(runner_state[key], RunnerState):
+                    runner_state[key] = runner_state[key].to_dict(players)
+    return event_lookup
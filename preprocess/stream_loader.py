@@ -0,0 +1,100 @@
+import json
+import gzip
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# NOTE:生フィード(1試合 約2MB)のうち使うのは liveData.plays.allPlays と gameData の一部だけ。
+# iter_all_plays は ijson があれば打席単位で逐次パースする(ピークメモリは1打席分)。
+# load_game は orjson があれば一括パースの高速パス(ijson より速い)、無ければ ijson で必要部分だけ組み立てる
+
+# gameData から残すフィールド
+GAME_DATA_FIELDS = [
+    ("datetime", "officialDate"),
+    ("status", "abstractGameState"),
+    ("status", "statusCode"),
+    ("teams", "away", "name"),
+    ("teams", "home", "name"),
+]
+
+def open_feed(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".zst"):
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+    return open(path, "rb")
+
+def loads(body):
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+def slim_game_data(game_data):
+    slim = {}
+    for keys in GAME_DATA_FIELDS:
+        src, dst = game_data, slim
+        for k in keys[:-1]:
+            src = src.get(k, {})
+            dst = dst.setdefault(k, {})
+        if keys[-1] in src:
+            dst[keys[-1]] = src[keys[-1]]
+    return slim
+
+def iter_all_plays(path):
+    if ijson is None:
+        with open_feed(path) as f:
+            data = loads(f.read())
+        yield from data["liveData"]["plays"]["allPlays"]
+        return
+    with open_feed(path) as f:
+        # NOTE:use_float=True で Decimal ではなく float を返させる(json.load と同じ型にする)
+        yield from ijson.items(f, "liveData.plays.allPlays.item", use_float=True)
+
+def read_game_data(path):
+    if ijson is None:
+        with open_feed(path) as f:
+            data = loads(f.read())
+        return data.get("gamePk"), slim_game_data(data.get("gameData", {}))
+
+    wanted = {"gameData." + ".".join(keys): keys for keys in GAME_DATA_FIELDS}
+    gamepk = None
+    game_data = {}
+    with open_feed(path) as f:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if prefix == "gamePk" and event == "number":
+                gamepk = value
+            elif prefix in wanted and event in ("string", "number", "boolean"):
+                dst = game_data
+                keys = wanted[prefix]
+                for k in keys[:-1]:
+                    dst = dst.setdefault(k, {})
+                dst[keys[-1]] = value
+            # NOTE:gameData は liveData より前にあるので、liveData に入ったら打ち切る
+            elif prefix == "liveData":
+                break
+    return gamepk, game_data
+
+# NOTE:process_data / data_process_for_cr にそのまま渡せる形(不要な部分を落としたフィード)
+def load_game(path):
+    if orjson is not None or ijson is None:
+        with open_feed(path) as f:
+            data = loads(f.read())
+        return {
+            "gamePk": data.get("gamePk"),
+            "gameData": slim_game_data(data.get("gameData", {})),
+            "liveData": {"plays": {"allPlays": data["liveData"]["plays"]["allPlays"]}},
+        }
+    gamepk, game_data = read_game_data(path)
+    return {
+        "gamePk": gamepk,
+        "gameData": game_data,
+        "liveData": {"plays": {"allPlays": list(iter_all_plays(path))}},
+    }
@@ -0,0 +1,134 @@
+import json
+import hashlib
+import sqlite3
+import threading
+import time
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocess.profiling import stage
+
+# NOTE:試合ごとの get_score の結果(フロント用のサマリー)を SQLite に持っておく。
+# gamePk が主キー、officialDate にインデックス。サマリーはコンパクトなJSON文字列のまま保存し、
+# 期間指定の書き出しは1クエリで取り出して連結するだけにする
+
+SUMMARY_DB = os.environ.get("SUMMARY_DB", "data/summary/summary.sqlite3")
+# NOTE:get_score の中身を変えたら上げる(古いバージョンの行は再計算対象になる)
+SUMMARY_VERSION = "cr-1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    gamepk INTEGER PRIMARY KEY,
+    official_date TEXT NOT NULL,
+    game_order INTEGER NOT NULL DEFAULT 0,
+    source_key TEXT NOT NULL,
+    summary_version TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_official_date ON games (official_date, game_order, gamepk);
+"""
+
+# 生データが変わったかどうかの目印。feed/live の metaData.timeStamp は更新のたびに変わる
+def source_key(raw_data):
+    stamp = raw_data.get("metaData", {}).get("timeStamp")
+    if stamp:
+        return f"ts:{stamp}"
+    body = json.dumps(raw_data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return "sha256:" + hashlib.sha256(body).hexdigest()
+
+def dumps_compact(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+class SummaryStore:
+    def __init__(self, db_path=SUMMARY_DB, summary_version=SUMMARY_VERSION):
+        self.db_path = db_path
+        self.summary_version = summary_version
+        self.stats = {"computed": 0, "unchanged": 0, "skipped": 0}
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # NOTE:クローラーのスレッドからも呼べるように接続は1本をロックで共有する
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # 保存済みで、サマリーのバージョンも最新か(取得前に飛ばしてよいか)
+    def is_current(self, gamepk):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary_version FROM games WHERE gamepk = ?", (int(gamepk),)
+            ).fetchone()
+        return row is not None and row[0] == self.summary_version
+
+    def get(self, gamepk):
+        with self._lock:
+            row = self._conn.execute("SELECT summary FROM games WHERE gamepk = ?", (int(gamepk),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, gamepk, official_date, key, summary, game_order=0):
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO games (gamepk, official_date, game_order, source_key, summary_version, summary, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (gamepk) DO UPDATE SET
+                    official_date = excluded.official_date,
+                    game_order = excluded.game_order,
+                    source_key = excluded.source_key,
+                    summary_version = excluded.summary_version,
+                    summary = excluded.summary,
+                    updated_at = excluded.updated_at
+                """,
+                (int(gamepk), official_date, game_order, key, self.summary_version, dumps_compact(summary), time.time()),
+            )
+
+    # NOTE:生データが前回と同じ(かつバージョンも同じ)なら compute を呼ばずに保存済みのサマリーを返す
+    # compute(raw_data) -> get_score の出力
+    def update(self, gamepk, raw_data, compute, game_order=0):
+        key = source_key(raw_data)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source_key, summary_version, summary, game_order FROM games WHERE gamepk = ?", (int(gamepk),)
+            ).fetchone()
+        if row is not None and row[0] == key and row[1] == self.summary_version:
+            # NOTE:中身が同じでも並び順(スケジュール内の位置)だけは最新に合わせる
+            if row[3] != game_order:
+                with self._lock, self._conn:
+                    self._conn.execute("UPDATE games SET game_order = ? WHERE gamepk = ?", (game_order, int(gamepk)))
+            self.stats["unchanged"] += 1
+            return json.loads(row[2]), False
+        summary = compute(raw_data)
+        official_date = summary.get("date") or raw_data.get("gameData", {}).get("datetime", {}).get("officialDate")
+        self.put(gamepk, official_date, key, summary, game_order)
+        self.stats["computed"] += 1
+        return summary, True
+
+    def dates(self):
+        with self._lock:
+            return self._conn.execute("SELECT MIN(official_date), MAX(official_date), COUNT(*) FROM games").fetchone()
+
+    # 期間(YYYY-MM-DD、両端含む)のサマリーを1クエリで取り出し、JSON配列の文字列にする
+    def export_json(self, start_date, end_date):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT summary FROM games WHERE official_date BETWEEN ? AND ? ORDER BY official_date, game_order, gamepk",
+                (start_date, end_date),
+            ).fetchall()
+        return "[" + ",".join(row[0] for row in rows) + "]", len(rows)
+
+    def export(self, start_date, end_date, output_path):
+        with stage("json_output"):
+            body, count = self.export_json(start_date, end_date)
+            if os.path.dirname(output_path):
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(body)
+        return count